@@ -0,0 +1,338 @@
+"""
+Procesamiento por lotes: un directorio o glob de videos en un pool de procesos.
+Uso: python batch.py inputs/ "uploads/2025-01-*/*.mp4" [--workers N] [--threads-per-worker T]
+     python batch.py largo.mp4 --segments 8 --workers 8   # un video en segmentos paralelos
+
+Cada worker carga el modelo de PoseTracker una sola vez y lo reutiliza entre
+videos (reiniciando el tracker). Las opciones de procesamiento son las de
+main.py; siempre corre headless. Un video que falla no corta el lote: queda
+en el reporte con su error y su log.
+
+Con --segments N cada video se divide en N tramos con solape (ver
+processors/segments.py): los workers analizan los tramos en paralelo y
+escriben sus frames a disco, el proceso principal une los IDs de tracks y
+exporta los chunks como una sola sesión, y los workers renderizan el video
+con los IDs globales.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import traceback
+import contextlib
+import multiprocessing
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+# Estado por proceso worker (ver _init_worker). main/torch se importan dentro de
+# las funciones para que el worker fije los límites de hilos antes de cargar torch.
+_pose_tracker = None
+
+
+def parse_args():
+    from main import add_processing_args
+    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="Videos, directorios o globs")
+    parser.add_argument("--pattern", default="*",
+                        help="Glob dentro de los directorios (ej. '**/*' para recursivo)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 4),
+                        help="Procesos en paralelo")
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="Hilos intra-op de torch/OpenCV por worker (default: cpus / workers)")
+    parser.add_argument("--segments", type=int, default=1,
+                        help="Dividir cada video en N segmentos procesados en paralelo (1 = no)")
+    parser.add_argument("--overlap", type=float, default=9.0,
+                        help="Solape entre segmentos en segundos (warm-up de HAR y unión de IDs)")
+    parser.add_argument("--report", default=None,
+                        help="Reporte JSON consolidado (default: <output-dir>/batch_<fecha>.json)")
+    add_processing_args(parser)
+    return parser.parse_args()
+
+
+def collect_videos(inputs: list, pattern: str = "*") -> list:
+    """Expande archivos, directorios y globs a una lista ordenada sin duplicados."""
+    videos = {}
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            candidates = path.glob(pattern)
+        else:
+            candidates = map(Path, glob.glob(item, recursive=True))
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix.lower() in VIDEO_EXTENSIONS:
+                videos[candidate.resolve()] = None
+    return sorted(videos)
+
+
+def _init_worker(model: str, threads: int, options: dict):
+    """Limita hilos y carga el modelo una vez por proceso (options: backend de inferencia)."""
+    global _pose_tracker
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    import cv2
+    import torch
+    from processors.pose_tracker import PoseTracker
+    
+    cv2.setNumThreads(threads)
+    torch.set_num_threads(threads)
+    with contextlib.suppress(RuntimeError):  # sólo se puede fijar antes del primer uso
+        torch.set_num_interop_threads(1)
+    _pose_tracker = PoseTracker(model, **options)
+
+
+def _process_one(args, video: str, session_id: str, log_path: str) -> dict:
+    """Corre en el worker: procesa un video con la salida redirigida a su log."""
+    from main import process_video
+    
+    start = time.perf_counter()
+    result = {"source": video, "session_id": session_id, "log": log_path, "worker_pid": os.getpid()}
+    with open(log_path, "w") as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            result.update(process_video(args, video, pose_tracker=_pose_tracker, session_id=session_id))
+            result["status"] = "ok"
+        except Exception as e:
+            traceback.print_exc()
+            result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    result["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def _analyze_segment(args, video: str, segment: dict, fps: float, records_dir: str) -> dict:
+    """Corre en el worker: pose + ángulos + HAR de [warm_start, end) con IDs locales, a disco en records_dir."""
+    from processors.angle_calculator import AngleCalculator
+    from processors.har_detector import HARDetector
+    from processors.inference_stride import AdaptiveStride
+    from processors.pipeline import FramePipeline
+    from processors.segments import SegmentCapture, SegmentRecorder, NullVideoWriter
+    
+    _pose_tracker.reset()
+    stride = None
+    if args.stride > 1:
+        stride = AdaptiveStride(args.stride, fill=args.stride_fill, motion_budget=args.motion_budget)
+    cap = SegmentCapture(video, segment["warm_start"], segment["end"] - segment["warm_start"])
+    recorder = SegmentRecorder(records_dir, segment, fps)
+    pipeline = FramePipeline(cap, _pose_tracker, AngleCalculator(), HARDetector(fps=fps),
+                             recorder, NullVideoWriter(), batch_size=args.batch_size, stride=stride)
+    pipeline.frame_number = segment["warm_start"]
+    pipeline.run(threaded=args.pipeline)
+    recorder.finalize()
+    cap.release()
+    return {"segment": segment, "blocks": recorder.blocks, "ids": list(recorder.ids),
+            "stages": pipeline.stats_dict()}
+
+
+def _render_segment(args, video: str, result: dict, mapping: dict, fps: float, parts_dir: str,
+                    session_id: str) -> str:
+    """Corre en el worker: dibuja los tracks con IDs globales y codifica el tramo."""
+    from processors.overlay import OverlayRenderer
+    from processors.video_exporter import VideoExporter
+    from processors.segments import SegmentCapture, exported_records
+    
+    segment = result["segment"]
+    exporter = VideoExporter(output_dir=parts_dir, fps=fps, backend=args.video_backend, preset=args.preset,
+                             crf=args.crf, session_id=f"{session_id}_part{segment['index']:03d}")
+    cap = SegmentCapture(video, segment["start"], segment["end"] - segment["start"])
+    renderer = OverlayRenderer(draw_angles=args.draw_angles)
+    with contextlib.redirect_stdout(sys.stderr):
+        for record in exported_records(result, mapping):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            renderer.draw(frame, record["tracks"], record["actions"], record["angles"])
+            exporter.write_frame(frame)
+        path = exporter.finalize()
+    cap.release()
+    return path
+
+
+def process_segmented(pool, args, video: str, session_id: str) -> dict:
+    """Un video en segmentos paralelos: análisis, unión de IDs, export continuo y render."""
+    import cv2
+    from main import create_data_exporter, upload_outputs
+    from processors.segments import plan_segments, stitch_segments, exported_records, concat_videos
+    
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise IOError(f"No se pudo abrir la fuente de video: {video}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    
+    times = {}
+    start = time.perf_counter()
+    plan = plan_segments(total, args.segments, int(round(args.overlap * fps)))
+    records_dir = Path(args.output_dir) / f".{session_id}_segments"
+    records_dir.mkdir(parents=True, exist_ok=True)
+    results = list(pool.map(_analyze_segment,
+                            *zip(*[(args, video, segment, fps, str(records_dir)) for segment in plan])))
+    times["analyze_s"] = time.perf_counter() - start
+    
+    t0 = time.perf_counter()
+    mappings, stitch = stitch_segments(results)
+    times["stitch_s"] = time.perf_counter() - t0
+    
+    # El render (workers) corre mientras el proceso principal exporta los chunks
+    t0 = time.perf_counter()
+    parts_dir = Path(args.video_output_dir) / f".{session_id}_parts"
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    renders = [pool.submit(_render_segment, args, video, result, mappings[result["segment"]["index"]],
+                           fps, str(parts_dir), session_id) for result in results]
+    
+    data_exporter, packer = create_data_exporter(args, fps, session_id)
+    frames = 0
+    for result in results:
+        for record in exported_records(result, mappings[result["segment"]["index"]]):
+            data_exporter.add_frame_data(record["frame"], record["tracks"], record["angles"], record["actions"],
+                                         interpolated=record["interpolated"])
+            frames += 1
+    data_exporter.finalize()
+    if packer:
+        packer.finalize()
+    times["export_s"] = time.perf_counter() - t0
+    
+    parts = [future.result() for future in renders]
+    video_path = concat_videos([p for p in parts if p], Path(args.video_output_dir) / f"{session_id}_processed.mp4")
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    shutil.rmtree(records_dir, ignore_errors=True)
+    data_exporter.manifest.add_video(video_path, fps)
+    times["render_s"] = time.perf_counter() - t0
+    
+    upload_stats = None
+    if args.upload != "none" or args.stream_upload:
+        from processors.s3_uploader import S3Uploader
+        upload_stats = upload_outputs(args, S3Uploader(), data_exporter, packer, video_path)
+    
+    wall = time.perf_counter() - start
+    return {
+        "source": video,
+        "session_id": session_id,
+        "frames": frames,
+        "wall_s": round(wall, 3),
+        "fps": round(frames / wall, 2) if wall else 0.0,
+        "segments": [{**r["segment"], **stitch[r["segment"]["index"]],
+                      "inference_busy_s": r["stages"]["inference"]["busy_s"]} for r in results],
+        "stages": {name: round(value, 3) for name, value in times.items()},
+        "export": data_exporter.stats(),
+        "upload": upload_stats,
+        "video": video_path,
+        "manifest": str(data_exporter.manifest.path),
+    }
+
+
+def _session_id(video: Path, run_id: str, used: set) -> str:
+    """Prefijo de salida único por video: nombre del archivo + lote (+ sufijo si se repite)."""
+    base = f"{video.stem}_{run_id}"
+    session_id, n = base, 1
+    while session_id in used:
+        n += 1
+        session_id = f"{base}_{n}"
+    used.add(session_id)
+    return session_id
+
+
+def main():
+    args = parse_args()
+    args.headless = True
+    cpus = os.cpu_count() or 1
+    workers = max(1, args.workers)
+    threads = args.threads_per_worker or max(1, cpus // workers)
+    
+    videos = collect_videos(args.inputs, args.pattern)
+    if not videos:
+        print("No se encontraron videos.")
+        sys.exit(1)
+    
+    from main import cleanup_outputs, backend_options
+    if args.cleanup in ("before", "always"):
+        cleanup_outputs(args.output_dir, confirm=False)
+    log_dir = Path(args.output_dir) / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    
+    options = backend_options(args, str(videos[0]))
+    if args.inference_backend != "torch":
+        # Exportar (y calibrar) una sola vez: los workers cargan la exportación en cache
+        from common.inference_backend import export_model
+        export_model(args.model, args.inference_backend, int8=args.int8, calibration=options["calibration"],
+                     export_dir=args.model_export_dir)
+    
+    print(f"{len(videos)} videos, {workers} workers x {threads} hilos")
+    used, results = set(), []
+    started = datetime.now()
+    run_id = started.strftime("%Y%m%d_%H%M%S")
+    start = time.perf_counter()
+    
+    # spawn: los workers no heredan el estado de hilos de torch del padre
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(args.model, threads, options)) as pool:
+        futures = {}
+        for video in videos if args.segments > 1 else []:
+            # Un video a la vez: todos los workers trabajan sobre sus segmentos
+            session_id = _session_id(video, run_id, used)
+            try:
+                result = {**process_segmented(pool, args, str(video), session_id), "status": "ok"}
+            except Exception as e:
+                traceback.print_exc()
+                result = {"source": str(video), "session_id": session_id,
+                          "status": "failed", "error": f"{type(e).__name__}: {e}"}
+            results.append(result)
+            detail = f"{result['frames']} frames, {result['fps']} fps" if result["status"] == "ok" else result["error"]
+            print(f"[{len(results)}/{len(videos)}] {result['status']:<6} {video.name}: {detail}")
+        
+        for video in videos if args.segments <= 1 else []:
+            session_id = _session_id(video, run_id, used)
+            log_path = str(log_dir / f"{session_id}.log")
+            futures[pool.submit(_process_one, args, str(video), session_id, log_path)] = (video, session_id, log_path)
+        
+        try:
+            for future in as_completed(futures):
+                video, session_id, log_path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:  # worker caído (ej. BrokenProcessPool por falta de memoria)
+                    result = {"source": str(video), "session_id": session_id, "log": log_path,
+                              "status": "failed", "error": f"{type(e).__name__}: {e}"}
+                results.append(result)
+                detail = f"{result['frames']} frames, {result['fps']} fps" if result["status"] == "ok" else result["error"]
+                print(f"[{len(results)}/{len(videos)}] {result['status']:<6} {video.name}: {detail}")
+        except KeyboardInterrupt:
+            print("Interrumpido: cancelando videos pendientes...")
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    wall = time.perf_counter() - start
+    ok = [r for r in results if r["status"] == "ok"]
+    frames = sum(r["frames"] for r in ok)
+    report = {
+        "started": started.isoformat(timespec="seconds"),
+        "wall_s": round(wall, 3),
+        "workers": workers,
+        "threads_per_worker": threads,
+        "videos": len(videos),
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "not_run": len(videos) - len(results),
+        "frames": frames,
+        "fps": round(frames / wall, 2) if wall else 0.0,
+        "results": sorted(results, key=lambda r: r["source"]),
+    }
+    report_path = Path(args.report or Path(args.output_dir) / f"batch_{run_id}.json")
+    report_path.write_text(json.dumps(report, indent=2))
+    
+    if args.cleanup in ("after", "always"):
+        cleanup_outputs(args.output_dir, confirm=False)
+    
+    print(json.dumps({k: v for k, v in report.items() if k != "results"}))
+    print(f"Reporte: {report_path}")
+    sys.exit(0 if len(ok) == len(videos) else 1)
+
+
+if __name__ == "__main__":
+    main()
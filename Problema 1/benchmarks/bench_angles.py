@@ -0,0 +1,76 @@
+"""
+Benchmark: AngleCalculator por track (loop escalar original) vs calculate_batch.
+Uso: python benchmarks/bench_angles.py [--tracks 1 5 10 30 100] [--repeats 200]
+"""
+import sys
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from processors.angle_calculator import AngleCalculator
+
+
+def legacy_calculate(calc: AngleCalculator, keypoints: np.ndarray) -> dict:
+    """Implementación original: loop Python sobre ANGLE_DEFINITIONS con vectores 2D."""
+    angles = {}
+    for angle_name, (p1_name, vertex_name, p2_name) in calc.ANGLE_DEFINITIONS.items():
+        p1 = keypoints[calc.KP[p1_name]]
+        vertex = keypoints[calc.KP[vertex_name]]
+        p2 = keypoints[calc.KP[p2_name]]
+        
+        if p1[2] < calc.min_confidence or vertex[2] < calc.min_confidence or p2[2] < calc.min_confidence:
+            angles[angle_name] = None
+            continue
+        
+        v1 = p1[:2] - vertex[:2]
+        v2 = p2[:2] - vertex[:2]
+        cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2) + 1e-6)
+        cos_angle = np.clip(cos_angle, -1.0, 1.0)
+        angles[angle_name] = round(np.degrees(np.arccos(cos_angle)), 1)
+    return angles
+
+
+def random_keypoints(n_tracks: int, rng) -> np.ndarray:
+    kpts = np.empty((n_tracks, 17, 3), dtype=np.float32)
+    kpts[..., :2] = rng.uniform(0, 1920, size=(n_tracks, 17, 2))
+    kpts[..., 2] = rng.uniform(0, 1, size=(n_tracks, 17))
+    return kpts
+
+
+def timeit(fn, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tracks", type=int, nargs="+", default=[1, 5, 10, 30, 100])
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+    
+    calc = AngleCalculator()
+    rng = np.random.default_rng(0)
+    
+    print(f"{'tracks':>6}  {'loop_us':>9}  {'batch_us':>9}  {'speedup':>7}  max_diff")
+    for n_tracks in args.tracks:
+        kpts = random_keypoints(n_tracks, rng)
+        
+        loop_t = timeit(lambda: [legacy_calculate(calc, k) for k in kpts], args.repeats)
+        batch_t = timeit(lambda: calc.calculate_batch(kpts), args.repeats)
+        
+        # Paridad contra el cálculo original
+        angles, valid = calc.calculate_batch(kpts)
+        legacy = [legacy_calculate(calc, k) for k in kpts]
+        expected = np.array([[np.nan if d[n] is None else d[n] for n in calc.ANGLE_NAMES] for d in legacy])
+        assert np.array_equal(np.isnan(expected), ~valid)
+        max_diff = np.max(np.abs(expected[valid] - angles[valid]), initial=0.0)
+        
+        print(f"{n_tracks:>6}  {loop_t * 1e6:>9.1f}  {batch_t * 1e6:>9.1f}  {loop_t / batch_t:>6.1f}x  {max_diff:.2f}")
+
+
+if __name__ == "__main__":
+    main()
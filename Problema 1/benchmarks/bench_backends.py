@@ -0,0 +1,143 @@
+"""
+Benchmark: latencia y throughput en CPU por backend de inferencia, con paridad contra PyTorch.
+Uso: python benchmarks/bench_backends.py video.mp4 [--model yolov8n-pose.pt] [--frames 100]
+                                         [--backends torch onnx openvino] [--int8] [--check]
+
+Por backend se mide la latencia de la red (result.speed["inference"], p50/p95),
+los fps de predict de punta a punta (pre + red + NMS) y de track con batch 1.
+La paridad compara las detecciones de cada backend con las de PyTorch en los
+mismos frames: recall de cajas (IoU > 0.5) y error medio de cajas y keypoints
+en píxeles. Con --check termina con error si un backend FP32 se aparta de
+PyTorch más de --tolerance píxeles o pierde detecciones (INT8 sólo se reporta).
+La primera corrida de cada backend incluye la exportación (queda en --export-dir).
+"""
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from common.inference_backend import BACKENDS, EXPORT_DIR, load_model
+
+
+def load_frames(path: str, max_frames: int) -> list:
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def detections(result) -> tuple:
+    """Returns: (cajas xyxy (n, 4), keypoints (n, 17, 3) o None)."""
+    boxes = result.boxes.xyxy.cpu().numpy()
+    kpts = result.keypoints.data.cpu().numpy() if result.keypoints is not None else None
+    return boxes, kpts
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def parity(reference: list, candidate: list) -> dict:
+    """Empareja detecciones por IoU (greedy) frame a frame contra la referencia PyTorch."""
+    matched = total = extra = 0
+    box_err, kpt_err = [], []
+    for (ref_boxes, ref_kpts), (boxes, kpts) in zip(reference, candidate):
+        total += len(ref_boxes)
+        extra += max(len(boxes) - len(ref_boxes), 0)
+        if not len(ref_boxes) or not len(boxes):
+            continue
+        iou = iou_matrix(ref_boxes, boxes)
+        for i in np.argsort(-iou.max(axis=1)):
+            j = int(np.argmax(iou[i]))
+            if iou[i, j] <= 0.5:
+                continue
+            iou[:, j] = -1  # cada detección se empareja una sola vez
+            matched += 1
+            box_err.append(np.abs(ref_boxes[i] - boxes[j]).mean())
+            if ref_kpts is not None and kpts is not None:
+                visible = ref_kpts[i, :, 2] > 0.5
+                if visible.any():
+                    kpt_err.append(np.linalg.norm(ref_kpts[i, visible, :2] - kpts[j, visible, :2], axis=1).mean())
+    return {
+        "recall": matched / total if total else 1.0,
+        "extra": extra,
+        "box_px": float(np.mean(box_err)) if box_err else 0.0,
+        "kpt_px": float(np.mean(kpt_err)) if kpt_err else 0.0,
+    }
+
+
+def run(model, frames: list) -> tuple:
+    """Returns: (latencias de red ms, fps predict, fps track, detecciones por frame)."""
+    model.predict(frames[0], verbose=False)  # warm-up (compilación / primer forward)
+    latencies, outputs = [], []
+    start = time.perf_counter()
+    for frame in frames:
+        result = model.predict(frame, verbose=False)[0]
+        latencies.append(result.speed["inference"])
+        outputs.append(detections(result))
+    predict_fps = len(frames) / (time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    for frame in frames:
+        model.track(frame, persist=True, verbose=False)
+    track_fps = len(frames) / (time.perf_counter() - start)
+    return np.array(latencies), predict_fps, track_fps, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video")
+    parser.add_argument("--model", default="yolov8n-pose.pt")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--int8", action="store_true", help="Agregar las variantes INT8 de onnx/openvino")
+    parser.add_argument("--export-dir", default=EXPORT_DIR)
+    parser.add_argument("--check", action="store_true", help="Fallar si FP32 no coincide con PyTorch")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Error máximo FP32 en píxeles")
+    args = parser.parse_args()
+    
+    frames = load_frames(args.video, args.frames)
+    print(f"{len(frames)} frames {frames[0].shape[1]}x{frames[0].shape[0]}, modelo {args.model}, "
+          f"{cv2.getNumberOfCPUs()} CPUs")
+    variants = [(b, False) for b in args.backends]
+    if args.int8:
+        variants += [(b, True) for b in args.backends if b != "torch"]
+    # PyTorch FP32 siempre primero: es la referencia de paridad
+    variants = [("torch", False)] + [v for v in variants if v != ("torch", False)]
+    
+    print(f"{'backend':<14}{'red p50':>9}{'red p95':>9}{'predict fps':>13}{'track fps':>11}"
+          f"{'recall':>8}{'extra':>7}{'caja px':>9}{'kpt px':>8}")
+    reference, failed = None, []
+    for backend, int8 in variants:
+        model = load_model(args.model, backend, int8=int8, calibration=args.video, export_dir=args.export_dir)
+        latencies, predict_fps, track_fps, outputs = run(model, frames)
+        if reference is None:
+            reference = outputs
+        p = parity(reference, outputs)
+        name = f"{backend}{'-int8' if int8 else ''}"
+        print(f"{name:<14}{np.percentile(latencies, 50):>9.1f}{np.percentile(latencies, 95):>9.1f}"
+              f"{predict_fps:>13.1f}{track_fps:>11.1f}{p['recall']:>8.3f}{p['extra']:>7}"
+              f"{p['box_px']:>9.2f}{p['kpt_px']:>8.2f}")
+        if not int8 and (p["recall"] < 0.99 or p["box_px"] > args.tolerance or p["kpt_px"] > args.tolerance):
+            failed.append(name)
+    
+    if args.check and failed:
+        print(f"Sin paridad con PyTorch: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: cv2.VideoCapture vs FFmpegCapture (pool de buffers) en decode.
+Uso: python benchmarks/bench_decoder.py video.mp4 [--frames 600] [--hold 24] [--width 640]
+
+Cada decoder corre en un proceso aparte (RSS limpio). Se decodifica
+reteniendo los últimos --hold frames vivos, como las colas del pipeline, y se mide:
+- fps de decode (sin tracemalloc)
+- MB/s alocados durante read() (tracemalloc, pasada aparte)
+- page faults menores por frame (memoria nueva tocada)
+- RSS pico del proceso
+"""
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tracemalloc
+from collections import deque
+from pathlib import Path
+import cv2
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from common.ffmpeg_capture import FFmpegCapture
+
+
+def open_decoder(decoder: str, video: str, hold: int, width: int):
+    if decoder == "ffmpeg":
+        return FFmpegCapture(video, pool_size=hold + 2, width=width)
+    cap = cv2.VideoCapture(video)
+    return ResizedCapture(cap, width) if width else cap
+
+
+def decode(cap, frames: int, hold: int, trace: bool = False) -> tuple:
+    """Returns: (frames leídos, segundos, bytes alocados en read())."""
+    held = deque()
+    release = getattr(cap, "release_frame", None)
+    allocated = count = 0
+    start = time.perf_counter()
+    while count < frames:
+        if trace:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        ret, frame = cap.read()
+        if trace:
+            allocated += max(tracemalloc.get_traced_memory()[1] - before, 0)
+        if not ret:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        held.append(frame)
+        if len(held) > hold:
+            oldest = held.popleft()
+            if release is not None:
+                release(oldest)
+        count += 1
+    elapsed = time.perf_counter() - start
+    while held and release is not None:
+        release(held.popleft())
+    return count, elapsed, allocated
+
+
+def child(args):
+    cap = open_decoder(args.child, args.video, args.hold, args.width)
+    decode(cap, 30, args.hold)  # warm-up (pool y buffers internos)
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    count, seconds, _ = decode(cap, args.frames, args.hold)
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults
+    tracemalloc.start()
+    traced, _, allocated = decode(cap, min(args.frames, 200), args.hold, trace=True)
+    tracemalloc.stop()
+    cap.release()
+    print(json.dumps({
+        "fps": round(count / seconds, 1),
+        "alloc_mb_s": round(allocated / 1024 ** 2 / traced * count / seconds, 1),
+        "alloc_kb_frame": round(allocated / 1024 / traced, 1),
+        "faults_frame": round(faults / count, 1),
+        "rss_peak_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+class ResizedCapture:
+    """cv2.VideoCapture + cv2.resize al ancho pedido (lo que haría el repo sin escalado en el decoder)."""
+    
+    def __init__(self, cap, width: int):
+        self.cap = cap
+        src_w, src_h = cap.get(cv2.CAP_PROP_FRAME_WIDTH), cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        self.size = (width, int(round(src_h * width / src_w / 2)) * 2)
+    
+    def read(self):
+        ret, frame = self.cap.read()
+        return (ret, cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)) if ret else (ret, frame)
+    
+    def get(self, prop):
+        return self.cap.get(prop)
+    
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+    
+    def release(self):
+        self.cap.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--hold", type=int, default=24, help="Frames retenidos a la vez (profundidad del pipeline)")
+    parser.add_argument("--width", type=int, default=None, help="Escalar a este ancho")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+    
+    cap = cv2.VideoCapture(args.video)
+    print(f"{args.video}: {int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}, "
+          f"{args.frames} frames, hold {args.hold}" + (f", ancho {args.width}" if args.width else ""))
+    cap.release()
+    print(f"{'decoder':<9}{'fps':>8}{'MB/s alocados':>15}{'KB/frame':>10}{'faults/frame':>14}{'RSS pico MB':>13}")
+    for decoder in ("opencv", "ffmpeg"):
+        cmd = [sys.executable, __file__, args.video, "--frames", str(args.frames), "--hold", str(args.hold),
+               "--child", decoder] + (["--width", str(args.width)] if args.width else [])
+        r = json.loads(subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1])
+        print(f"{decoder:<9}{r['fps']:>8}{r['alloc_mb_s']:>15}{r['alloc_kb_frame']:>10}"
+              f"{r['faults_frame']:>14}{r['rss_peak_mb']:>13}")
+
+
+if __name__ == "__main__":
+    main()
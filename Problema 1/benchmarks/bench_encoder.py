@@ -0,0 +1,72 @@
+"""
+Benchmark: tamaño y tiempo de encode de VideoExporter (OpenCV mp4v vs ffmpeg H.264).
+Uso:
+    python benchmarks/bench_encoder.py [video.mp4] [--frames 150] [--presets ultrafast veryfast medium]
+"""
+import io
+import sys
+import time
+import contextlib
+import argparse
+import tempfile
+import cv2
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from processors.video_exporter import VideoExporter
+
+
+DEFAULT_VIDEO = Path(__file__).resolve().parent.parent / "inputs" / "Video_de_Tracking_y_Ángulos_Corporales.mp4"
+
+
+def read_frames(path: str, limit: int) -> tuple:
+    cap = cv2.VideoCapture(str(path))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames, fps
+
+
+def encode(frames: list, fps: float, out_dir: str, **kwargs) -> tuple:
+    """Returns: (segundos bloqueando al productor, segundos hasta finalize, bytes)."""
+    exporter = VideoExporter(output_dir=out_dir, fps=fps, **kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for frame in frames:
+            exporter.write_frame(frame)
+        producer = time.perf_counter() - start
+        path = exporter.finalize()
+        total = time.perf_counter() - start
+    return producer, total, Path(path).stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", nargs="?", default=str(DEFAULT_VIDEO))
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--presets", nargs="+", default=["ultrafast", "veryfast", "medium"])
+    parser.add_argument("--crf", type=int, default=23)
+    args = parser.parse_args()
+    
+    frames, fps = read_frames(args.video, args.frames)
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} frames {w}x{h} @ {fps:.1f} fps")
+    
+    configs = [("opencv", {"backend": "opencv"})]
+    configs += [(f"ffmpeg {p} crf={args.crf}", {"backend": "ffmpeg", "preset": p, "crf": args.crf})
+                for p in args.presets]
+    
+    print(f"{'encoder':<28}{'size MB':>10}{'producer ms':>14}{'total ms':>12}{'enc fps':>10}")
+    for name, kwargs in configs:
+        with tempfile.TemporaryDirectory() as out_dir:
+            producer, total, size = encode(frames, fps, out_dir, **kwargs)
+        print(f"{name:<28}{size / 1e6:>10.2f}{producer * 1000:>14.0f}{total * 1000:>12.0f}{len(frames) / total:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: tamaño y tiempo de escritura de DataExporter por formato (JSON vs binario).
+Uso:
+    python benchmarks/bench_export.py [--seconds 30] [--persons 5]
+    python benchmarks/bench_export.py --session output/   # re-exporta JSONs reales
+"""
+import io
+import sys
+import json
+import time
+import contextlib
+import argparse
+import tempfile
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from processors.data_exporter import DataExporter
+from processors.angle_calculator import AngleCalculator
+from processors.track_batch import TrackBatch
+from processors import chunk_format
+
+
+FORMATS = [("json", None), ("binary", None), ("binary", "zlib"), ("binary", "lzma")]
+
+
+def synthetic_frames(seconds: int, persons: int, fps: float):
+    """Genera (frame_number, tracks, angles, actions) con poses aleatorias."""
+    rng = np.random.default_rng(0)
+    calc = AngleCalculator()
+    for frame_number in range(int(seconds * fps)):
+        kpts = np.empty((persons, 17, 3), dtype=np.float32)
+        kpts[..., :2] = rng.uniform(0, 1280, size=(persons, 17, 2))
+        kpts[..., 2] = rng.uniform(0, 1, size=(persons, 17))
+        tracks = TrackBatch(np.arange(1, persons + 1), rng.uniform(0, 1280, (persons, 4)), kpts)
+        angles = calc.calculate_tracks(tracks)
+        actions = ["standing"] * persons
+        yield frame_number, tracks, angles, actions
+
+
+def session_frames(session_dir: str):
+    """Re-lee una sesión JSON existente en el formato de entrada de add_frame_data."""
+    files = sorted(Path(session_dir).glob("*_second_*.json"))
+    fps = json.loads(files[0].read_text())["fps"] if files else 30.0
+    frames = []
+    for path in files:
+        for frame in json.loads(path.read_text())["frames"]:
+            persons = frame["persons"]
+            keypoints = np.full((len(persons), 17, 3), np.nan, dtype=np.float32)
+            for i, p in enumerate(persons):
+                if p["keypoints"] is not None:
+                    keypoints[i] = p["keypoints"]
+            tracks = TrackBatch([p["id"] for p in persons], [p["bbox"] for p in persons], keypoints)
+            angles = np.array([[np.nan if p["angles"].get(name) is None else p["angles"][name]
+                                for name in AngleCalculator.ANGLE_NAMES] for p in persons]).reshape(len(persons), -1)
+            actions = [p["action"] for p in persons]
+            frames.append((frame["frame"], tracks, angles, actions))
+    return frames, fps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--session", help="Directorio con JSONs de una sesión real")
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--persons", type=int, default=5)
+    parser.add_argument("--fps", type=float, default=30.0)
+    args = parser.parse_args()
+    
+    if args.session:
+        frames, fps = session_frames(args.session)
+    else:
+        fps = args.fps
+        frames = list(synthetic_frames(args.seconds, args.persons, fps))
+    print(f"{len(frames)} frames\n")
+    print(f"{'formato':<14} {'bytes':>12} {'ratio':>7} {'write_ms':>9} {'read_ms':>8}")
+    
+    json_bytes = None
+    for fmt, codec in FORMATS:
+        with tempfile.TemporaryDirectory() as tmp:
+            exporter = DataExporter(output_dir=tmp, fps=fps, format=fmt, compression=codec)
+            with contextlib.redirect_stdout(io.StringIO()):  # sin el print por archivo
+                for frame in frames:
+                    exporter.add_frame_data(*frame)
+                exporter.finalize()
+            
+            start = time.perf_counter()
+            for path in Path(tmp).glob("*_second_*"):
+                if fmt == "json":
+                    json.loads(path.read_bytes())
+                else:
+                    chunk_format.read_chunk(path)
+            read_time = time.perf_counter() - start
+        
+        json_bytes = json_bytes or exporter.bytes_written
+        name = fmt if codec is None else f"{fmt}+{codec}"
+        print(f"{name:<14} {exporter.bytes_written:>12} {json_bytes / exporter.bytes_written:>6.1f}x"
+              f" {exporter.write_time * 1000:>9.1f} {read_time * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: throughput de PoseTracker (frames/s) según batch size.
+Uso: python benchmarks/bench_pose_batch.py video.mp4 [--frames 300] [--batch-sizes 1 2 4 8 16]
+
+Los frames se decodifican antes de medir, así sólo se mide inferencia + tracking.
+También verifica que los IDs de cada batch size coincidan con el modo frame a frame.
+"""
+import sys
+import time
+import argparse
+import cv2
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from processors.pose_tracker import PoseTracker
+
+
+def load_frames(path: str, max_frames: int) -> list:
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def run(frames: list, batch_size: int, model: str):
+    """Procesa todos los frames con un tracker nuevo. Returns: (fps, ids por frame)."""
+    tracker = PoseTracker(model)
+    # Warm-up fuera de la medición (carga de pesos, primer forward)
+    tracker.model.predict(frames[0], verbose=False)
+    
+    ids = []
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        # copy(): PoseTracker dibuja sobre el frame de entrada
+        chunk = [f.copy() for f in frames[i:i + batch_size]]
+        outputs = tracker.process_batch(chunk) if batch_size > 1 else [tracker.process(chunk[0])]
+        ids.extend(tracks.ids.tolist() for _, tracks in outputs)
+    elapsed = time.perf_counter() - start
+    return len(frames) / elapsed, ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("video")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--model", default="yolov8n-pose.pt")
+    args = parser.parse_args()
+    
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        print(f"Error: No se pudo leer: {args.video}")
+        sys.exit(1)
+    
+    print(f"{len(frames)} frames de {args.video}\n")
+    print(f"{'batch':>5}  {'fps':>8}  {'speedup':>7}  ids_match")
+    
+    baseline_fps, baseline_ids = None, None
+    for batch_size in args.batch_sizes:
+        fps, ids = run(frames, batch_size, args.model)
+        if baseline_fps is None:
+            baseline_fps, baseline_ids = fps, ids
+        print(f"{batch_size:>5}  {fps:>8.1f}  {fps / baseline_fps:>6.2f}x  {ids == baseline_ids}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: costo por frame del overlay (antes: putText + result.plot() + etiqueta HAR; ahora: OverlayRenderer).
+Uso:
+    python benchmarks/bench_render.py [video.mp4] [--frames 100] [--persons 1 4 10]
+
+Las personas son sintéticas (bbox + 17 keypoints) para no depender de un
+modelo entrenado; el camino "antes" arma un Results de ultralytics con ellas
+para medir result.plot() tal como se usaba en PoseTracker.
+"""
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+import torch
+from pathlib import Path
+from ultralytics.engine.results import Results
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from processors.overlay import OverlayRenderer
+from processors.angle_calculator import AngleCalculator
+from processors.track_batch import TrackBatch
+
+
+DEFAULT_VIDEO = Path(__file__).resolve().parent.parent / "inputs" / "Video_de_Tracking_y_Ángulos_Corporales.mp4"
+
+
+def read_frames(path: str, limit: int) -> list:
+    cap = cv2.VideoCapture(str(path))
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def synthetic_tracks(persons: int, width: int, height: int, seed: int = 0) -> TrackBatch:
+    rng = np.random.default_rng(seed)
+    x1 = rng.uniform(0, width - 200, (persons, 1))
+    y1 = rng.uniform(60, height - 400, (persons, 1))
+    kpts = np.ones((persons, 17, 3), dtype=np.float32)
+    kpts[..., 0] = x1 + rng.uniform(0, 150, (persons, 17))
+    kpts[..., 1] = y1 + np.sort(rng.uniform(0, 380, (persons, 17)), axis=1)
+    kpts[..., 2] = rng.choice([0.3, 0.9], (persons, 17), p=[0.1, 0.9])
+    bboxes = np.concatenate([kpts[..., :2].min(1), kpts[..., :2].max(1)], axis=1)
+    return TrackBatch(np.arange(1, persons + 1), bboxes, kpts)
+
+
+def legacy_render(frame, tracks: TrackBatch, actions: list):
+    """Camino anterior: ID sobre el frame, copia anotada de result.plot() y etiqueta de HAR."""
+    boxes = torch.tensor(np.column_stack([tracks.bboxes, tracks.ids, np.full(len(tracks), 0.9), np.zeros(len(tracks))]))
+    keypoints = torch.tensor(tracks.keypoints)
+    result = Results(frame, path="", names={0: "person"}, boxes=boxes, keypoints=keypoints)
+    for track_id, bbox in zip(tracks.ids.tolist(), tracks.bboxes):
+        x1, y1 = int(bbox[0]), int(bbox[1])
+        cv2.putText(frame, f"ID:{track_id}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    annotated = result.plot()
+    for label, bbox in zip(actions, tracks.bboxes):
+        x1, y1 = int(bbox[0]), int(bbox[1])
+        (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+        cv2.rectangle(annotated, (x1, y1 - 50), (x1 + w + 10, y1 - 25), (0, 0, 0), -1)
+        cv2.putText(annotated, label, (x1 + 5, y1 - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+    return annotated
+
+
+def measure(frames: list, fn) -> float:
+    """Returns: ms por frame (sobre copias, para no acumular dibujos)."""
+    frames = [f.copy() for f in frames]
+    start = time.perf_counter()
+    for frame in frames:
+        fn(frame)
+    return (time.perf_counter() - start) / len(frames) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", nargs="?", default=str(DEFAULT_VIDEO))
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--persons", type=int, nargs="+", default=[1, 4, 10])
+    args = parser.parse_args()
+    
+    frames = read_frames(args.video, args.frames)
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} frames {w}x{h}")
+    print(f"{'personas':>9}{'antes ms':>10}{'overlay ms':>12}{'+ ángulos':>11}{'off ms':>8}")
+    calculator = AngleCalculator()
+    for persons in args.persons:
+        tracks = synthetic_tracks(persons, w, h)
+        actions = ["walking"] * len(tracks)
+        angles = calculator.calculate_tracks(tracks)
+        plain, with_angles = OverlayRenderer(), OverlayRenderer(draw_angles=True)
+        legacy_render(frames[0].copy(), tracks, actions)  # warm-up de ultralytics
+        before = measure(frames, lambda f: legacy_render(f, tracks, actions))
+        after = measure(frames, lambda f: plain.draw(f, tracks, actions))
+        after_angles = measure(frames, lambda f: with_angles.draw(f, tracks, actions, angles))
+        off = measure(frames, lambda f: None)
+        print(f"{persons:>9}{before:>10.2f}{after:>12.2f}{after_angles:>11.2f}{off:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: escalado del procesamiento en segmentos paralelos (batch.py --segments).
+Uso:
+    python benchmarks/bench_segments.py video.mp4 [--workers 1 2 4 8] [--overlap 9]
+
+Corre batch.py con N segmentos y N workers para cada N y compara el wall time
+contra N=1 (pipeline normal). El speedup ideal es N; el solape (warm-up que se
+procesa dos veces) y el render/export secuencial lo acotan.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def run(video: str, workers: int, overlap: float, model: str, out: str) -> dict:
+    report = Path(out) / f"report_{workers}.json"
+    subprocess.run([sys.executable, str(ROOT / "batch.py"), video,
+                    "--segments", str(workers), "--workers", str(workers), "--overlap", str(overlap),
+                    "--model", model, "--upload", "none", "--cleanup", "never",
+                    "--output-dir", str(Path(out) / f"data_{workers}"),
+                    "--video-output-dir", str(Path(out) / f"video_{workers}"),
+                    "--report", str(report)],
+                   cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return json.loads(report.read_text())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--overlap", type=float, default=9.0)
+    parser.add_argument("--model", default="yolov8n-pose.pt")
+    args = parser.parse_args()
+    
+    print(f"CPUs: {os.cpu_count()}")
+    print(f"{'workers':>8}{'wall s':>9}{'fps':>8}{'speedup':>9}{'eficiencia':>12}")
+    base = None
+    with tempfile.TemporaryDirectory() as out:
+        for workers in args.workers:
+            report = run(str(Path(args.video).resolve()), workers, args.overlap, args.model, out)
+            wall = report["results"][0]["wall_s"]
+            base = base or wall
+            print(f"{workers:>8}{wall:>9.2f}{report['fps']:>8.2f}{base / wall:>9.2f}{base / wall / workers:>12.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark: precisión vs velocidad de la inferencia cada k frames (AdaptiveStride).
+Uso:
+    python benchmarks/bench_stride.py video.mp4 [otro.mp4] [--frames 240] [--strides 1 2 4 8]
+
+Velocidad: FramePipeline completo (headless) con cada stride máximo.
+Precisión: con la salida frame a frame como referencia se simula el stride
+(keyframes = referencia, resto interpolado) y se mide el error de keypoints en px.
+Si el modelo no detecta personas (ej. pesos sin entrenar) la referencia son
+trayectorias de puntos del video seguidas con optical flow (Lucas-Kanade),
+agrupadas de a 17 como pseudo-personas: mismo movimiento real, sin modelo.
+"""
+import io
+import sys
+import contextlib
+import argparse
+import tempfile
+import cv2
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from processors.pose_tracker import PoseTracker
+from processors.har_detector import HARDetector
+from processors.angle_calculator import AngleCalculator
+from processors.data_exporter import DataExporter
+from processors.video_exporter import VideoExporter
+from processors.pipeline import FramePipeline
+from processors.inference_stride import AdaptiveStride
+from processors.track_batch import TrackBatch
+
+
+class _FrameSource:
+    """cv2.VideoCapture acotado a N frames."""
+    
+    def __init__(self, path: str, limit: int):
+        self.cap = cv2.VideoCapture(path)
+        self.left = limit
+    
+    def read(self):
+        if self.left <= 0:
+            return False, None
+        self.left -= 1
+        return self.cap.read()
+
+
+def run_pipeline(video: str, frames: int, fps: float, max_stride: int, model: str) -> tuple:
+    """Returns: (fps, segundos de inferencia, tracks por frame, stats del stride)."""
+    tracker = PoseTracker(model)
+    stride = AdaptiveStride(max_stride) if max_stride > 1 else None
+    reference = []
+    with tempfile.TemporaryDirectory() as out, contextlib.redirect_stdout(io.StringIO()):
+        pipeline = FramePipeline(_FrameSource(video, frames), tracker, AngleCalculator(), HARDetector(fps),
+                                 DataExporter(out, fps), VideoExporter(out, fps), stride=stride)
+        tracker.model.predict(np.zeros((64, 64, 3), np.uint8), verbose=False)  # warm-up
+        processed = pipeline.run(on_frame=lambda p: reference.append(p["tracks"]))
+        pipeline.data_exporter.finalize()
+        pipeline.video_exporter.finalize()
+    return (processed / pipeline.wall_time, pipeline.stats["inference"].busy, reference,
+            stride.stats() if stride else None)
+
+
+def flow_reference(video: str, frames: int, persons: int = 4) -> list:
+    """Pseudo-tracks: puntos seguidos con LK en todo el tramo, de a 17 por persona."""
+    cap = cv2.VideoCapture(video)
+    ok, frame = cap.read()
+    prev = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    points = cv2.goodFeaturesToTrack(prev, persons * 17 * 4, 0.01, 10)
+    history, alive = [points[:, 0]], np.ones(len(points), dtype=bool)
+    for _ in range(frames - 1):
+        ok, frame = cap.read()
+        if not ok:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        points, status, _ = cv2.calcOpticalFlowPyrLK(prev, gray, points, None)
+        alive &= status[:, 0] == 1
+        history.append(points[:, 0])
+        prev = gray
+    cap.release()
+    
+    # Los puntos que más se mueven son los interesantes (personas)
+    history = np.stack(history)[:, alive]
+    motion = np.abs(np.diff(history, axis=0)).sum(axis=(0, 2))
+    chosen = np.argsort(-motion)[:persons * 17]
+    chosen = chosen[np.argsort(history[0, chosen, 0])][:len(chosen) // 17 * 17]
+    groups = chosen.reshape(-1, 17)
+    reference = []
+    for positions in history:
+        kpts = np.ones((len(groups), 17, 3), dtype=np.float32)
+        kpts[..., :2] = positions[groups]
+        bboxes = np.concatenate([kpts[..., :2].min(1), kpts[..., :2].max(1)], axis=1)
+        reference.append(TrackBatch(np.arange(1, len(groups) + 1), bboxes, kpts))
+    return reference
+
+
+def simulate(reference: list, max_stride: int, fill: str, motion_budget: float) -> dict:
+    """Aplica AdaptiveStride sobre la referencia. Returns: keyframes y error de keypoints (px)."""
+    stride = AdaptiveStride(max_stride, fill=fill, motion_budget=motion_budget)
+    errors, i = [], 0
+    while i < len(reference):
+        group = list(range(i, min(i + stride.k, len(reference))))
+        key = group[stride.key_index]
+        others = [f for f in group if f != key]
+        filled = stride.step(key, reference[key], others)
+        for f, tracks in zip(others, filled):
+            truth = reference[f]
+            rows = truth.index(tracks.ids)
+            both = (rows >= 0) & tracks.has_keypoints
+            both[both] &= truth.has_keypoints[rows[both]]
+            diff = tracks.keypoints[both, :, :2] - truth.keypoints[rows[both], :, :2]
+            errors.extend(np.linalg.norm(diff, axis=2).ravel())
+        i = group[-1] + 1
+    errors = np.array(errors) if errors else np.zeros(1)
+    return {
+        "inferred": stride.keyframes / len(reference),
+        "mean_stride": stride.stats()["mean_stride"],
+        "err_mean": float(errors.mean()),
+        "err_p95": float(np.percentile(errors, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--frames", type=int, default=240)
+    parser.add_argument("--strides", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--budgets", type=float, nargs="+", default=[0.02, 0.05, 0.1])
+    parser.add_argument("--model", default="yolov8n-pose.pt")
+    args = parser.parse_args()
+    
+    for video in args.videos:
+        cap = cv2.VideoCapture(video)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        print(f"\n=== {Path(video).name} ({args.frames} frames @ {fps:.0f} fps)")
+        
+        print(f"{'max k':>6}{'fps':>8}{'infer s':>9}{'mean k':>8}")
+        reference = None
+        for max_stride in args.strides:
+            speed, infer_s, tracks, stats = run_pipeline(video, args.frames, fps, max_stride, args.model)
+            if max_stride == 1:
+                reference = tracks
+            print(f"{max_stride:>6}{speed:>8.1f}{infer_s:>9.2f}{(stats or {}).get('mean_stride', 1.0):>8.2f}")
+        
+        source = "modelo"
+        if reference is None or not any(len(tracks) for tracks in reference):
+            reference, source = flow_reference(video, args.frames), "optical flow"
+        print(f"\nPrecisión (referencia: {source}, error de keypoints en frames rellenados, px)")
+        print(f"{'fill':<12}{'max k':>6}{'budget':>8}{'inferido':>10}{'mean k':>8}{'err px':>8}{'p95 px':>8}")
+        for fill in AdaptiveStride.FILLS:
+            for max_stride in args.strides[1:]:
+                for budget in args.budgets:
+                    r = simulate(reference, max_stride, fill, budget)
+                    print(f"{fill:<12}{max_stride:>6}{budget:>8.2f}{r['inferred']:>10.0%}{r['mean_stride']:>8.2f}"
+                          f"{r['err_mean']:>8.2f}{r['err_p95']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Benchmark: KeypointTracker (IoU + OKS) vs trackers de ultralytics: cambios de ID y costo por frame.
+Uso:
+    python benchmarks/bench_tracker.py [video.mp4 ...] [--persons 1 5 10 30 60] [--frames 300] [--strides 1 4]
+    python benchmarks/bench_tracker.py video.mp4 --model yolov8n-pose.pt   # + model.track vs predict + tracker
+
+Se comparan el tracker por defecto de model.track (TrackTrack en ultralytics
+8.4, BoT-SORT en versiones anteriores), BoT-SORT y KeypointTracker. Todos
+reciben exactamente las mismas detecciones, con IDs reales conocidos, así los
+cambios de ID (IDSW, definición MOT: un objeto real pasa a otro ID de tracker)
+son exactos:
+- Escenas sintéticas: personas (esqueleto COCO) que caminan y se cruzan a
+  distintas profundidades; la más cercana tapa a las de atrás (detección
+  perdida o de confianza baja), más ruido de keypoints y pérdidas al azar.
+- Videos: trayectorias de puntos del video seguidas con optical flow
+  (Lucas-Kanade), agrupadas de a 17 como pseudo-personas (movimiento real).
+Con stride k los trackers sólo ven uno de cada k frames (inferencia salteada):
+KeypointTracker recibe el número de frame, los de ultralytics no.
+
+Con --model además se corre el camino real sobre cada video: model.track vs
+predict + KeypointTracker (PoseTracker(tracker="keypoint")). Sin
+IDs reales se reporta un proxy: pares de tracks en frames consecutivos que se
+corresponden sin ambigüedad (mejor IoU mutuo >= 0.5) pero cambian de ID.
+"""
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+from pathlib import Path
+from ultralytics.cfg import get_cfg
+from ultralytics.engine.results import Boxes
+from ultralytics.trackers.track import TRACKER_MAP
+from ultralytics.utils import YAML, IterableSimpleNamespace
+from ultralytics.utils.checks import check_yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from processors.pose_tracker import PoseTracker
+from common.keypoint_tracker import KeypointTracker, bbox_iou
+
+
+# Esqueleto COCO de pie en unidades de altura: (x respecto del centro, y desde la cabeza)
+SKELETON = np.array([[0, .06], [-.03, .04], [.03, .04], [-.06, .05], [.06, .05], [-.15, .2], [.15, .2],
+                     [-.2, .35], [.2, .35], [-.22, .5], [.22, .5], [-.1, .52], [.1, .52],
+                     [-.1, .75], [.1, .75], [-.1, .97], [.1, .97]], dtype=np.float32)
+SWING = np.array([0, 0, 0, 0, 0, 0, 0, 1, -1, 1, -1, 0, 0, -.6, .6, -1, 1], dtype=np.float32) * .08
+
+# Config de ultralytics (.yaml) o kwargs de KeypointTracker
+TRACKERS = {
+    **{Path(cfg).stem: cfg for cfg in dict.fromkeys([get_cfg().tracker, "botsort.yaml"])},
+    "keypoint": {},
+    "keypoint greedy": {"matcher": "greedy"},
+    "iou (sin OKS)": {"oks_weight": 0},
+}
+
+
+def walking_scene(persons: int, frames: int, seed: int = 0, size: tuple = (1920, 1080)) -> list:
+    """Returns: por frame (gt_ids, bboxes, scores, keypoints) de las personas detectadas."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    feet = rng.uniform(height * 0.4, height, persons)  # más abajo = más cerca = más alta
+    tall = 0.12 * height + 0.25 * feet
+    x = rng.uniform(0, width, persons)
+    vx = rng.choice([-1, 1], persons) * rng.uniform(1.5, 5, persons)
+    phase = rng.uniform(0, 2 * np.pi, persons)
+    ids = np.arange(1, persons + 1)
+    scene = []
+    for _ in range(frames):
+        x += vx
+        vx[(x < 0) | (x > width)] *= -1
+        phase += np.abs(vx) / tall * 4
+        kpts = np.empty((persons, 17, 3), dtype=np.float32)
+        kpts[..., 0] = x[:, None] + (SKELETON[:, 0] + SWING * np.sin(phase)[:, None]) * tall[:, None]
+        kpts[..., 1] = (feet - tall)[:, None] + SKELETON[:, 1] * tall[:, None]
+        kpts[..., :2] += rng.normal(0, 0.01, (persons, 17, 2)) * tall[:, None, None]
+        kpts[..., 2] = rng.uniform(0.6, 1, (persons, 17))
+        bboxes = np.concatenate([kpts[..., :2].min(1), kpts[..., :2].max(1)], axis=1)
+        bboxes += np.array([-.05, -.03, .05, .03]) * tall[:, None]
+        
+        # Oclusión: fracción de la caja tapada por la persona más cercana que la pisa
+        lt = np.maximum(bboxes[:, None, :2], bboxes[None, :, :2])
+        rb = np.minimum(bboxes[:, None, 2:], bboxes[None, :, 2:])
+        inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+        covered = np.where(feet[None, :] > feet[:, None], inter, 0).max(axis=1, initial=0)
+        covered /= np.prod(bboxes[:, 2:] - bboxes[:, :2], axis=1)
+        scores = np.clip(0.9 - covered + rng.normal(0, 0.05, persons), 0.05, 0.95)
+        kpts[..., 2] *= (1 - covered)[:, None]
+        seen = (covered < 0.7) & (rng.random(persons) > 0.03)
+        scene.append((ids[seen], bboxes[seen], scores[seen], kpts[seen]))
+    return scene
+
+
+def flow_scene(video: str, frames: int, persons: int = 6, seed: int = 0) -> list:
+    """Pseudo-personas de 17 puntos seguidos con LK (IDs reales = grupo), con ruido y pérdidas."""
+    rng = np.random.default_rng(seed)
+    cap = cv2.VideoCapture(video)
+    ok, frame = cap.read()
+    prev = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    points = cv2.goodFeaturesToTrack(prev, persons * 17 * 4, 0.01, 10)
+    history, alive = [points[:, 0]], np.ones(len(points), dtype=bool)
+    for _ in range(frames - 1):
+        ok, frame = cap.read()
+        if not ok:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        points, status, _ = cv2.calcOpticalFlowPyrLK(prev, gray, points, None)
+        alive &= status[:, 0] == 1
+        history.append(points[:, 0])
+        prev = gray
+    cap.release()
+    
+    # Los puntos que más se mueven, agrupados por cercanía en x del primer frame
+    history = np.stack(history)[:, alive]
+    motion = np.abs(np.diff(history, axis=0)).sum(axis=(0, 2))
+    chosen = np.argsort(-motion)[:persons * 17]
+    groups = chosen[np.argsort(history[0, chosen, 0])][:len(chosen) // 17 * 17].reshape(-1, 17)
+    ids = np.arange(1, len(groups) + 1)
+    scene = []
+    for positions in history:
+        kpts = np.empty((len(groups), 17, 3), dtype=np.float32)
+        kpts[..., :2] = positions[groups] + rng.normal(0, 1.5, (len(groups), 17, 2))
+        kpts[..., 2] = rng.uniform(0.6, 1, (len(groups), 17))
+        bboxes = np.concatenate([kpts[..., :2].min(1) - 5, kpts[..., :2].max(1) + 5], axis=1)
+        scores = rng.uniform(0.3, 0.95, len(groups))
+        seen = rng.random(len(groups)) > 0.05
+        scene.append((ids[seen], bboxes[seen], scores[seen], kpts[seen]))
+    return scene
+
+
+def ultralytics_tracker(config: str):
+    """Tracker de ultralytics con la config de model.track; sin imagen no hay compensación de cámara (GMC)."""
+    cfg = IterableSimpleNamespace(**YAML.load(check_yaml(config)))
+    cfg.gmc_method = "none"
+    return TRACKER_MAP[cfg.tracker_type](args=cfg)
+
+
+def run_tracker(name: str, scene: list, stride: int) -> dict:
+    """Returns: {idsw, ids, coverage, ms} sobre los frames f % stride == 0."""
+    options = TRACKERS[name]
+    tracker = ultralytics_tracker(options) if isinstance(options, str) else KeypointTracker(**options)
+    last, switches, matched, total, busy = {}, 0, 0, 0, 0.0
+    seen_ids = set()
+    for f in range(0, len(scene), stride):
+        gt_ids, bboxes, scores, kpts = scene[f]
+        start = time.perf_counter()
+        if isinstance(options, str):
+            data = np.column_stack([bboxes, scores, np.zeros(len(bboxes))]).astype(np.float32)
+            out = tracker.update(Boxes(data, (1080, 1920)), None).reshape(-1, 8)
+            ids = np.full(len(bboxes), -1)
+            ids[out[:, 7].astype(int)] = out[:, 4].astype(int)
+        else:
+            ids = tracker.update(bboxes, scores, kpts, frame=f)
+        busy += time.perf_counter() - start
+        total += len(gt_ids)
+        for gt, track_id in zip(gt_ids.tolist(), ids.tolist()):
+            if track_id < 0:
+                continue
+            matched += 1
+            seen_ids.add(track_id)
+            switches += gt in last and last[gt] != track_id
+            last[gt] = track_id
+    calls = len(range(0, len(scene), stride))
+    return {"idsw": switches, "ids": len(seen_ids), "coverage": matched / max(total, 1),
+            "ms": busy * 1000 / calls}
+
+
+def compare(scene: list, strides: list):
+    print(f"  {'tracker':<17}{'ms/frame':>9}" + "".join(f"{f'IDSW k={k}':>10}{'IDs':>5}{'cob.':>6}" for k in strides))
+    for name in TRACKERS:
+        results = [run_tracker(name, scene, k) for k in strides]
+        print(f"  {name:<17}{results[0]['ms']:>9.2f}"
+              + "".join(f"{r['idsw']:>10}{r['ids']:>5}{r['coverage']:>6.0%}" for r in results))
+
+
+def proxy_switches(outputs: list) -> int:
+    """Pares (t-1, t) con mejor IoU mutuo >= 0.5 y distinto ID."""
+    switches = 0
+    for prev, cur in zip(outputs, outputs[1:]):
+        if not len(prev) or not len(cur):
+            continue
+        iou = bbox_iou(prev.bboxes, cur.bboxes)
+        best_cur, best_prev = iou.argmax(axis=1), iou.argmax(axis=0)
+        for i, j in enumerate(best_cur):
+            if best_prev[j] == i and iou[i, j] >= 0.5 and prev.ids[i] != cur.ids[j]:
+                switches += 1
+    return switches
+
+
+def run_model(video: str, model: str, frames: int, stride: int):
+    print(f"  {'tracker':<10}{'fps':>7}{'tracks/frame':>14}{'IDs':>6}{'IDSW proxy':>12}")
+    for tracker in PoseTracker.TRACKERS:
+        pose = PoseTracker(model, tracker=tracker)
+        cap = cv2.VideoCapture(video)
+        outputs, f = [], 0
+        start = time.perf_counter()
+        while f < frames:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if f % stride == 0:
+                outputs.append(pose.process(frame, f)[1])
+            f += 1
+        elapsed = time.perf_counter() - start
+        cap.release()
+        ids = {i for tracks in outputs for i in tracks.ids.tolist()}
+        print(f"  {tracker:<10}{len(outputs) / elapsed:>7.1f}{np.mean([len(t) for t in outputs]):>14.1f}"
+              f"{len(ids):>6}{proxy_switches(outputs):>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="*")
+    parser.add_argument("--persons", type=int, nargs="+", default=[1, 5, 10, 30, 60])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--strides", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--model", default=None, help="Pesos de pose para comparar model.track vs predict + tracker")
+    args = parser.parse_args()
+    
+    for persons in args.persons:
+        print(f"\n=== Escena sintética: {persons} personas, {args.frames} frames")
+        compare(walking_scene(persons, args.frames), args.strides)
+    for video in args.videos:
+        print(f"\n=== {Path(video).name}: pseudo-personas por optical flow, {args.frames} frames")
+        compare(flow_scene(video, args.frames), args.strides)
+        if args.model:
+            for stride in args.strides:
+                print(f"\n--- {Path(video).name} con {args.model}, k={stride}")
+                run_model(video, args.model, args.frames, stride)
+
+
+if __name__ == "__main__":
+    main()
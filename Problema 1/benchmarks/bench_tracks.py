@@ -0,0 +1,196 @@
+"""
+Benchmark: tracks como lista de dicts (antes) vs TrackBatch (struct-of-arrays) por etapa.
+Uso: python benchmarks/bench_tracks.py [--persons 1 5 10 30 60] [--frames 120] [--fps 30]
+
+Personas sintéticas que caminan (random walk), empaquetadas en un Results de
+ultralytics como los que devuelve track(). Por cantidad de personas se mide,
+en µs por frame:
+- extract: Results -> tracks (PoseTracker._build_output)
+- angles: AngleCalculator.calculate_tracks
+- har: HARDetector.process (estado temporal + clasificación)
+- json / binary: add_frame_data + serialización del chunk de 1 s
+El camino "antes" es el código dict por persona previo a TrackBatch, copiado
+acá en forma compacta; la columna "=" verifica que el JSON sea idéntico.
+"""
+import sys
+import time
+import json
+import argparse
+import numpy as np
+import torch
+from pathlib import Path
+from ultralytics.engine.results import Results
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from processors.track_batch import TrackBatch
+from processors.angle_calculator import AngleCalculator
+from processors.har_detector import HARDetector
+from processors.data_exporter import DataExporter, convert_to_serializable
+from processors import chunk_format
+
+
+STAGES = ("extract", "angles", "har", "json", "binary")
+
+
+def synthetic_results(persons: int, frames: int, seed: int = 0) -> list:
+    """Results con boxes (xyxy, id, conf, cls) y keypoints (n, 17, 3) por frame."""
+    rng = np.random.default_rng(seed)
+    kpts = np.empty((persons, 17, 3), dtype=np.float32)
+    kpts[..., 0] = rng.uniform(0, 1700, (persons, 1)) + rng.uniform(0, 150, (persons, 17))
+    kpts[..., 1] = rng.uniform(0, 600, (persons, 1)) + np.sort(rng.uniform(0, 380, (persons, 17)), axis=1)
+    image = np.zeros((8, 8, 3), dtype=np.uint8)
+    results = []
+    for _ in range(frames):
+        kpts[..., :2] += rng.normal(0, 3, (persons, 1, 2)).astype(np.float32)
+        kpts[..., 2] = rng.uniform(0.2, 1, (persons, 17))
+        boxes = np.column_stack([kpts[..., :2].min(1), kpts[..., :2].max(1), np.arange(1, persons + 1),
+                                 np.full(persons, 0.9), np.zeros(persons)])
+        results.append(Results(image, path="", names={0: "person"},
+                               boxes=torch.tensor(boxes, dtype=torch.float32), keypoints=torch.tensor(kpts)))
+    return results
+
+
+# --- Camino anterior (dict por persona) ---
+
+def legacy_extract(result) -> list:
+    tracks = []
+    if result.boxes.id is not None:
+        ids = result.boxes.id.int().cpu().numpy()
+        bboxes = result.boxes.xyxy.cpu().numpy()
+        keypoints = result.keypoints.data.cpu().numpy() if result.keypoints is not None else None
+        for i, track_id in enumerate(ids):
+            tracks.append({"id": int(track_id), "bbox": bboxes[i],
+                           "keypoints": keypoints[i] if keypoints is not None else None})
+    return tracks
+
+
+def legacy_angles(calc: AngleCalculator, tracks: list) -> dict:
+    result = {track["id"]: {} for track in tracks}
+    valid_tracks = [t for t in tracks if t["keypoints"] is not None]
+    if valid_tracks:
+        angles, valid = calc.calculate_batch(np.stack([t["keypoints"] for t in valid_tracks]))
+        for i, track in enumerate(valid_tracks):
+            result[track["id"]] = calc.to_dict(angles[i], valid[i])
+    return result
+
+
+def legacy_har(har: HARDetector, tracks: list) -> dict:
+    actions = {}
+    har.pose_buffers.tick()
+    for track in tracks:
+        har._add_to_buffer(track["id"], track["keypoints"])
+        is_moving = har._analyze_temporal(track["id"]).get("is_moving", False)
+        actions[track["id"]] = har.classify_batch(track["keypoints"][None], [is_moving])[0]
+    return actions
+
+
+def legacy_frame(frame_number: int, fps: float, tracks: list, angles: dict, actions: dict) -> dict:
+    return {"frame": frame_number, "timestamp_ms": int((frame_number / fps) * 1000),
+            "persons": [{"id": t["id"], "bbox": t["bbox"], "keypoints": t["keypoints"],
+                         "angles": angles.get(t["id"], {}), "action": actions.get(t["id"], "unknown")}
+                        for t in tracks]}
+
+
+def legacy_json(meta: dict, frames: list) -> bytes:
+    return json.dumps(convert_to_serializable({**meta, "frames": frames}), indent=2).encode("utf-8")
+
+
+def legacy_binary(meta: dict, frames: list) -> bytes:
+    persons = [p for f in frames for p in f["persons"]]
+    n = len(persons)
+    angle_names = list(dict.fromkeys(name for p in persons for name in p["angles"] or {}))
+    actions = {action: i for i, action in enumerate(dict.fromkeys(p["action"] for p in persons))}
+    keypoints = np.full((n, 17, 3), np.nan, dtype=np.float32)
+    angles = np.full((n, len(angle_names)), np.nan, dtype=np.float32)
+    for i, person in enumerate(persons):
+        if person["keypoints"] is not None:
+            keypoints[i] = person["keypoints"]
+        for j, name in enumerate(angle_names):
+            value = (person["angles"] or {}).get(name)
+            if value is not None:
+                angles[i, j] = value
+    arrays = {
+        "frames": np.array([f["frame"] for f in frames], dtype=np.int32),
+        "timestamps_ms": np.array([f["timestamp_ms"] for f in frames], dtype=np.int64),
+        "person_offsets": np.cumsum([0] + [len(f["persons"]) for f in frames], dtype=np.int32),
+        "track_ids": np.array([p["id"] for p in persons], dtype=np.int32),
+        "bboxes": np.array([p["bbox"] for p in persons], dtype=np.float32).reshape(n, 4),
+        "keypoints": keypoints,
+        "angles": angles,
+        "actions": np.array([actions[p["action"]] for p in persons], dtype=np.uint8),
+        "interpolated": np.zeros(len(frames), dtype=bool),
+    }
+    return chunk_format.pack_arrays({"version": chunk_format.VERSION, **meta, "angle_names": angle_names,
+                                     "actions": list(actions)}, arrays)
+
+
+# --- Medición ---
+
+def run(results: list, fps: float, legacy: bool) -> tuple:
+    """Returns: ({etapa: µs por frame}, bytes del JSON del primer segundo)."""
+    calc, har = AngleCalculator(), HARDetector(fps=fps)
+    exporter = DataExporter.__new__(DataExporter)  # sólo _serialize, sin directorio ni manifest
+    exporter.fps, exporter.session_id, exporter.compression = fps, "bench", None
+    meta = {"session_id": "bench", "second": 0, "fps": fps}
+    times = dict.fromkeys(STAGES, 0.0)
+    buffer, first_json = [], None
+    for frame_number, result in enumerate(results):
+        t0 = time.perf_counter()
+        tracks = legacy_extract(result) if legacy else TrackBatch.from_result(result)
+        t1 = time.perf_counter()
+        angles = legacy_angles(calc, tracks) if legacy else calc.calculate_tracks(tracks)
+        t2 = time.perf_counter()
+        actions = legacy_har(har, tracks) if legacy else har.process(None, tracks)[1]
+        t3 = time.perf_counter()
+        if legacy:
+            buffer.append(legacy_frame(frame_number, fps, tracks, angles, actions))
+        else:
+            buffer.append({"frame": frame_number, "timestamp_ms": int((frame_number / fps) * 1000),
+                           "tracks": tracks, "angles": angles, "actions": actions})
+        add = time.perf_counter() - t3
+        times["extract"] += t1 - t0
+        times["angles"] += t2 - t1
+        times["har"] += t3 - t2
+        if len(buffer) < fps and frame_number < len(results) - 1:
+            times["json"] += add
+            times["binary"] += add
+            continue
+        
+        # Fin del segundo: serializar el chunk en los dos formatos
+        for fmt in ("json", "binary"):
+            t0 = time.perf_counter()
+            if legacy:
+                data = legacy_json(meta, buffer) if fmt == "json" else legacy_binary(meta, buffer)
+            else:
+                exporter.format = fmt
+                data = exporter._serialize(0, buffer)
+            times[fmt] += add + time.perf_counter() - t0
+            if fmt == "json" and first_json is None:
+                first_json = data
+        buffer = []
+    return {stage: seconds / len(results) * 1e6 for stage, seconds in times.items()}, first_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, nargs="+", default=[1, 5, 10, 30, 60])
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--fps", type=int, default=30)
+    args = parser.parse_args()
+    
+    print(f"{args.frames} frames @ {args.fps} fps, µs por frame (antes / TrackBatch)")
+    print(f"{'personas':>8}" + "".join(f"{stage:>18}" for stage in STAGES) + f"{'total':>18}{'=':>3}")
+    for persons in args.persons:
+        results = synthetic_results(persons, args.frames)
+        run(results[:args.fps], args.fps, legacy=True)  # warm-up
+        run(results[:args.fps], args.fps, legacy=False)
+        before, before_json = run(results, args.fps, legacy=True)
+        after, after_json = run(results, args.fps, legacy=False)
+        cells = [f"{before[s]:>8.0f} /{after[s]:>7.0f}" for s in STAGES]
+        total = f"{sum(before.values()):>8.0f} /{sum(after.values()):>7.0f}"
+        print(f"{persons:>8}" + "".join(f"{c:>18}" for c in cells) + f"{total:>18}"
+              f"{'ok' if before_json == after_json else 'NO':>3}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Chequeo del modo streaming de S3Uploader contra un S3 simulado (moto).
+
+Encola chunks chicos y un archivo multipart, inyecta un error transitorio en
+el primer intento de cada objeto (y de la primera parte multipart) y verifica
+después de drain() que todas las keys existen con su tamaño, que no quedan
+multipart uploads abiertos y que una segunda pasada se omite por el manifest.
+Un error permanente (bucket inexistente) debe fallar sin reintentar, y un
+multipart cortado se reanuda contando cada parte una sola vez (subida o
+reanudada).
+Uso:
+    python benchmarks/check_s3_stream.py [--files 20] [--big-mb 11]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+import boto3
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from processors.s3_uploader import S3Uploader
+
+BUCKET = "uploader-check"
+PREFIX = "session/"
+
+
+class FlakyClient:
+    """Cliente boto3 que falla (503 SlowDown) la primera llamada de cada objeto o parte."""
+    
+    FLAKY = ("put_object", "upload_part")
+    
+    def __init__(self, client):
+        self.client = client
+        self.failures = 0
+        self._seen = set()
+        self._lock = threading.Lock()
+    
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        if name not in self.FLAKY:
+            return method
+        
+        def call(**kwargs):
+            target = (name, kwargs["Key"], kwargs.get("PartNumber"))
+            with self._lock:
+                first = target not in self._seen
+                self._seen.add(target)
+                if first and (name == "put_object" or kwargs["PartNumber"] == 1):
+                    self.failures += 1
+                    raise ClientError({"Error": {"Code": "SlowDown", "Message": "inyectado"}}, name)
+            return method(**kwargs)
+        return call
+
+
+class CountingClient:
+    """Cliente boto3 que cuenta las llamadas a put_object."""
+    
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+    
+    def __getattr__(self, name):
+        if name == "put_object":
+            self.calls += 1
+        return getattr(self.client, name)
+
+
+class BrokenPartClient:
+    """Cliente boto3 cuya parte 2 falla siempre (simula un corte a mitad del multipart)."""
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        if name != "upload_part":
+            return method
+        
+        def call(**kwargs):
+            if kwargs["PartNumber"] == 2:
+                raise ClientError({"Error": {"Code": "SlowDown", "Message": "corte"}}, name)
+            return method(**kwargs)
+        return call
+
+
+def make_files(directory: Path, count: int, big_mb: int) -> dict:
+    """Returns: {ruta: tamaño} con count chunks JSON y un archivo de big_mb MB."""
+    files = {}
+    for i in range(count):
+        path = directory / f"chunk_{i:04d}.json"
+        path.write_text(json.dumps({"second": i, "frames": list(range(i % 7 * 50))}))
+        files[path] = path.stat().st_size
+    big = directory / "session_video.mp4"
+    big.write_bytes(os.urandom(big_mb * 2**20))
+    files[big] = big.stat().st_size
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--big-mb", type=int, default=11, help="Tamaño del archivo multipart (partes de 5 MB)")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    
+    try:
+        from moto import mock_aws
+    except ImportError:
+        print("Requiere moto: pip install moto")
+        sys.exit(1)
+    for var, value in (("AWS_ACCESS_KEY_ID", "testing"), ("AWS_SECRET_ACCESS_KEY", "testing"),
+                       ("AWS_DEFAULT_REGION", "us-east-1")):
+        os.environ.setdefault(var, value)
+    
+    failed = []
+    with mock_aws(), tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        config = tmp / "config.json"
+        config.write_text(json.dumps({"s3": {"bucket": BUCKET, "prefix": PREFIX,
+                                             "manifest": str(tmp / "manifest.json"),
+                                             "multipart_threshold_mb": 5, "part_size_mb": 5}}))
+        data_dir = tmp / "data"
+        data_dir.mkdir()
+        files = make_files(data_dir, args.files, args.big_mb)
+        
+        client = FlakyClient(s3)
+        uploader = S3Uploader(str(config), client=client)
+        uploader.start_streaming(max_workers=args.workers, max_retries=2, backoff=0.01)
+        for path in files:
+            uploader.enqueue(path)
+        result = uploader.drain()
+        print(f"drain: {result}, errores inyectados: {client.failures}")
+        
+        if result["uploaded"] != len(files) or result["failed"]:
+            failed.append(f"subidos {result['uploaded']}/{len(files)}, fallidos {result['failed']}")
+        if client.failures != len(files):
+            failed.append(f"se esperaba un reintento por archivo: {client.failures} errores para {len(files)}")
+        # Las partes del reintento ya las subió este proceso: ninguna cuenta como reanudada
+        total = sum(files.values())
+        if result["uploaded_bytes"] != total or result["resumed_bytes"]:
+            failed.append(f"bytes: {result['uploaded_bytes']} subidos + {result['resumed_bytes']} reanudados, "
+                          f"se esperaban {total} + 0")
+        for path, size in files.items():
+            try:
+                remote = s3.head_object(Bucket=BUCKET, Key=PREFIX + path.name)["ContentLength"]
+            except ClientError:
+                failed.append(f"falta s3://{BUCKET}/{PREFIX}{path.name}")
+                continue
+            if remote != size:
+                failed.append(f"{path.name}: {remote} bytes en S3, {size} locales")
+        open_uploads = s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", [])
+        if open_uploads:
+            failed.append(f"{len(open_uploads)} multipart uploads abiertos")
+        
+        # Segunda pasada: el manifest omite todo sin tocar S3
+        uploader = S3Uploader(str(config), client=client)
+        uploader.start_streaming(max_workers=args.workers, max_retries=2, backoff=0.01)
+        for path in files:
+            uploader.enqueue(path)
+        result = uploader.drain()
+        print(f"segunda pasada: {result}")
+        if result["skipped_files"] != len(files) or result["uploaded_bytes"]:
+            failed.append(f"segunda pasada: {result['skipped_files']}/{len(files)} omitidos, "
+                          f"{result['uploaded_bytes']} bytes subidos")
+        
+        # Multipart cortado en la parte 2 y reanudado por otro uploader (otro proceso)
+        resume = data_dir / "resume_video.mp4"
+        resume.write_bytes(os.urandom(args.big_mb * 2**20))
+        size, part = resume.stat().st_size, 5 * 2**20
+        S3Uploader(str(config), client=BrokenPartClient(s3)).upload_file(str(resume))
+        uploader = S3Uploader(str(config), client=s3)
+        ok = uploader.upload_file(str(resume))
+        stats = uploader.stats
+        print(f"reanudación: {stats}")
+        second = min(part, size - part)
+        if not ok or stats["uploaded_bytes"] != second or stats["resumed_bytes"] != size - second:
+            failed.append(f"reanudación: {stats['uploaded_bytes']} subidos + {stats['resumed_bytes']} reanudados, "
+                          f"se esperaban {second} + {size - second}")
+        
+        # Error permanente: NoSuchBucket falla al primer intento, sin backoff
+        missing = tmp / "missing.json"
+        missing.write_text(json.dumps({"s3": {"bucket": "uploader-missing", "prefix": PREFIX, "manifest": None}}))
+        counting = CountingClient(s3)
+        uploader = S3Uploader(str(missing), client=counting)
+        ok = uploader.upload_file(str(next(iter(files))), retries=3)
+        print(f"bucket inexistente: {'subido' if ok else 'falló'}, {counting.calls} intentos")
+        if ok or counting.calls != 1:
+            failed.append(f"bucket inexistente: se esperaba 1 intento fallido, hubo {counting.calls}")
+    
+    if failed:
+        print("FALLÓ:\n  " + "\n  ".join(failed))
+        sys.exit(1)
+    print(f"OK: {len(files)} archivos subidos con reintento y verificados en S3")
+
+
+if __name__ == "__main__":
+    main()
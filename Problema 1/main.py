@@ -1,13 +1,19 @@
 """
 Procesamiento de video: Pose Estimation + HAR + Tracking + Angles + Export + S3
-Uso: python main.py [video.mp4]
+Uso: python main.py [video.mp4] [--batch-size N] [--pipeline] [--data-format json|binary]
+     python main.py video.mp4 --headless --upload none --cleanup never --summary run.json
+     python main.py video.mp4 --pose-cache cache/poses   # re-corridas sin decode ni inferencia
 
 Variables de entorno para S3:
 - AWS_ACCESS_KEY_ID
 - AWS_SECRET_ACCESS_KEY
 - AWS_REGION (default: us-east-1)
 """
+import os
 import sys
+import json
+import signal
+import argparse
 import cv2
 import shutil
 from pathlib import Path
@@ -17,30 +23,150 @@ from processors.angle_calculator import AngleCalculator
 from processors.data_exporter import DataExporter
 from processors.video_exporter import VideoExporter
 from processors.s3_uploader import S3Uploader
+from processors.pipeline import FramePipeline
+from processors.inference_stride import AdaptiveStride
+from processors.async_writer import AsyncWriter
+from processors.bundle_packer import BundlePacker, bundle_files, EXTENSION as BUNDLE_EXTENSION
+from processors.session_manifest import SUFFIX as MANIFEST_SUFFIX
+from processors.pose_cache import PoseCache
+from processors.segments import NullVideoWriter
+from processors.overlay import OverlayRenderer
+from processors.profiler import StackSampler, LiveStats, write_stats, FOLDED_SUFFIX
+from common.inference_backend import BACKENDS, EXPORT_DIR
+from common.latency_tuner import LatencyTuner, PrefetchedCapture, DEFAULT_SIZES, model_variant, measure_config
+from common.ffmpeg_capture import FFmpegCapture
 
 
 OUTPUT_DIR = "output"
 VIDEO_OUTPUT_DIR = "video_outputs"
+# Frames por inferencia en archivos: 1 hasta que bench_pose_batch.py muestre ganancia con otro valor
+DEFAULT_BATCH_SIZE = 1
 
 
-def get_video_source():
+def add_processing_args(parser):
+    """Opciones de procesamiento compartidas con batch.py."""
+    parser.add_argument("--model", default="yolov8n-pose.pt", help="Pesos YOLOv8-Pose")
+    parser.add_argument("--inference-backend", choices=list(BACKENDS), default="torch",
+                        help="Runtime de la red en CPU (onnx/openvino: se exporta una vez a --model-export-dir)")
+    parser.add_argument("--int8", action="store_true",
+                        help="Cuantización INT8 con --inference-backend onnx u openvino")
+    parser.add_argument("--calibration", default=None,
+                        help="Video para calibrar INT8 (default: el video a procesar)")
+    parser.add_argument("--model-export-dir", default=EXPORT_DIR,
+                        help="Directorio de los modelos exportados por backend")
+    parser.add_argument("--latency-target", type=float, default=0,
+                        help="Presupuesto de inferencia en ms por frame: autotuner de variante e imgsz (0 = no)")
+    parser.add_argument("--fps-target", type=float, default=0,
+                        help="Igual que --latency-target, expresado en fps (0 = no)")
+    parser.add_argument("--tune-variants", nargs="+", default=[],
+                        help="Escalas extra que puede elegir el tuner (ej: s m; default: sólo --model)")
+    parser.add_argument("--tune-sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Resoluciones de inferencia que puede elegir el tuner")
+    parser.add_argument("--tune-hysteresis", type=float, default=0.15,
+                        help="Margen relativo alrededor del presupuesto antes de cambiar de configuración")
+    parser.add_argument("--tune-frames", type=int, default=16,
+                        help="Frames de la fuente para la calibración inicial del tuner")
+    parser.add_argument("--tracker", choices=list(PoseTracker.TRACKERS), default="ultralytics",
+                        help="Tracking: el de model.track de ultralytics o KeypointTracker (IoU + OKS, fuera del modelo)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Frames por inferencia en archivos (1 = frame a frame)")
+    parser.add_argument("--stride", type=int, default=1,
+                        help="Inferir pose cada k frames como máximo (k adaptativo, 1 = todos)")
+    parser.add_argument("--stride-fill", choices=list(AdaptiveStride.FILLS), default="interpolate",
+                        help="Relleno de frames salteados (webcam: siempre predict)")
+    parser.add_argument("--motion-budget", type=float, default=0.05,
+                        help="Movimiento tolerado entre keyframes (altos de bbox) antes de bajar k")
+    parser.add_argument("--decoder", choices=["opencv", "ffmpeg"], default="opencv",
+                        help="Decodificación de archivos/URLs (ffmpeg: subproceso + pool fijo de buffers)")
+    parser.add_argument("--decode-threads", type=int, default=0,
+                        help="Hilos del decoder con --decoder ffmpeg (0 = automático)")
+    parser.add_argument("--decode-width", type=int, default=None,
+                        help="Escalar en el decoder a este ancho con --decoder ffmpeg (datos y video en esa escala)")
+    parser.add_argument("--frame-pool", type=int, default=0,
+                        help="Buffers del pool con --decoder ffmpeg (0 = según batch y --pipeline)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Decode/inference/analytics/encode en hilos separados")
+    parser.add_argument("--data-format", choices=list(DataExporter.EXTENSIONS), default="json",
+                        help="Formato de los chunks por segundo")
+    parser.add_argument("--compression", choices=["zlib", "lzma"], default=None,
+                        help="Codec del formato binario")
+    parser.add_argument("--async-export", action="store_true",
+                        help="Escribir los chunks en un hilo de fondo")
+    parser.add_argument("--export-on-full", choices=list(AsyncWriter.POLICIES), default="block",
+                        help="Con --async-export: qué hacer si la cola de escritura está llena")
+    parser.add_argument("--stream-upload", action="store_true",
+                        help="Subir cada chunk a S3 apenas se cierra (pool de hilos)")
+    parser.add_argument("--upload-workers", type=int, default=4,
+                        help="Subidas concurrentes con --stream-upload")
+    parser.add_argument("--upload-retries", type=int, default=3,
+                        help="Reintentos por archivo con --stream-upload")
+    parser.add_argument("--pack-seconds", type=int, default=0,
+                        help="Empaquetar chunks en bundles de N segundos y subir sólo los bundles (0 = no)")
+    parser.add_argument("--video-backend", choices=list(VideoExporter.BACKENDS), default="opencv",
+                        help="Encoder del video procesado (ffmpeg: H.264 en MP4 fragmentado)")
+    parser.add_argument("--preset", default="veryfast",
+                        help="Preset de libx264 con --video-backend ffmpeg")
+    parser.add_argument("--crf", type=int, default=23,
+                        help="CRF de libx264 con --video-backend ffmpeg")
+    parser.add_argument("--no-video", action="store_true",
+                        help="No generar el video procesado (con --headless tampoco se dibuja el overlay)")
+    parser.add_argument("--draw-angles", action="store_true",
+                        help="Dibujar el valor de los ángulos junto a cada articulación")
+    parser.add_argument("--headless", action="store_true",
+                        help="Sin ventana ni preguntas (servidores / schedulers)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR,
+                        help="Directorio de los chunks por segundo y el manifest")
+    parser.add_argument("--video-output-dir", default=VIDEO_OUTPUT_DIR,
+                        help="Directorio del video procesado")
+    parser.add_argument("--cleanup", choices=["ask", "never", "before", "after", "always"], default="ask",
+                        help="Borrado de chunks locales: preguntar, nunca, antes, después o ambos "
+                             "(con --headless, ask = never)")
+    parser.add_argument("--upload", choices=["end", "stream", "none"], default="end",
+                        help="Subida a S3: al terminar, en streaming (= --stream-upload) o ninguna")
+    parser.add_argument("--pose-cache", default=None,
+                        help="Directorio de cache de poses por video/modelo/parámetros (hit: sin decode, "
+                             "inferencia ni video procesado)")
+    parser.add_argument("--pose-cache-size", type=float, default=10.0,
+                        help="Tamaño máximo del cache de poses en GB (desalojo LRU)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Guardar {session_id}_stats.json con tiempos y p50/p95/p99 por etapa")
+    parser.add_argument("--profile-live", type=float, default=0,
+                        help="Imprimir percentiles de los últimos frames cada N segundos (0 = no)")
+    parser.add_argument("--profile-sampler", type=float, default=0,
+                        help="Profiler por muestreo a N Hz (implica --profile; 0 = no)")
+    parser.add_argument("--summary", default=None,
+                        help="Guardar también el resumen JSON final en este archivo")
+    return parser
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", nargs="?", default=None, help="Video MP4 (default: webcam)")
+    add_processing_args(parser)
+    return parser.parse_args()
+
+
+def get_video_source(args):
     """Retorna la fuente de video (archivo o webcam)."""
-    if len(sys.argv) > 1:
-        return sys.argv[1]
+    if args.source:
+        return args.source
     return 0  # webcam
 
 
-def cleanup_outputs(confirm: bool = True):
-    """Limpia los JSONs de salida (los videos nunca se eliminan)."""
-    output_path = Path(OUTPUT_DIR)
+def cleanup_outputs(output_dir: str = OUTPUT_DIR, confirm: bool = True):
+    """Limpia los JSONs/chunks de salida (los videos nunca se eliminan)."""
+    output_path = Path(output_dir)
     
-    json_files = list(output_path.glob("*.json")) if output_path.exists() else []
+    json_files = []
+    if output_path.exists():
+        for ext in [*DataExporter.EXTENSIONS.values(), BUNDLE_EXTENSION, MANIFEST_SUFFIX, FOLDED_SUFFIX]:
+            json_files.extend(output_path.glob(f"*{ext}"))
     
     if not json_files:
         return
     
     if confirm:
-        print(f"\nSe encontraron {len(json_files)} JSONs en '{OUTPUT_DIR}/'")
+        print(f"\nSe encontraron {len(json_files)} JSONs en '{output_dir}/'")
         response = input("¿Desea limpiar los JSONs? (s/n): ").strip().lower()
         if response != 's':
             print("Manteniendo archivos existentes.\n")
@@ -53,87 +179,389 @@ def cleanup_outputs(confirm: bool = True):
         print("JSONs eliminados.\n")
 
 
+def create_data_exporter(args, fps: float, session_id: str = None, stream_uploader=None) -> tuple:
+    """
+    DataExporter (y BundlePacker con --pack-seconds) según las opciones.
+    
+    Args:
+        stream_uploader: S3Uploader en modo streaming: cada chunk/bundle se encola al cerrarse
+    
+    Returns:
+        (data_exporter, packer o None)
+    """
+    # Con --pack-seconds los chunks van al packer y se suben los bundles
+    on_export = stream_uploader.enqueue if stream_uploader else None
+    packer = None
+    if args.pack_seconds > 0:
+        def on_bundle(path):
+            data_exporter.manifest.add_bundle(path)
+            if stream_uploader:
+                for f in bundle_files(path):
+                    stream_uploader.enqueue(f)
+        packer = BundlePacker(args.output_dir, args.pack_seconds, on_bundle=on_bundle)
+        on_export = packer.add
+    
+    data_exporter = DataExporter(output_dir=args.output_dir, fps=fps,
+                                 format=args.data_format, compression=args.compression,
+                                 async_write=args.async_export, on_full=args.export_on_full,
+                                 on_export=on_export, session_id=session_id)
+    return data_exporter, packer
 
-def main():
-    # Preguntar por limpieza de JSONs antes de procesar
-    cleanup_outputs()
+
+def upload_outputs(args, s3_uploader, data_exporter, packer, video_path) -> dict:
+    """Sube el video, los chunks (o bundles) y el manifest de la sesión al terminar."""
+    print("\nSubiendo a S3...")
+    uploaded = 0
+    if video_path:
+        uploaded += s3_uploader.upload_file(video_path)
+    # Sólo los archivos de esta sesión (el directorio puede tener otras)
+    session = data_exporter.session_id
+    if packer:
+        uploaded += s3_uploader.upload_bundles(args.output_dir, f"{session}_bundle_*")
+    else:
+        uploaded += s3_uploader.upload_directory(args.output_dir, f"{session}_second_*{data_exporter.extension}")
+    uploaded += s3_uploader.upload_file(str(data_exporter.manifest.path))
+    upload_stats = {"uploaded": uploaded, **s3_uploader.stats}
+    print(f"Upload: {upload_stats}")
+    return upload_stats
+
+
+def backend_options(args, source=None) -> dict:
+    """Argumentos de PoseTracker: backend de inferencia (calibración INT8: --calibration o la fuente) y tracker."""
+    calibration = args.calibration or (source if isinstance(source, str) else None)
+    return {"backend": args.inference_backend, "int8": args.int8, "calibration": calibration,
+            "export_dir": args.model_export_dir, "tracker": args.tracker}
+
+
+def open_capture(args, source, batch_size: int):
+    """
+    cv2.VideoCapture, o FFmpegCapture con --decoder ffmpeg (archivos y URLs; la webcam sigue en OpenCV).
+    
+    El pool alcanza para una tanda de frames por etapa y cola del pipeline (o la
+    tanda en curso en modo secuencial), más la cola del encoder ffmpeg (más el
+    frame que está escribiendo) si se graba video con ese backend.
+    """
+    if args.decoder == "ffmpeg" and source != 0:
+        group = max(batch_size, args.stride)
+        encoder = VideoExporter.QUEUE_SIZE + 1 if args.video_backend == "ffmpeg" and not args.no_video else 0
+        in_flight = (len(FramePipeline.STAGES) + 2) * group if args.pipeline else group
+        pool = args.frame_pool or in_flight + encoder + 2
+        try:
+            return FFmpegCapture(source, pool_size=pool, threads=args.decode_threads, width=args.decode_width)
+        except RuntimeError as e:
+            print(f"{e}: se usa OpenCV")
+    return cv2.VideoCapture(source)
+
+
+def latency_target_ms(args) -> float:
+    """Presupuesto del tuner en ms por frame (0 = desactivado)."""
+    return args.latency_target or (1000 / args.fps_target if args.fps_target else 0)
+
+
+def build_latency_tuner(args, pose_tracker, cap, source, batch_size: int) -> tuple:
+    """
+    Calibra LatencyTuner con los primeros frames de la fuente y lo conecta a PoseTracker.
+    Los archivos se rebobinan; en vivo (webcam, RTSP/HTTP) esos frames se
+    re-entregan antes que los siguientes de la captura.
     
-    source = get_video_source()
-    cap = cv2.VideoCapture(source)
+    Returns:
+        (LatencyTuner o None sin --latency-target / --fps-target, fuente de la que leer)
+    """
+    pose_tracker.tuner = None
+    target_ms = latency_target_ms(args)
+    if not target_ms:
+        return None, cap
+    frames = []
+    while len(frames) < args.tune_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame.copy())
+        if hasattr(cap, "release_frame"):
+            cap.release_frame(frame)  # el buffer vuelve al pool de FFmpegCapture
+    if isinstance(source, str) and os.path.isfile(source):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        reader = cap
+    else:
+        reader = PrefetchedCapture(cap, frames)
+    if not frames:
+        return None, reader
     
-    if not cap.isOpened():
-        print(f"Error: No se pudo abrir la fuente de video: {source}")
-        sys.exit(1)
+    variants = [args.model]
+    for scale in args.tune_variants:
+        variant = model_variant(args.model, scale)
+        if variant is None:
+            print(f"--tune-variants: {args.model} no tiene variantes por escala, sólo se ajusta imgsz")
+            break
+        if variant not in variants:
+            variants.append(variant)
+    
+    def apply(config):
+        variant, imgsz = config
+        pose_tracker.set_model(pose_tracker.load_variant(variant), imgsz)
+    
+    def measure(config):
+        variant, imgsz = config
+        return measure_config(pose_tracker.load_variant(variant), imgsz, frames, batch_size,
+                              low_conf=pose_tracker.tracker.low_conf if pose_tracker.tracker else None)
+    
+    tuner = LatencyTuner(target_ms, apply, hysteresis=args.tune_hysteresis)
+    tuner.calibrate([(v, size) for v in variants for size in args.tune_sizes], measure)
+    pose_tracker.tuner = tuner
+    costs = ", ".join(f"{Path(v).stem}@{size}: {tuner.costs[(v, size)]:.0f} ms" for v, size in tuner.ladder)
+    print(f"Latency tuner ({target_ms:.0f} ms/frame): {costs} -> {Path(tuner.config[0]).stem}@{tuner.config[1]}")
+    return tuner, reader
+
+
+def open_pose_cache(args, source, batch_size: int, decoder: str) -> tuple:
+    """
+    Busca la salida de inferencia de la fuente en --pose-cache.
+    
+    Args:
+        decoder: Decoder que produce (o produjo) los frames: "opencv" o "ffmpeg"
+    
+    Returns:
+        (cache, key, CachedPoses o None); (None, None, None) sin cache o si la fuente no es un archivo
+    """
+    if not args.pose_cache or not (isinstance(source, str) and os.path.isfile(source)):
+        return None, None, None
+    import ultralytics
+    cache = PoseCache(args.pose_cache, max_bytes=int(args.pose_cache_size * 1024 ** 3))
+    # Todo lo que cambia los tracks: el batch y el stride también (interpolación, IDs)
+    key = cache.key(source, args.model, {
+        "ultralytics": ultralytics.__version__,
+        "batch_size": batch_size,
+        "stride": args.stride,
+        "stride_fill": args.stride_fill if args.stride > 1 else None,
+        "motion_budget": args.motion_budget if args.stride > 1 else None,
+        # Sólo fuera de los defaults, para no invalidar las entradas existentes
+        **({"backend": args.inference_backend, "int8": args.int8} if args.inference_backend != "torch" else {}),
+        **({"tracker": args.tracker} if args.tracker != "ultralytics" else {}),
+        # Otro decoder da píxeles apenas distintos (conversión de color, escalado) y puede mover
+        # keypoints; --decode-threads no cambia los frames y queda fuera
+        **({"decoder": decoder} if decoder != "opencv" else {}),
+        **({"decode_width": args.decode_width} if decoder == "ffmpeg" and args.decode_width else {}),
+        **({"latency_target_ms": latency_target_ms(args), "tune_variants": args.tune_variants,
+            "tune_sizes": args.tune_sizes} if latency_target_ms(args) else {}),
+    })
+    return cache, key, cache.get(key)
+
+
+def process_video(args, source, pose_tracker=None, session_id: str = None) -> dict:
+    """
+    Procesa una fuente completa: pose, HAR, export, video y subida a S3.
+    
+    Args:
+        args: Opciones de add_processing_args
+        source: Ruta del video o 0 (webcam)
+        pose_tracker: PoseTracker ya cargado (batch.py lo reutiliza entre videos)
+        session_id: Prefijo de los archivos de salida (default: fecha y hora)
+    
+    Returns:
+        Resumen de la ejecución (frames, tiempos por etapa, export, subida, rutas)
+    """
+    # --stream-upload se mantiene como atajo de --upload stream
+    upload = "stream" if args.stream_upload else args.upload
     
-    # Obtener FPS del video
-    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    # Webcam: frame a frame (latencia). Archivo: N frames por inferencia.
+    batch_size = args.batch_size if source != 0 else 1
+    
+    # Un hit cubre la corrida completa (sólo se guardan corridas enteras) y sin
+    # frames no hay video: el decoder sólo se abre si falta el cache
+    decoder = args.decoder if source != 0 else "opencv"
+    pose_cache, cache_key, cached = open_pose_cache(args, source, batch_size, decoder)
+    cap = None
+    if cached is None:
+        cap = open_capture(args, source, batch_size)
+        if not cap.isOpened():
+            raise IOError(f"No se pudo abrir la fuente de video: {source}")
+        if decoder == "ffmpeg" and not isinstance(cap, FFmpegCapture) and pose_cache is not None:
+            # ffmpeg no arrancó: las poses salen de OpenCV
+            _, cache_key, cached = open_pose_cache(args, source, batch_size, "opencv")
+            if cached is not None:
+                cap.release()
+                cap = None
+    
+    cache_writer = None
+    if cached is not None:
+        print(f"Pose cache hit ({cached.path.name}): sin decode ni inferencia")
+        fps = cached.meta["fps"]
+    else:
+        # Obtener FPS del video
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        if pose_cache is not None:
+            cache_writer = pose_cache.writer(cache_key, {"fps": fps, "model": args.model})
     
     # Inicializar procesadores
-    pose_tracker = PoseTracker()
+    if cached is not None:
+        pose_tracker = None
+    elif pose_tracker is None:
+        pose_tracker = PoseTracker(args.model, **backend_options(args, source))
+    else:
+        pose_tracker.reset()
+    tuner, reader = build_latency_tuner(args, pose_tracker, cap, source, batch_size) if pose_tracker else (None, cap)
     har_detector = HARDetector(fps=fps)
     angle_calculator = AngleCalculator()
-    data_exporter = DataExporter(output_dir=OUTPUT_DIR, fps=fps)
-    video_exporter = VideoExporter(output_dir=VIDEO_OUTPUT_DIR, fps=fps)
-    s3_uploader = S3Uploader()
+    s3_uploader = S3Uploader() if upload != "none" else None
+    if upload == "stream":
+        s3_uploader.start_streaming(max_workers=args.upload_workers, max_retries=args.upload_retries)
     
-    window_name = "Video Processing"
-    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-    cv2.resizeWindow(window_name, 1280, 720)
+    data_exporter, packer = create_data_exporter(args, fps, session_id,
+                                                 s3_uploader if upload == "stream" else None)
+    if cached is not None or args.no_video:
+        # Sin frames decodificados (cache) no hay video que renderizar
+        video_exporter = NullVideoWriter()
+    else:
+        video_exporter = VideoExporter(output_dir=args.video_output_dir, fps=fps, backend=args.video_backend,
+                                       preset=args.preset, crf=args.crf, session_id=session_id)
     
-    frame_number = 0
+    # Sin video ni ventana no hay nadie que mire el overlay
+    display = not args.headless and cached is None
+    renderer = None
+    if display or not isinstance(video_exporter, NullVideoWriter):
+        renderer = OverlayRenderer(draw_angles=args.draw_angles)
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        # Procesar pose + tracking
-        frame, tracks = pose_tracker.process(frame)
-        
-        # Calcular ángulos por persona
-        angles = {}
-        for track in tracks:
-            angles[track["id"]] = angle_calculator.calculate(track["keypoints"])
-        
-        # Procesar HAR
-        frame, actions = har_detector.process(frame, tracks)
-        
-        # Exportar datos cada 1 segundo
-        data_exporter.add_frame_data(frame_number, tracks, angles, actions)
-        
-        # Escribir frame al video de salida
-        video_exporter.write_frame(frame)
-        
-        cv2.imshow(window_name, frame)
-        frame_number += 1
+    stride = None
+    if args.stride > 1 and cached is None:
+        # En vivo no se puede esperar al keyframe siguiente para interpolar
+        fill = args.stride_fill if source != 0 else "predict"
+        stride = AdaptiveStride(args.stride, fill=fill, motion_budget=args.motion_budget)
+    pipeline = FramePipeline(reader, pose_tracker, angle_calculator, har_detector,
+                             data_exporter, video_exporter, batch_size=batch_size, stride=stride,
+                             pose_cache=cache_writer, replay=cached, renderer=renderer)
+    
+    stopped = []
+    if not display:
+        # Sin ventana (el replay del cache no tiene frames): SIGTERM/SIGINT cortan la fuente
+        stop = []
+        if args.headless:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, lambda *_: stop.append(True))
+        show = lambda packet: not stop
+    else:
+        window_name = "Video Processing"
+        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(window_name, 1280, 720)
         
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+        def show(packet):
+            cv2.imshow(window_name, packet["frame"])
+            return cv2.waitKey(1) & 0xFF != ord('q')
+    
+    def on_frame(packet):
+        if show(packet):
+            return True
+        stopped.append(True)
+        return False
+    
+    sampler = StackSampler(1.0 / args.profile_sampler).start() if args.profile_sampler > 0 else None
+    live = LiveStats(pipeline, args.profile_live).start() if args.profile_live > 0 else None
+    try:
+        frame_number = pipeline.run(on_frame=on_frame, threaded=args.pipeline)
+    finally:
+        if live:
+            live.stop()
+        if sampler:
+            sampler.stop()
+    
+    # Sólo se cachea una corrida completa (cortar con q/SIGTERM deja la salida parcial)
+    if cache_writer is not None and not stopped:
+        print(f"Pose cache: guardado {cache_writer.commit().name}")
+    elif cache_writer is not None:
+        cache_writer.discard()
+    if cached is not None:
+        cached.close()
     
     # Finalizar exportación
     data_exporter.finalize()
+    if packer:
+        packer.finalize()
     video_path = video_exporter.finalize()
+    if video_path:
+        data_exporter.manifest.add_video(video_path, fps)
     
-    cap.release()
-    cv2.destroyAllWindows()
+    if cap is not None:
+        cap.release()
+    if not args.headless and cached is None:
+        cv2.destroyAllWindows()
     
     print(f"Procesados {frame_number} frames")
+    pipeline.print_stats()
+    print(f"HAR: {har_detector.stats()}")
+    if stride:
+        print(f"Stride: {stride.stats()}")
+    print(f"Export: {data_exporter.stats()}")
+    stats_path = None
+    if args.profile or sampler:
+        stats_path = write_stats(args.output_dir, data_exporter.session_id, pipeline, sampler,
+                                 source=str(source), frames=frame_number, batch_size=batch_size,
+                                 threaded=args.pipeline, stride=stride.stats() if stride else None)
+        print(f"Stats: {stats_path}")
     
     # Subir a S3
-    print("\nSubiendo a S3...")
-    if video_path:
-        s3_uploader.upload_file(video_path)
-    s3_uploader.upload_directory(OUTPUT_DIR, "*.json")
+    upload_stats = None
+    if upload == "stream":
+        print("\nSubiendo a S3...")
+        # Los chunks ya se encolaron al cerrarse; sólo falta el video
+        if video_path:
+            s3_uploader.enqueue(video_path)
+        s3_uploader.enqueue(data_exporter.manifest.path)
+        upload_stats = s3_uploader.drain()
+        print(f"Upload: {upload_stats}")
+    elif upload == "end":
+        upload_stats = upload_outputs(args, s3_uploader, data_exporter, packer, video_path)
     
     print("Proceso completado.")
     
+    return {
+        "source": str(source),
+        "session_id": data_exporter.session_id,
+        "frames": frame_number,
+        "wall_s": round(pipeline.wall_time, 3),
+        "fps": round(frame_number / pipeline.wall_time, 2) if pipeline.wall_time else 0.0,
+        "stages": pipeline.stats_dict(),
+        "export": data_exporter.stats(),
+        "har": har_detector.stats(),
+        "stride": stride.stats() if stride else None,
+        "latency_tuner": tuner.to_dict() if tuner else None,
+        "decoder": cap.stats() if isinstance(cap, FFmpegCapture) else None,
+        "tracker": pose_tracker.tracker.stats() if pose_tracker and pose_tracker.tracker else None,
+        "pose_cache": {"key": cache_key, "hit": cached is not None, **pose_cache.stats()} if pose_cache else None,
+        "upload": upload_stats,
+        "video": video_path,
+        "manifest": str(data_exporter.manifest.path),
+        "stats": stats_path,
+    }
+
+
+def main():
+    args = parse_args()
+    # Sin consola interactiva "ask" equivale a no borrar nada
+    cleanup = "never" if args.headless and args.cleanup == "ask" else args.cleanup
+    
+    # Limpieza de JSONs antes de procesar
+    if cleanup in ("ask", "before", "always"):
+        cleanup_outputs(args.output_dir, confirm=cleanup == "ask")
+    
+    try:
+        summary = process_video(args, get_video_source(args))
+    except IOError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    # Resumen para schedulers / scripts (una línea JSON)
+    print(json.dumps(summary))
+    if args.summary:
+        Path(args.summary).write_text(json.dumps(summary, indent=2))
+    
     # Limpieza post-ejecución (solo JSONs, videos se mantienen)
-    response = input("\n¿Desea eliminar los JSONs locales después de subir a S3? (s/n): ").strip().lower()
-    if response == 's':
-        cleanup_outputs(confirm=False)
-        print("JSONs locales eliminados.")
+    if cleanup == "ask":
+        response = input("\n¿Desea eliminar los JSONs locales después de subir a S3? (s/n): ").strip().lower()
+        if response == 's':
+            cleanup_outputs(args.output_dir, confirm=False)
+            print("JSONs locales eliminados.")
+    elif cleanup in ("after", "always"):
+        cleanup_outputs(args.output_dir, confirm=False)
 
 
 if __name__ == "__main__":
     main()
-
@@ -1 +1,8 @@
 # Processors module
+import sys
+from pathlib import Path
+
+# Raíz del repo en el path para los módulos compartidos (common/)
+_ROOT = str(Path(__file__).resolve().parents[2])
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
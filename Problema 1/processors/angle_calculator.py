@@ -30,19 +30,47 @@ class AngleCalculator:
         "right_knee": ("right_hip", "right_knee", "right_ankle"),
     }
     
+    ANGLE_NAMES = tuple(ANGLE_DEFINITIONS)
+    
     def __init__(self, min_confidence: float = 0.5):
         self.min_confidence = min_confidence
+        # Índices (n_angles, 3) de (punto1, vértice, punto2) para el cálculo vectorizado
+        self._indices = np.array([
+            [self.KP[name] for name in points] for points in self.ANGLE_DEFINITIONS.values()
+        ])
     
-    def _calculate_angle(self, p1: np.ndarray, vertex: np.ndarray, p2: np.ndarray) -> float:
-        """Calcula ángulo en el vértice formado por p1-vertex-p2."""
-        v1 = p1[:2] - vertex[:2]
-        v2 = p2[:2] - vertex[:2]
+    def calculate_batch(self, keypoints: np.ndarray):
+        """
+        Calcula todos los ángulos de muchas personas/frames a la vez.
+        
+        Args:
+            keypoints: Array (..., 17, 3), ej. (n_tracks, 17, 3) o (n_frames, n_tracks, 17, 3).
+                       Personas ausentes pueden rellenarse con NaN.
+        
+        Returns:
+            angles: Array (..., n_angles) en grados, orden de ANGLE_NAMES
+            valid: Array bool (..., n_angles), False si algún punto no supera min_confidence
+        """
+        # (..., n_angles, 3 puntos, 3) en un solo gather
+        points = np.asarray(keypoints)[..., self._indices, :]
+        vertex = points[..., 1, :2]
+        v1 = points[..., 0, :2] - vertex
+        v2 = points[..., 2, :2] - vertex
+        
+        norms = np.linalg.norm(v1, axis=-1) * np.linalg.norm(v2, axis=-1) + 1e-6
+        cos_angle = np.clip(np.sum(v1 * v2, axis=-1) / norms, -1.0, 1.0)
+        angles = np.round(np.degrees(np.arccos(cos_angle)), 1)
         
-        cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2) + 1e-6)
-        cos_angle = np.clip(cos_angle, -1.0, 1.0)
-        angle = np.degrees(np.arccos(cos_angle))
+        valid = np.all(points[..., 2] >= self.min_confidence, axis=-1)
         
-        return round(angle, 1)
+        return angles, valid
+    
+    def to_dict(self, angles: np.ndarray, valid: np.ndarray) -> dict:
+        """Convierte una fila de calculate_batch al formato {nombre: valor o None}."""
+        return {
+            name: angles[i] if valid[i] else None
+            for i, name in enumerate(self.ANGLE_NAMES)
+        }
     
     def calculate(self, keypoints: np.ndarray) -> dict:
         """
@@ -50,25 +78,25 @@ class AngleCalculator:
         
         Args:
             keypoints: Array (17, 3) con [x, y, confidence]
-            
+        
         Returns:
             Dict con ángulos {nombre: valor_en_grados} o None si no hay confianza
         """
         if keypoints is None or len(keypoints) < 17:
             return {}
         
-        angles = {}
+        angles, valid = self.calculate_batch(keypoints)
+        return self.to_dict(angles, valid)
+    
+    def calculate_tracks(self, tracks) -> np.ndarray:
+        """
+        Calcula ángulos de todos los tracks de un frame en una sola pasada.
         
-        for angle_name, (p1_name, vertex_name, p2_name) in self.ANGLE_DEFINITIONS.items():
-            p1 = keypoints[self.KP[p1_name]]
-            vertex = keypoints[self.KP[vertex_name]]
-            p2 = keypoints[self.KP[p2_name]]
-            
-            # Verificar confianza
-            if p1[2] < self.min_confidence or vertex[2] < self.min_confidence or p2[2] < self.min_confidence:
-                angles[angle_name] = None
-                continue
-            
-            angles[angle_name] = self._calculate_angle(p1, vertex, p2)
+        Args:
+            tracks: TrackBatch (tracks sin pose = fila NaN)
         
-        return angles
+        Returns:
+            Array (n_tracks, n_angles) en grados, orden de ANGLE_NAMES; NaN si no hay confianza
+        """
+        angles, valid = self.calculate_batch(tracks.keypoints)
+        return np.where(valid, angles, np.nan)
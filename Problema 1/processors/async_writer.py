@@ -0,0 +1,160 @@
+"""
+Escritor de archivos en segundo plano con cola acotada.
+"""
+import time
+import threading
+from collections import deque
+from pathlib import Path
+
+
+class AsyncWriter:
+    """
+    Serializa y escribe archivos en un hilo propio para no frenar el loop de frames.
+    
+    Política con la cola llena (on_full):
+        block: espera lugar (nunca pierde datos, puede frenar al productor)
+        drop:  descarta el archivo nuevo y lo cuenta en "dropped"
+        spill: el hilo que llama escribe el archivo más viejo de la cola y encola el nuevo
+               (nunca pierde ni acumula memoria; frena al productor sólo lo que tarda
+               ese archivo)
+    
+    Las escrituras (y on_written) van de a una y en el orden de submit, también con spill.
+    """
+    
+    POLICIES = ("block", "drop", "spill")
+    
+    def __init__(self, max_queue: int = 8, on_full: str = "block", on_written=None):
+        """
+        Args:
+            max_queue: Archivos pendientes antes de aplicar on_full
+            on_full: "block", "drop" o "spill"
+            on_written: Callback(path, nbytes, seconds) tras cada escritura (en el hilo escritor)
+        """
+        if on_full not in self.POLICIES:
+            raise ValueError(f"Política no soportada: {on_full}")
+        self.max_queue = max_queue
+        self.on_full = on_full
+        self.on_written = on_written
+        self._jobs = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._busy = False
+        self._callback_lock = threading.Lock()  # on_written desde el hilo escritor o el que hace spill
+        self.error = None
+        # Métricas
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.max_depth = 0
+        self.latencies = deque(maxlen=1000)  # segundos por archivo (serializar + escribir)
+        self._thread = threading.Thread(target=self._run, name="async-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, path, serialize) -> bool:
+        """
+        Encola un archivo. serialize() -> bytes se ejecuta en el hilo escritor
+        (o en el que llama, con on_full="spill" y la cola llena).
+        
+        Returns:
+            False si el archivo fue descartado (on_full="drop")
+        """
+        job = (Path(path), serialize)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("AsyncWriter cerrado")
+            full = len(self._jobs) >= self.max_queue
+            if full and self.on_full == "drop":
+                self.dropped += 1
+                return False
+            if not (full and self.on_full == "spill"):
+                while len(self._jobs) >= self.max_queue and self.error is None:
+                    self._cond.wait()
+                self._jobs.append(job)
+                self.max_depth = max(self.max_depth, len(self._jobs))
+                self._cond.notify_all()
+                return True
+            # Spill: se escribe el más viejo (después del que está en curso) para no alterar el orden
+            self.spilled += 1
+            while self._busy and self.error is None:
+                self._cond.wait()
+            if self.error is not None:
+                raise self.error
+            if self._jobs:
+                self._jobs.append(job)
+                job = self._jobs.popleft()
+            self._busy = True
+        # Fuera del lock: el productor sólo espera a este archivo
+        self._write(*job)
+        with self._cond:
+            self._busy = False
+            self._cond.notify_all()
+        if self.error is not None:
+            raise self.error
+        return True
+    
+    def _write(self, path: Path, serialize):
+        try:
+            start = time.perf_counter()
+            data = serialize()
+            with open(path, "wb") as f:
+                f.write(data)
+            elapsed = time.perf_counter() - start
+            with self._callback_lock:
+                self.latencies.append(elapsed)
+                self.written += 1
+                if self.on_written:
+                    self.on_written(path, len(data), elapsed)
+        except Exception as e:
+            self.error = self.error or e
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while (not self._jobs or self._busy) and not (self._closed and not self._jobs):
+                    self._cond.wait()
+                if not self._jobs:
+                    return
+                path, serialize = self._jobs.popleft()
+                self._busy = True
+                self._cond.notify_all()
+            
+            self._write(path, serialize)
+            
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+    
+    def flush(self):
+        """Espera a que se escriban todos los archivos pendientes."""
+        with self._cond:
+            while (self._jobs or self._busy) and self._thread.is_alive():
+                self._cond.wait()
+        if self.error is not None:
+            raise self.error
+    
+    def close(self):
+        """Escribe lo pendiente y detiene el hilo."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+    
+    def stats(self) -> dict:
+        """Profundidad de cola y latencia de escritura (ms)."""
+        latencies = sorted(self.latencies)
+        
+        def pct(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else 0.0
+        
+        return {
+            "queue_depth": len(self._jobs),
+            "max_queue_depth": self.max_depth,
+            "written": self.written,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "write_ms_p50": pct(0.50),
+            "write_ms_p95": pct(0.95),
+            "write_ms_max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        }
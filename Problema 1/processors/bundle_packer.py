@@ -0,0 +1,185 @@
+"""
+Empaquetado de chunks por segundo en bundles (ej. uno por minuto) para reducir
+la cantidad de PUTs a S3.
+
+Layout del bundle:
+    miembro_0 | miembro_1 | ... | índice JSON | index_len (uint64 LE) | MAGIC
+
+Cada miembro se comprime por separado, así un consumidor puede bajar un solo
+segundo con un único HTTP range request usando el índice. El índice también se
+escribe como sidecar `<bundle>.idx.json` para no tener que leer el footer.
+"""
+import re
+import json
+import zlib
+import struct
+from pathlib import Path
+
+
+MAGIC = b"UIFBNDL1"
+EXTENSION = ".bundle"
+INDEX_SUFFIX = ".idx.json"
+
+CODECS = {
+    None: (lambda b: b, lambda b: b),
+    "zlib": (lambda b: zlib.compress(b, 6), zlib.decompress),
+}
+
+_SECOND_RE = re.compile(r"^(?P<session>.+)_second_(?P<second>\d+)(?P<ext>\.\w+)$")
+
+
+class BundlePacker:
+    """Agrupa archivos {session}_second_NNNN.* en {session}_bundle_NNNN.bundle."""
+    
+    def __init__(self, output_dir: str, seconds_per_bundle: int = 60, codec: str = "zlib", on_bundle=None,
+                 late_seconds: int = 0):
+        """
+        Args:
+            output_dir: Directorio donde se escriben los bundles
+            seconds_per_bundle: Segundos por bundle (60 = un bundle por minuto)
+            codec: Compresión por miembro: "zlib" o None
+            on_bundle: Callback(path) al cerrar cada bundle (ej. S3Uploader.enqueue)
+            late_seconds: Segundos de atraso tolerados antes de cerrar un bundle
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Codec no soportado: {codec}")
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(exist_ok=True)
+        self.seconds_per_bundle = seconds_per_bundle
+        self.codec = codec
+        self.on_bundle = on_bundle
+        self.late_seconds = late_seconds
+        self._pending = {}  # (sesión, grupo) -> rutas de ese bundle
+        self._closed = set()
+        self._watermark = {}  # sesión -> segundo más alto recibido
+        self.bundles = []
+    
+    def add(self, path):
+        """
+        Agrega un chunk cerrado. Un bundle se cierra cuando la marca de agua
+        (segundo más alto recibido) lo pasa por más de late_seconds; un chunk
+        de un bundle ya cerrado es un error (no se reescribe el bundle).
+        """
+        path = Path(path)
+        match = _SECOND_RE.match(path.name)
+        if match is None:
+            raise ValueError(f"Nombre de chunk inesperado: {path.name}")
+        session, second = match["session"], int(match["second"])
+        group = (session, second // self.seconds_per_bundle)
+        if group in self._closed:
+            raise ValueError(f"{path.name} llegó después de cerrar {self._bundle_path(group).name}")
+        self._pending.setdefault(group, []).append(path)
+        
+        watermark = self._watermark[session] = max(self._watermark.get(session, second), second)
+        for ready in sorted(self._pending):
+            if ready[0] == session and (ready[1] + 1) * self.seconds_per_bundle + self.late_seconds <= watermark:
+                self._close(ready)
+    
+    def finalize(self) -> list:
+        """Cierra los bundles pendientes. Returns: rutas de todos los bundles generados."""
+        for group in sorted(self._pending):
+            self._close(group)
+        return self.bundles
+    
+    def _bundle_path(self, group) -> Path:
+        session, index = group
+        return self.output_dir / f"{session}_bundle_{index:04d}{EXTENSION}"
+    
+    def _close(self, group):
+        bundle_path = self._bundle_path(group)
+        if bundle_path.exists():
+            raise FileExistsError(f"El bundle {bundle_path.name} ya existe: no se reescribe")
+        paths = sorted(self._pending.pop(group), key=lambda p: int(_SECOND_RE.match(p.name)["second"]))
+        write_bundle(bundle_path, paths, self.codec)
+        self._closed.add(group)
+        self.bundles.append(bundle_path)
+        print(f"Bundle: {bundle_path.name}")
+        if self.on_bundle:
+            self.on_bundle(bundle_path)
+    
+    @classmethod
+    def pack_directory(cls, dir_path: str, pattern: str = "*_second_*", **kwargs) -> list:
+        """Empaqueta una sesión ya exportada. Returns: rutas de los bundles."""
+        packer = cls(dir_path, **kwargs)
+        for path in sorted(Path(dir_path).glob(pattern)):
+            if _SECOND_RE.match(path.name):
+                packer.add(path)
+        return packer.finalize()
+
+
+def write_bundle(bundle_path: Path, paths: list, codec: str = "zlib") -> dict:
+    """Escribe el bundle y su sidecar de índice. Returns: el índice."""
+    compress = CODECS[codec][0]
+    members, offset = [], 0
+    
+    with open(bundle_path, "wb") as f:
+        for path in paths:
+            raw = Path(path).read_bytes()
+            blob = compress(raw)
+            f.write(blob)
+            members.append({
+                "name": Path(path).name,
+                "second": int(_SECOND_RE.match(Path(path).name)["second"]),
+                "offset": offset,
+                "length": len(blob),
+                "raw_length": len(raw),
+            })
+            offset += len(blob)
+        
+        index = {"codec": codec, "members": members}
+        index_bytes = json.dumps(index).encode("utf-8")
+        f.write(index_bytes)
+        f.write(struct.pack("<Q", len(index_bytes)) + MAGIC)
+    
+    Path(str(bundle_path) + INDEX_SUFFIX).write_text(json.dumps(index, indent=2))
+    return index
+
+
+def bundle_files(bundle_path) -> list:
+    """Archivos a subir por bundle: el bundle y su sidecar de índice."""
+    return [Path(bundle_path), Path(str(bundle_path) + INDEX_SUFFIX)]
+
+
+def read_index(bundle_path) -> dict:
+    """Lee el índice desde el footer del bundle."""
+    with open(bundle_path, "rb") as f:
+        f.seek(-(8 + len(MAGIC)), 2)
+        trailer = f.read()
+        if trailer[8:] != MAGIC:
+            raise ValueError("No es un bundle UIFB")
+        (index_len,) = struct.unpack("<Q", trailer[:8])
+        f.seek(-(8 + len(MAGIC) + index_len), 2)
+        return json.loads(f.read(index_len))
+
+
+def find_member(index: dict, second: int) -> dict:
+    for member in index["members"]:
+        if member["second"] == second:
+            return member
+    raise KeyError(f"Segundo {second} no está en el bundle")
+
+
+def range_header(member: dict) -> str:
+    """Header HTTP Range para bajar sólo un miembro."""
+    return f"bytes={member['offset']}-{member['offset'] + member['length'] - 1}"
+
+
+def decode_member(index: dict, blob: bytes) -> bytes:
+    """Descomprime un miembro bajado por rango: contenido original del chunk."""
+    return CODECS[index["codec"]][1](blob)
+
+
+def read_member(bundle_path, second: int) -> bytes:
+    """Lee un segundo de un bundle local."""
+    index = read_index(bundle_path)
+    member = find_member(index, second)
+    with open(bundle_path, "rb") as f:
+        f.seek(member["offset"])
+        return decode_member(index, f.read(member["length"]))
+
+
+def fetch_second(client, bucket: str, key: str, index: dict, second: int) -> bytes:
+    """Baja un segundo de un bundle en S3 con un solo GET por rango."""
+    member = find_member(index, second)
+    response = client.get_object(Bucket=bucket, Key=key, Range=range_header(member))
+    return decode_member(index, response["Body"].read())
@@ -0,0 +1,129 @@
+"""
+Formato binario de chunks por segundo (alternativa compacta al JSON).
+
+Layout:
+    MAGIC (4 bytes) | header_len (uint32 LE) | header JSON (utf-8) | payload
+
+El header describe cada array (dtype, shape, offset y tamaño dentro del payload,
+ya comprimido si hay codec), así un lector arma los arrays NumPy sin parsear texto.
+Las personas de todos los frames se guardan como filas planas; person_offsets
+(CSR) indica qué filas corresponden a cada frame.
+"""
+import json
+import lzma
+import zlib
+import struct
+import numpy as np
+from .track_batch import TrackBatch
+
+
+MAGIC = b"UIFB"
+VERSION = 1
+EXTENSION = ".bin"
+
+CODECS = {
+    None: (lambda b: b, lambda b: b),
+    "zlib": (lambda b: zlib.compress(b, 6), zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+def encode_chunk(meta: dict, frames: list, compression: str = None, angle_names=()) -> bytes:
+    """
+    Serializa un segundo de frames.
+    
+    Args:
+        meta: Campos escalares del chunk (session_id, second, fps)
+        frames: Lista de {frame, timestamp_ms, interpolated?, tracks: TrackBatch,
+                angles: (n, n_angles), actions: [n]} (buffer de DataExporter)
+        compression: None, "zlib" o "lzma"
+        angle_names: Nombres de las columnas de angles
+    """
+    tracks = TrackBatch.concat([f["tracks"] for f in frames])
+    n = len(tracks)
+    persons_actions = [action for f in frames for action in f["actions"]]
+    actions = {action: i for i, action in enumerate(dict.fromkeys(persons_actions))}
+    # Ángulos sólo si alguna persona del segundo tiene pose
+    angle_names = list(angle_names) if tracks.has_keypoints.any() else []
+    angles = np.concatenate([f["angles"] for f in frames]) if frames else np.empty((0, 0))
+    
+    arrays = {
+        "frames": np.array([f["frame"] for f in frames], dtype=np.int32),
+        "timestamps_ms": np.array([f["timestamp_ms"] for f in frames], dtype=np.int64),
+        "person_offsets": np.cumsum([0] + [len(f["tracks"]) for f in frames], dtype=np.int32),
+        "track_ids": tracks.ids,
+        "bboxes": tracks.bboxes,
+        "keypoints": tracks.keypoints,
+        "angles": angles[:, :len(angle_names)].astype(np.float32).reshape(n, len(angle_names)),
+        "actions": np.array([actions[a] for a in persons_actions], dtype=np.uint8),
+        "interpolated": np.array([f.get("interpolated", False) for f in frames], dtype=bool),
+    }
+    
+    return pack_arrays({
+        "version": VERSION,
+        **meta,
+        "angle_names": angle_names,
+        "actions": list(actions),
+    }, arrays, compression)
+
+
+def pack_arrays(header: dict, arrays: dict, compression: str = None, magic: bytes = MAGIC) -> bytes:
+    """Serializa arrays NumPy con el layout de este módulo (también lo usa pose_cache)."""
+    if compression not in CODECS:
+        raise ValueError(f"Codec no soportado: {compression}")
+    compress = CODECS[compression][0]
+    
+    entries, blobs, offset = [], [], 0
+    for name, array in arrays.items():
+        blob = compress(np.ascontiguousarray(array).tobytes())
+        entries.append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape),
+                        "offset": offset, "nbytes": len(blob)})
+        blobs.append(blob)
+        offset += len(blob)
+    
+    return pack_header(header, entries, compression, magic) + b"".join(blobs)
+
+
+def pack_header(header: dict, entries: list, compression: str = None, magic: bytes = MAGIC) -> bytes:
+    """Magic + header con la tabla de arrays; los blobs van a continuación, en el orden de entries."""
+    header = json.dumps({**header, "compression": compression, "arrays": entries}).encode("utf-8")
+    return magic + struct.pack("<I", len(header)) + header
+
+
+def decode_chunk(data: bytes, names: list = None) -> dict:
+    """
+    Lee un chunk binario.
+    
+    Args:
+        data: Contenido del archivo
+        names: Arrays a decodificar (default: todos)
+    
+    Returns:
+        Dict con el header ("header") y un np.ndarray por array
+    """
+    return unpack_arrays(data, names)
+
+
+def unpack_arrays(data, names: list = None, magic: bytes = MAGIC) -> dict:
+    """Inverso de pack_arrays. data puede ser bytes, memoryview o mmap (sin copiar si no hay codec)."""
+    if data[:4] != magic:
+        raise ValueError(f"No es un archivo binario {magic.decode()}")
+    (header_len,) = struct.unpack_from("<I", data, 4)
+    header = json.loads(data[8:8 + header_len])
+    decompress = CODECS[header["compression"]][1]
+    payload = memoryview(data)[8 + header_len:]
+    
+    result = {"header": header}
+    for entry in header["arrays"]:
+        if names is not None and entry["name"] not in names:
+            continue
+        blob = payload[entry["offset"]:entry["offset"] + entry["nbytes"]]
+        raw = decompress(blob) if header["compression"] else blob
+        result[entry["name"]] = np.frombuffer(raw, dtype=entry["dtype"]).reshape(entry["shape"])
+    return result
+
+
+def read_chunk(path, names: list = None) -> dict:
+    """Lee un archivo .bin generado por DataExporter(format="binary")."""
+    with open(path, "rb") as f:
+        return decode_chunk(f.read(), names)
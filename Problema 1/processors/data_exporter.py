@@ -2,9 +2,15 @@
 Exportador de datos parciales cada 1 segundo.
 """
 import json
+import math
+import time
 import numpy as np
 from datetime import datetime
 from pathlib import Path
+from . import chunk_format
+from .angle_calculator import AngleCalculator
+from .async_writer import AsyncWriter
+from .session_manifest import SessionManifest
 
 
 def convert_to_serializable(obj):
@@ -23,43 +29,66 @@ def convert_to_serializable(obj):
 
 
 class DataExporter:
-    """Genera archivos JSON parciales cada 1 segundo."""
+    """Genera archivos parciales cada 1 segundo (JSON o binario, ver chunk_format)."""
     
-    def __init__(self, output_dir: str = "output", fps: float = 30.0):
+    EXTENSIONS = {"json": ".json", "binary": chunk_format.EXTENSION}
+    
+    def __init__(self, output_dir: str = "output", fps: float = 30.0,
+                 format: str = "json", compression: str = None,
+                 async_write: bool = False, queue_size: int = 8, on_full: str = "block",
+                 on_export=None, manifest: bool = True, session_id: str = None):
+        """
+        Args:
+            format: "json" (legible) o "binary" (arrays tipados, ver chunk_format)
+            compression: Codec del formato binario: None, "zlib" o "lzma"
+            async_write: Serializar y escribir en un hilo de fondo (ver AsyncWriter)
+            queue_size: Segundos pendientes antes de aplicar on_full
+            on_full: "block", "drop" o "spill" cuando la cola está llena
+            on_export: Callback(path) al cerrar cada archivo (ej. S3Uploader.enqueue)
+            manifest: Mantener {session_id}_manifest.jsonl (índice temporal, ver SessionIndex)
+            session_id: Prefijo de los archivos (default: fecha y hora)
+        """
+        if format not in self.EXTENSIONS:
+            raise ValueError(f"Formato no soportado: {format}")
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.fps = fps
+        self.format = format
+        self.compression = compression
+        self.extension = self.EXTENSIONS[format]
+        self.bytes_written = 0
+        self.write_time = 0.0
         self.frame_count = 0
         self.current_second = 0
         self.second_buffer = []
-        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.session_id = session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.on_export = on_export
+        self.manifest = SessionManifest(output_dir, self.session_id, fps, format, compression) if manifest else None
+        self._summaries = {}  # path -> (second, resumen) hasta que el chunk se escribe
+        self.writer = AsyncWriter(queue_size, on_full, on_written=self._on_written) if async_write else None
     
-    def add_frame_data(self, frame_number: int, tracks: list, angles: dict, actions: dict):
+    def add_frame_data(self, frame_number: int, tracks, angles: np.ndarray, actions: list,
+                       interpolated: bool = False):
         """
         Agrega datos de un frame al buffer.
         
         Args:
             frame_number: Número de frame
-            tracks: Lista de tracks [{id, bbox, keypoints}]
-            angles: Dict {track_id: {angle_name: value}}
-            actions: Dict {track_id: action_name}
+            tracks: TrackBatch del frame
+            angles: Array (n_tracks, n_angles) de AngleCalculator.calculate_tracks
+            actions: Acción de cada track (mismo orden que tracks)
+            interpolated: True si el frame no pasó por inferencia (ver AdaptiveStride)
         """
+        # Arrays crudos: las personas se arman sólo al exportar (JSON) o se concatenan (binario)
         frame_data = {
             "frame": frame_number,
             "timestamp_ms": int((frame_number / self.fps) * 1000),
-            "persons": []
+            "tracks": tracks,
+            "angles": angles,
+            "actions": actions,
         }
-        
-        for track in tracks:
-            track_id = track["id"]
-            person_data = {
-                "id": track_id,
-                "bbox": track["bbox"].tolist() if hasattr(track["bbox"], 'tolist') else track["bbox"],
-                "keypoints": track["keypoints"].tolist() if track["keypoints"] is not None else None,
-                "angles": angles.get(track_id, {}),
-                "action": actions.get(track_id, "unknown")
-            }
-            frame_data["persons"].append(person_data)
+        if interpolated:
+            frame_data["interpolated"] = True
         
         self.second_buffer.append(frame_data)
         self.frame_count += 1
@@ -71,26 +100,90 @@ class DataExporter:
             self.current_second = current_second
             self.second_buffer = []
     
+    def _serialize(self, second: int, frames: list) -> bytes:
+        """Serializa los frames de un segundo según el formato configurado."""
+        meta = {
+            "session_id": self.session_id,
+            "second": second,
+            "fps": self.fps
+        }
+        
+        if self.format == "binary":
+            return chunk_format.encode_chunk(meta, frames, self.compression, AngleCalculator.ANGLE_NAMES)
+        
+        # _json_frame ya arma tipos nativos: convert_to_serializable recorrería cada float
+        export_data = {**convert_to_serializable(meta), "frames": [self._json_frame(frame) for frame in frames]}
+        return json.dumps(export_data, indent=2).encode("utf-8")
+    
+    @staticmethod
+    def _json_frame(frame: dict) -> dict:
+        """Frame del buffer -> {frame, timestamp_ms, persons: [{id, bbox, keypoints, angles, action}]}."""
+        tracks, actions = frame["tracks"], frame["actions"]
+        # Un tolist() por array en lugar de uno por persona
+        ids, bboxes, keypoints = tracks.ids.tolist(), tracks.bboxes.tolist(), tracks.keypoints.tolist()
+        has_keypoints = tracks.has_keypoints.tolist()
+        angles = frame["angles"].tolist()
+        persons = []
+        for i, track_id in enumerate(ids):
+            # Sin pose no hay ángulos; con pose, None donde no hubo confianza
+            track_angles = {}
+            if has_keypoints[i]:
+                track_angles = {name: None if math.isnan(value) else value
+                                for name, value in zip(AngleCalculator.ANGLE_NAMES, angles[i])}
+            persons.append({
+                "id": track_id,
+                "bbox": bboxes[i],
+                "keypoints": keypoints[i] if has_keypoints[i] else None,
+                "angles": track_angles,
+                "action": actions[i],
+            })
+        data = {"frame": int(frame["frame"]), "timestamp_ms": frame["timestamp_ms"], "persons": persons}
+        if frame.get("interpolated"):
+            data["interpolated"] = True
+        return data
+    
     def _export_second(self, second: int):
-        """Exporta el buffer del segundo actual a JSON."""
+        """Exporta el buffer del segundo actual."""
         if not self.second_buffer:
             return
         
-        filename = self.output_dir / f"{self.session_id}_second_{second:04d}.json"
+        filename = self.output_dir / f"{self.session_id}_second_{second:04d}{self.extension}"
+        frames = self.second_buffer
+        if self.manifest:
+            self._summaries[filename] = (second, SessionManifest.summarize(frames))
         
-        export_data = {
-            "session_id": self.session_id,
-            "second": second,
-            "fps": self.fps,
-            "frames": self.second_buffer
-        }
-        
-        with open(filename, 'w') as f:
-            json.dump(convert_to_serializable(export_data), f, indent=2)
+        if self.writer:
+            if not self.writer.submit(filename, lambda: self._serialize(second, frames)):
+                self._summaries.pop(filename, None)  # descartado (drop): no va al manifest
+            return
         
-        print(f"Exported: {filename.name}")
+        start = time.perf_counter()
+        data = self._serialize(second, frames)
+        with open(filename, 'wb') as f:
+            f.write(data)
+        self._on_written(filename, len(data), time.perf_counter() - start)
+    
+    def _on_written(self, path: Path, nbytes: int, seconds: float):
+        self.write_time += seconds
+        self.bytes_written += nbytes
+        if self.manifest:
+            second, summary = self._summaries.pop(path)
+            self.manifest.add_chunk(second, path, nbytes, summary)
+        print(f"Exported: {path.name}")
+        if self.on_export:
+            self.on_export(path)
     
     def finalize(self):
-        """Exporta datos restantes al finalizar."""
+        """Exporta datos restantes al finalizar (y espera al escritor de fondo)."""
         if self.second_buffer:
             self._export_second(self.current_second)
+            self.second_buffer = []
+        if self.writer:
+            self.writer.close()
+    
+    def stats(self) -> dict:
+        """Bytes escritos, tiempo de escritura y métricas de la cola (modo async)."""
+        stats = {"bytes_written": self.bytes_written, "write_s": round(self.write_time, 3)}
+        if self.writer:
+            stats.update(self.writer.stats())
+        return stats
@@ -2,8 +2,80 @@
 Human Action Recognition (HAR) con ventana temporal de 9 segundos.
 """
 import numpy as np
-import cv2
-from collections import deque
+from .track_store import TrackStateStore
+
+
+class TemporalWindow:
+    """
+    Ring buffer preasignado de keypoints de un track con features incrementales.
+    
+    Cada entrada guarda el movimiento de muñeca respecto de la anterior; al entrar
+    un frame se suma su movimiento y al salir el más viejo se resta el par que
+    deja de estar en la ventana, así cada update es O(1) sin importar la ventana.
+    """
+    
+    WRIST = 9  # left_wrist (COCO)
+    
+    def __init__(self, size: int, num_keypoints: int = 17):
+        self.size = size
+        self.keypoints = np.full((size, num_keypoints, 3), np.nan, dtype=np.float32)
+        self.present = np.zeros(size, dtype=bool)
+        self.movements = np.full(size, np.nan)  # movimiento vs entrada previa (NaN = sin par)
+        self.head = 0       # próxima posición a escribir
+        self.count = 0
+        self.movement_sum = 0.0
+        self.movement_count = 0
+        self._pushes = 0
+    
+    @property
+    def nbytes(self) -> int:
+        return self.keypoints.nbytes + self.present.nbytes + self.movements.nbytes
+    
+    def reset(self):
+        self.keypoints.fill(np.nan)
+        self.present.fill(False)
+        self.movements.fill(np.nan)
+        self.head = self.count = self.movement_count = self._pushes = 0
+        self.movement_sum = 0.0
+    
+    def push(self, keypoints: np.ndarray):
+        """Agrega los keypoints de un frame (None si no hay pose)."""
+        movement = np.nan
+        prev = (self.head - 1) % self.size
+        if keypoints is not None and self.count and self.present[prev]:
+            movement = float(np.linalg.norm(keypoints[self.WRIST, :2] - self.keypoints[prev, self.WRIST, :2]))
+        
+        if self.count == self.size:
+            # Sale la entrada más vieja: su sucesora pierde el par con ella
+            oldest_pair = float(self.movements[(self.head + 1) % self.size])
+            if not np.isnan(oldest_pair):
+                self.movement_sum -= oldest_pair
+                self.movement_count -= 1
+            self.movements[(self.head + 1) % self.size] = np.nan
+        else:
+            self.count += 1
+        
+        self.present[self.head] = keypoints is not None
+        if keypoints is None:
+            self.keypoints[self.head] = np.nan
+        else:
+            self.keypoints[self.head] = keypoints
+        self.movements[self.head] = movement
+        if not np.isnan(movement):
+            self.movement_sum += movement
+            self.movement_count += 1
+        self.head = (self.head + 1) % self.size
+        
+        # Re-sincronizar la suma cada `size` pushes (O(1) amortizado, evita drift numérico)
+        self._pushes += 1
+        if self._pushes >= self.size:
+            valid = self.movements[~np.isnan(self.movements)]
+            self.movement_sum = float(valid.sum())
+            self.movement_count = len(valid)
+            self._pushes = 0
+    
+    def avg_movement(self) -> float:
+        return self.movement_sum / self.movement_count if self.movement_count else 0.0
 
 
 class HARDetector:
@@ -25,134 +97,115 @@ class HARDetector:
         "left_ankle": 15, "right_ankle": 16
     }
     
-    def __init__(self, fps: float = 30.0, window_seconds: float = 9.0):
+    def __init__(self, fps: float = 30.0, window_seconds: float = 9.0,
+                 max_idle_seconds: float = 10.0, max_tracks: int = 64):
         self.fps = fps
         self.window_size = int(fps * window_seconds)  # 9 segundos de buffer
-        # Buffer por track_id: deque de keypoints
-        self.pose_buffers = {}
+        # Ventana temporal por track_id, acotada para sesiones largas
+        self.pose_buffers = TrackStateStore(
+            lambda: TemporalWindow(self.window_size, len(self.KEYPOINTS)),
+            max_idle_frames=int(fps * max_idle_seconds),
+            max_tracks=max_tracks
+        )
     
     def _add_to_buffer(self, track_id: int, keypoints: np.ndarray):
         """Agrega keypoints al buffer temporal del track."""
-        if track_id not in self.pose_buffers:
-            self.pose_buffers[track_id] = deque(maxlen=self.window_size)
-        self.pose_buffers[track_id].append(keypoints)
+        self.pose_buffers.get(track_id).push(keypoints)
+    
+    def stats(self) -> dict:
+        """Contadores del estado por track (live_tracks, evicciones, bytes_held)."""
+        return self.pose_buffers.stats()
     
     def _analyze_temporal(self, track_id: int) -> dict:
-        """Analiza el buffer temporal para extraer features."""
+        """Features temporales del track (O(1), mantenidas por TemporalWindow)."""
         if track_id not in self.pose_buffers:
             return {}
         
-        buffer = list(self.pose_buffers[track_id])
-        if len(buffer) < 10:  # Mínimo de frames para análisis
-            return {"buffer_frames": len(buffer)}
-        
-        # Calcular movimiento promedio de muñecas
-        wrist_movements = []
-        for i in range(1, len(buffer)):
-            if buffer[i] is not None and buffer[i-1] is not None:
-                l_wrist_curr = buffer[i][self.KEYPOINTS["left_wrist"]][:2]
-                l_wrist_prev = buffer[i-1][self.KEYPOINTS["left_wrist"]][:2]
-                movement = np.linalg.norm(l_wrist_curr - l_wrist_prev)
-                wrist_movements.append(movement)
+        window = self.pose_buffers[track_id]
+        if window.count < 10:  # Mínimo de frames para análisis
+            return {"buffer_frames": window.count}
         
-        avg_movement = np.mean(wrist_movements) if wrist_movements else 0
+        avg_movement = window.avg_movement()
         
         return {
-            "buffer_frames": len(buffer),
+            "buffer_frames": window.count,
             "avg_wrist_movement": round(avg_movement, 2),
             "is_moving": avg_movement > 5.0
         }
     
-    def _classify_action(self, keypoints: np.ndarray, temporal_info: dict) -> str:
-        """Clasificación basada en geometría + información temporal."""
-        if keypoints is None or len(keypoints) < 17:
-            return "unknown"
-        
-        # Extraer puntos clave
-        l_wrist = keypoints[self.KEYPOINTS["left_wrist"]]
-        r_wrist = keypoints[self.KEYPOINTS["right_wrist"]]
-        l_shoulder = keypoints[self.KEYPOINTS["left_shoulder"]]
-        r_shoulder = keypoints[self.KEYPOINTS["right_shoulder"]]
-        l_hip = keypoints[self.KEYPOINTS["left_hip"]]
-        r_hip = keypoints[self.KEYPOINTS["right_hip"]]
-        l_knee = keypoints[self.KEYPOINTS["left_knee"]]
-        r_knee = keypoints[self.KEYPOINTS["right_knee"]]
-        l_ankle = keypoints[self.KEYPOINTS["left_ankle"]]
-        r_ankle = keypoints[self.KEYPOINTS["right_ankle"]]
-        
-        min_conf = 0.5
-        
-        # Verificar si faltan ambas piernas (rodillas + tobillos)
-        left_leg_missing = l_knee[2] < min_conf and l_ankle[2] < min_conf
-        right_leg_missing = r_knee[2] < min_conf and r_ankle[2] < min_conf
-        if left_leg_missing and right_leg_missing:
-            return "unknown"
-        
-        # Verificar si falta todo el torso (hombros + caderas)
-        torso_missing = (l_shoulder[2] < min_conf and r_shoulder[2] < min_conf and 
-                        l_hip[2] < min_conf and r_hip[2] < min_conf)
-        if torso_missing:
-            return "unknown"
-        
-        # Verificar confianza mínima de hombros para clasificación
-        if l_shoulder[2] < min_conf or r_shoulder[2] < min_conf:
-            return "unknown"
+    def classify_batch(self, keypoints: np.ndarray, is_moving) -> list:
+        """
+        Clasificación geométrica + temporal de muchas personas a la vez.
         
-        shoulder_y = (l_shoulder[1] + r_shoulder[1]) / 2
-        hip_y = (l_hip[1] + r_hip[1]) / 2
-        body_height = abs(hip_y - shoulder_y)
+        Reglas, en orden: sin piernas, sin torso o algún hombro sin confianza = unknown;
+        brazos sobre los hombros = waving (en movimiento) o hands_up; torso
+        corto (< 50 px entre hombros y caderas) = sitting; si no walking o standing.
         
-        # Clasificación con contexto temporal
-        is_moving = temporal_info.get("is_moving", False)
+        Args:
+            keypoints: Array (N, 17, 3); personas sin pose con NaN (como chunk_format)
+            is_moving: Array bool (N,) del análisis temporal
         
-        # Brazos levantados
-        if l_wrist[2] > 0.5 and r_wrist[2] > 0.5:
-            if l_wrist[1] < l_shoulder[1] and r_wrist[1] < r_shoulder[1]:
-                return "waving" if is_moving else "hands_up"
+        Returns:
+            Lista de N acciones
+        """
+        kp = np.asarray(keypoints, dtype=np.float32).reshape(-1, len(self.KEYPOINTS), 3)
+        if not len(kp):
+            return []
+        is_moving = np.asarray(is_moving, dtype=bool)
+        min_conf = 0.5
+        conf = lambda name: kp[:, self.KEYPOINTS[name], 2]
+        y = lambda name: kp[:, self.KEYPOINTS[name], 1]
+        
+        legs_missing = ((conf("left_knee") < min_conf) & (conf("left_ankle") < min_conf) &
+                        (conf("right_knee") < min_conf) & (conf("right_ankle") < min_conf))
+        torso_missing = ((conf("left_shoulder") < min_conf) & (conf("right_shoulder") < min_conf) &
+                         (conf("left_hip") < min_conf) & (conf("right_hip") < min_conf))
+        shoulders_missing = (conf("left_shoulder") < min_conf) | (conf("right_shoulder") < min_conf)
+        unknown = np.isnan(kp).all(axis=(1, 2)) | legs_missing | torso_missing | shoulders_missing
+        
+        body_height = np.abs((y("left_hip") + y("right_hip")) / 2 - (y("left_shoulder") + y("right_shoulder")) / 2)
+        arms_up = ((conf("left_wrist") > 0.5) & (conf("right_wrist") > 0.5) &
+                   (y("left_wrist") < y("left_shoulder")) & (y("right_wrist") < y("right_shoulder")))
+        
+        return np.select(
+            [unknown, arms_up & is_moving, arms_up, body_height < 50, is_moving],
+            ["unknown", "waving", "hands_up", "sitting", "walking"],
+            "standing",
+        ).tolist()
+    
+    def process_batch(self, track_ids, keypoints: np.ndarray, person_offsets) -> list:
+        """
+        HAR de uno o muchos frames sin imagen (process() y replay de sesiones exportadas).
         
-        # Sentado
-        if body_height < 50:
-            return "sitting"
+        El estado temporal se actualiza frame a frame y persona a persona; la
+        clasificación se hace de una vez para todas las personas.
         
-        # De pie con movimiento
-        if is_moving:
-            return "walking"
+        Args:
+            track_ids: Array (N,) con las personas de todos los frames en fila
+            keypoints: Array (N, 17, 3), NaN para personas sin pose
+            person_offsets: Array (frames + 1,): personas del frame f = [offsets[f], offsets[f + 1])
         
-        return "standing"
+        Returns:
+            Lista de N acciones
+        """
+        keypoints = np.asarray(keypoints, dtype=np.float32)
+        has_pose = ~np.isnan(keypoints).all(axis=(1, 2))
+        is_moving = np.zeros(len(track_ids), dtype=bool)
+        track_ids = np.asarray(track_ids).tolist()
+        for f in range(len(person_offsets) - 1):
+            self.pose_buffers.tick()
+            for i in range(person_offsets[f], person_offsets[f + 1]):
+                track_id = track_ids[i]
+                self._add_to_buffer(track_id, keypoints[i] if has_pose[i] else None)
+                is_moving[i] = self._analyze_temporal(track_id).get("is_moving", False)
+        return self.classify_batch(keypoints, is_moving)
     
-    def process(self, frame, tracks: list):
+    def process(self, frame, tracks):
         """
-        Procesa tracks para detectar acciones con contexto temporal.
+        Procesa los tracks de un frame (TrackBatch) para detectar acciones con contexto temporal.
         
         Returns:
-            frame: Frame con anotaciones de acción
-            actions: Dict {track_id: action}
+            frame: El mismo frame (las acciones se dibujan en OverlayRenderer)
+            actions: Lista con la acción de cada track, en el orden de tracks
         """
-        actions = {}
-        
-        for track in tracks:
-            track_id = track["id"]
-            keypoints = track["keypoints"]
-            
-            # Agregar al buffer temporal
-            self._add_to_buffer(track_id, keypoints)
-            
-            # Analizar ventana temporal
-            temporal_info = self._analyze_temporal(track_id)
-            
-            # Clasificar con contexto
-            action = self._classify_action(keypoints, temporal_info)
-            actions[track_id] = action
-            
-            # Anotar acción en frame con fondo para mejor visibilidad
-            bbox = track["bbox"]
-            x1, y1 = int(bbox[0]), int(bbox[1])
-            label = f"{action}"
-            
-            # Fondo para el texto
-            (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
-            cv2.rectangle(frame, (x1, y1 - 50), (x1 + w + 10, y1 - 25), (0, 0, 0), -1)
-            cv2.putText(frame, label, (x1 + 5, y1 - 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-        
-        return frame, actions
+        return frame, self.process_batch(tracks.ids, tracks.keypoints, (0, len(tracks)))
@@ -0,0 +1,169 @@
+"""
+Inferencia de pose cada k frames con relleno de los frames salteados.
+
+Con fill="interpolate" (archivos) el keyframe es el último del grupo y los
+frames intermedios se interpolan linealmente entre dos keyframes. Con
+fill="predict" (webcam, sin mirar adelante) el keyframe es el primero y los
+siguientes se extrapolan a velocidad constante.
+
+k se adapta en cada keyframe: baja hacia 1 cuando el movimiento por frame
+(relativo al alto de la bbox) es alto, cuando hay muchas personas o cuando
+aparecen/desaparecen tracks, y sube de a uno cuando la escena está quieta.
+"""
+import numpy as np
+from .track_batch import TrackBatch
+
+
+MIN_CONF = 0.3  # keypoints más débiles no cuentan para medir movimiento
+
+
+def _lerp_tracks(a: TrackBatch, b: TrackBatch, alpha: float) -> TrackBatch:
+    """
+    Tracks interpolados fila a fila entre a (alpha=0) y b (alpha=1), mismos IDs en el mismo orden.
+    Si sólo uno de los dos tiene pose se usa la del más cercano (NaN si es ése el que no tiene).
+    """
+    keypoints = a.keypoints + (b.keypoints - a.keypoints) * alpha
+    both = a.has_keypoints & b.has_keypoints
+    keypoints = np.where(both[:, None, None], keypoints, (b if alpha >= 0.5 else a).keypoints)
+    return TrackBatch(b.ids, a.bboxes + (b.bboxes - a.bboxes) * alpha, keypoints)
+
+
+class AdaptiveStride:
+    """Decide k y rellena tracks de frames sin inferencia."""
+    
+    FILLS = ("interpolate", "predict")
+    
+    def __init__(self, max_stride: int = 4, fill: str = "interpolate",
+                 motion_budget: float = 0.05, crowd: int = 4):
+        """
+        Args:
+            max_stride: k máximo (1 = inferir todos los frames)
+            fill: "interpolate" (usa el keyframe siguiente) o "predict" (velocidad constante)
+            motion_budget: Desplazamiento máximo tolerado entre keyframes, en altos de bbox
+            crowd: Con más personas que esto k se reduce proporcionalmente
+        """
+        if fill not in self.FILLS:
+            raise ValueError(f"Relleno no soportado: {fill}")
+        self.max_stride = max(1, max_stride)
+        self.fill = fill
+        self.motion_budget = motion_budget
+        self.crowd = crowd
+        self.k = 1  # arranca infiriendo todo hasta medir movimiento
+        self._last_frame = None
+        self._last_tracks = None
+        self._velocity = None  # TrackBatch con (d_bbox, d_keypoints) por frame de cada track
+        # Métricas
+        self.keyframes = 0
+        self.filled = 0
+        self.motion = 0.0
+    
+    @property
+    def key_index(self) -> int:
+        """Posición del keyframe dentro de un grupo de frames."""
+        return -1 if self.fill == "interpolate" else 0
+    
+    def step(self, key_frame: int, key_tracks: TrackBatch, frame_numbers: list) -> list:
+        """
+        Registra un keyframe inferido, rellena los frames salteados de su grupo y recalcula k.
+        
+        Returns:
+            Un TrackBatch por cada frame_number
+        """
+        if self.fill == "predict":
+            # La velocidad se mide contra el keyframe anterior y se proyecta hacia adelante
+            self._update(key_frame, key_tracks)
+            filled = self._fill(key_frame, key_tracks, frame_numbers)
+        else:
+            filled = self._fill(key_frame, key_tracks, frame_numbers)
+            self._update(key_frame, key_tracks)
+        self.filled += len(frame_numbers)
+        return filled
+    
+    def _fill(self, key_frame: int, key_tracks: TrackBatch, frame_numbers: list) -> list:
+        if self.fill == "predict":
+            return [self._predict(key_tracks, f - key_frame) for f in frame_numbers]
+        
+        if self._last_frame is None:
+            return [key_tracks for _ in frame_numbers]
+        last = self._last_tracks
+        span = key_frame - self._last_frame
+        # Fila de cada track del keyframe en el keyframe anterior (-1 = track nuevo)
+        previous = last.index(key_tracks.ids)
+        matched = previous >= 0
+        # Tracks que salieron de escena: se mantienen hasta la mitad del tramo
+        gone = np.ones(len(last), dtype=bool)
+        gone[previous[matched]] = False
+        gone = last[gone]
+        lerp_a, lerp_b = last[previous[matched]], key_tracks[matched]
+        filled = []
+        for f in frame_numbers:
+            alpha = (f - self._last_frame) / span
+            tracks = _lerp_tracks(lerp_a, lerp_b, alpha)
+            if alpha >= 0.5:
+                # Desde la mitad del tramo aparecen los tracks nuevos (orden del keyframe)
+                bboxes, keypoints = key_tracks.bboxes.copy(), key_tracks.keypoints.copy()
+                bboxes[matched], keypoints[matched] = tracks.bboxes, tracks.keypoints
+                tracks = TrackBatch(key_tracks.ids, bboxes, keypoints)
+            else:
+                tracks = TrackBatch.concat([tracks, gone])
+            filled.append(tracks)
+        return filled
+    
+    def _predict(self, key: TrackBatch, steps: int) -> TrackBatch:
+        velocity = self._velocity
+        if velocity is None:
+            return key
+        rows = velocity.index(key.ids)
+        moving = rows >= 0
+        d_bbox, d_kpts = velocity.bboxes[rows[moving]], velocity.keypoints[rows[moving]]
+        bboxes, keypoints = key.bboxes.copy(), key.keypoints.copy()
+        bboxes[moving] = key.bboxes[moving] + d_bbox * steps
+        # Sin velocidad de keypoints (NaN) la pose se mantiene
+        extrapolated = key.keypoints[moving] + d_kpts * steps
+        has_velocity = ~np.isnan(d_kpts).all(axis=(1, 2))
+        keypoints[moving] = np.where(has_velocity[:, None, None], extrapolated, key.keypoints[moving])
+        return TrackBatch(key.ids, bboxes, keypoints)
+    
+    def _update(self, key_frame: int, key_tracks: TrackBatch):
+        self.keyframes += 1
+        
+        motion, velocity = 0.0, None
+        if self._last_frame is not None:
+            last = self._last_tracks
+            span = max(1, key_frame - self._last_frame)
+            previous = last.index(key_tracks.ids)
+            matched = previous >= 0
+            now, before = key_tracks[matched], last[previous[matched]]
+            # Velocidad por frame con el layout de TrackBatch (keypoints NaN si falta una de las poses)
+            d_kpts = (now.keypoints - before.keypoints) / span
+            d_kpts[:, :, 2] = np.where(now.has_keypoints & before.has_keypoints, 0.0, np.nan)[:, None]
+            velocity = TrackBatch(now.ids, (now.bboxes - before.bboxes) / span, d_kpts)
+            
+            visible = (now.keypoints[:, :, 2] > MIN_CONF) & (before.keypoints[:, :, 2] > MIN_CONF)
+            counts = visible.sum(axis=1)
+            if counts.any():
+                heights = np.maximum(1.0, now.bboxes[:, 3] - now.bboxes[:, 1])
+                steps = np.where(visible, np.linalg.norm(d_kpts[:, :, :2], axis=2), 0.0).sum(axis=1)
+                motion = float((steps[counts > 0] / counts[counts > 0] / heights[counts > 0]).max())
+        
+        if self._last_frame is None or not np.array_equal(np.sort(key_tracks.ids), np.sort(self._last_tracks.ids)):
+            # Entradas/salidas de escena: volver a inferir todo hasta estabilizar
+            target = 1
+        else:
+            target = self.max_stride if motion <= 0 else int(self.motion_budget / motion)
+            target = min(target, max(1, self.max_stride * self.crowd // max(len(key_tracks), self.crowd)))
+        self.k = max(1, min(self.max_stride, target, self.k + 1))
+        
+        self.motion = motion
+        self._velocity = velocity
+        self._last_frame = key_frame
+        self._last_tracks = key_tracks
+    
+    def stats(self) -> dict:
+        total = self.keyframes + self.filled
+        return {
+            "keyframes": self.keyframes,
+            "filled": self.filled,
+            "mean_stride": round(total / self.keyframes, 2) if self.keyframes else 0.0,
+            "stride": self.k,
+        }
@@ -0,0 +1,97 @@
+"""
+Overlay de Problema 1: esqueleto, bbox, ID + acción y ángulos en una sola pasada.
+
+Se dibuja directamente sobre el frame decodificado (sin result.plot(), que
+arma una copia nueva del frame por cada inferencia). Los tamaños de texto de
+las etiquetas se cachean porque se repiten frame a frame.
+"""
+import cv2
+import numpy as np
+from .angle_calculator import AngleCalculator
+
+
+# Pares de keypoints COCO unidos en el esqueleto
+SKELETON = np.array([(5, 7), (7, 9), (6, 8), (8, 10), (5, 6), (5, 11), (6, 12), (11, 12),
+                     (11, 13), (13, 15), (12, 14), (14, 16), (0, 1), (0, 2), (1, 3), (2, 4)])
+
+# Un color por ID (BGR)
+PALETTE = [(255, 128, 0), (0, 200, 0), (0, 128, 255), (255, 0, 255), (0, 255, 255),
+           (255, 255, 0), (128, 0, 255), (0, 0, 255), (128, 255, 0), (255, 0, 128)]
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class OverlayRenderer:
+    """Dibuja los tracks de un frame (in-place)."""
+    
+    def __init__(self, draw_angles: bool = False, min_conf: float = 0.5, font_scale: float = 0.6):
+        """
+        Args:
+            draw_angles: Escribir el valor de cada ángulo junto a su articulación
+            min_conf: Confianza mínima de un keypoint para dibujarlo
+        """
+        self.draw_angles = draw_angles
+        self.min_conf = min_conf
+        self.font_scale = font_scale
+        self._text_sizes = {}
+        # Articulación (vértice) donde se escribe cada ángulo
+        self._vertices = {name: AngleCalculator.KP[points[1]]
+                          for name, points in AngleCalculator.ANGLE_DEFINITIONS.items()}
+    
+    def _text_size(self, label: str, scale: float) -> tuple:
+        key = (label, scale)
+        size = self._text_sizes.get(key)
+        if size is None:
+            if len(self._text_sizes) > 4096:
+                self._text_sizes.clear()
+            size = self._text_sizes[key] = cv2.getTextSize(label, FONT, scale, 1)[0]
+        return size
+    
+    def draw(self, frame, tracks, actions: list = None, angles: np.ndarray = None):
+        """
+        Args:
+            frame: Imagen BGR, se modifica in-place
+            tracks: TrackBatch
+            actions: Acción de cada track (opcional)
+            angles: Array (n_tracks, n_angles) de AngleCalculator.calculate_tracks (opcional, con draw_angles)
+        
+        Returns:
+            El mismo frame
+        """
+        if not len(tracks):
+            return frame
+        ids = tracks.ids.tolist()
+        boxes = tracks.bboxes.astype(np.int32).tolist()
+        visible_all = tracks.keypoints[:, :, 2] >= self.min_conf
+        has_keypoints = tracks.has_keypoints
+        for i, track_id in enumerate(ids):
+            color = PALETTE[track_id % len(PALETTE)]
+            x1, y1, x2, y2 = boxes[i]
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            
+            if has_keypoints[i]:
+                visible = visible_all[i]
+                points = tracks.keypoints[i, :, :2].astype(np.int32)
+                # Todas las líneas del esqueleto en una llamada
+                pairs = SKELETON[visible[SKELETON[:, 0]] & visible[SKELETON[:, 1]]]
+                if len(pairs):
+                    cv2.polylines(frame, list(points[pairs]), False, color, 2)
+                for x, y in points[visible]:
+                    cv2.circle(frame, (int(x), int(y)), 3, (0, 0, 255), -1)
+                
+                if self.draw_angles and angles is not None:
+                    for name, value in zip(AngleCalculator.ANGLE_NAMES, angles[i]):
+                        vertex = self._vertices[name]
+                        if not np.isnan(value) and visible[vertex]:
+                            x, y = points[vertex]
+                            cv2.putText(frame, f"{value:.0f}", (int(x) + 6, int(y) - 6), FONT,
+                                        self.font_scale * 0.75, (255, 255, 255), 1)
+            
+            # ID y acción en una sola etiqueta con fondo
+            label = f"ID:{track_id}"
+            if actions is not None:
+                label += f" {actions[i]}"
+            w, h = self._text_size(label, self.font_scale)
+            cv2.rectangle(frame, (x1, y1 - h - 10), (x1 + w + 8, y1), color, -1)
+            cv2.putText(frame, label, (x1 + 4, y1 - 5), FONT, self.font_scale, (0, 0, 0), 1)
+        return frame
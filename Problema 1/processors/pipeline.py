@@ -0,0 +1,367 @@
+"""
+Pipeline de procesamiento por etapas: decode -> inference -> analytics -> encode.
+
+Cada etapa puede correr en serie (un solo hilo) o en su propio hilo con colas
+acotadas entre etapas. Las colas son FIFO y cada etapa tiene un único hilo,
+por lo que el orden de frames se mantiene.
+
+Cada etapa guarda además el costo por frame de cada batch (ms), de donde salen
+percentiles p50/p95/p99 de toda la corrida o de los últimos N frames. Dentro de
+analytics y encode se miden aparte las sub-etapas angles, har, export, render
+y write (ya incluidas en el tiempo de su etapa).
+"""
+import time
+import queue
+import threading
+from array import array
+import numpy as np
+
+
+_STOP = object()
+
+
+class StageStats:
+    """Tiempos acumulados de una etapa."""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0     # procesando
+        self.starved = 0.0  # esperando input
+        self.blocked = 0.0  # esperando lugar en la cola de salida
+        self.samples = array("d")  # ms por frame (8 bytes por frame)
+    
+    def record(self, seconds: float, items: int):
+        """Suma un batch de items frames procesado en seconds."""
+        self.busy += seconds
+        if items:
+            self.items += items
+            self.samples.extend([seconds * 1000.0 / items] * items)
+    
+    def percentiles(self, last: int = None) -> dict:
+        """p50/p95/p99/max en ms por frame, de toda la corrida o de los últimos `last` frames."""
+        # Copia del array (slice) antes de verlo como NumPy: el hilo de la etapa puede seguir agregando
+        samples = np.frombuffer(self.samples[-last:] if last else self.samples[:], dtype=np.float64)
+        if not len(samples):
+            return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {"p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3), "max_ms": round(float(samples.max()), 3)}
+    
+    def to_dict(self, wall_time: float) -> dict:
+        wall_time = wall_time or 1e-9
+        return {
+            "items": self.items,
+            "busy_s": round(self.busy, 3),
+            "occupancy": round(self.busy / wall_time, 3),
+            "starved": round(self.starved / wall_time, 3),
+            "blocked": round(self.blocked / wall_time, 3),
+            **self.percentiles(),
+        }
+
+
+class _StageThread(threading.Thread):
+    """
+    Hilo que consume batches de una cola, aplica fn y produce en la siguiente.
+    Con stop_event activo descarta lo que recibe (discard) hasta _STOP.
+    """
+    
+    def __init__(self, stats: StageStats, fn, in_q, out_q, stop_event, discard=None):
+        super().__init__(name=f"stage-{stats.name}", daemon=True)
+        self.stats = stats
+        self.fn = fn
+        self.in_q = in_q
+        self.out_q = out_q
+        self.stop_event = stop_event
+        self.discard = discard
+        self.error = None
+    
+    def run(self):
+        while True:
+            t0 = time.perf_counter()
+            item = self.in_q.get()
+            t1 = time.perf_counter()
+            self.stats.starved += t1 - t0
+            
+            if item is _STOP:
+                self.out_q.put(_STOP)
+                return
+            # Tras un error o un stop se sigue drenando la entrada para no bloquear etapas previas
+            if self.error is not None or self.stop_event.is_set():
+                if self.discard is not None:
+                    self.discard(item)
+                continue
+            
+            try:
+                result = self.fn(item)
+            except Exception as e:
+                self.error = e
+                self.stop_event.set()
+                continue
+            t2 = time.perf_counter()
+            self.stats.record(t2 - t1, len(item))
+            
+            self.out_q.put(result)
+            self.stats.blocked += time.perf_counter() - t2
+
+
+class FramePipeline:
+    """
+    Etapas de Problema 1 sobre batches de paquetes.
+    Paquete: dict {frame_number, frame, tracks, angles, actions, interpolated},
+    con tracks TrackBatch y angles / actions alineados por fila.
+    
+    Con stride (AdaptiveStride) decode lee grupos de k frames, sólo se infiere
+    el keyframe de cada grupo y el resto se rellena por interpolación.
+    
+    Con pose_cache (PoseCacheWriter) se guardan los tracks de cada frame; con
+    replay (CachedPoses) no se decodifica ni se infiere: los paquetes salen del
+    cache sin frame y sólo corren análisis y export.
+    
+    renderer (OverlayRenderer) dibuja el overlay en la etapa encode, una vez por
+    frame; sin renderer (ni video ni display) no se dibuja nada. Su costo se
+    mide aparte como "render".
+    
+    Si cap presta sus buffers (FFmpegCapture con pool) cada frame se devuelve
+    al terminar su paquete, y el encoder retiene el suyo hasta escribirlo.
+    """
+    
+    STAGES = ("decode", "inference", "analytics", "encode")
+    SUBSTAGES = {"analytics": ("angles", "har", "export"), "encode": ("render", "write")}
+    
+    def __init__(self, cap, pose_tracker, angle_calculator, har_detector,
+                 data_exporter, video_exporter, batch_size: int = 1, stride=None,
+                 pose_cache=None, replay=None, renderer=None):
+        self.cap = cap
+        self.pose_tracker = pose_tracker
+        self.angle_calculator = angle_calculator
+        self.har_detector = har_detector
+        self.data_exporter = data_exporter
+        self.video_exporter = video_exporter
+        self.batch_size = max(1, batch_size)
+        self.stride = stride
+        self.pose_cache = pose_cache
+        self.replay = replay
+        self.renderer = renderer
+        self._retain = getattr(cap, "retain_frame", None)
+        self._release = getattr(cap, "release_frame", None)
+        self.frame_number = 0
+        self.stats = {}
+        for stage in self.STAGES:
+            for name in (stage, *self.SUBSTAGES.get(stage, ())):
+                if name != "render" or renderer is not None:
+                    self.stats[name] = StageStats(name)
+        self.wall_time = 0.0
+    
+    # --- Etapas ---
+    
+    def decode(self):
+        """Lee hasta batch_size (o k) frames. Returns: lista de paquetes o None al terminar."""
+        size = self.stride.k if self.stride else self.batch_size
+        if self.replay is not None:
+            packets = self.replay.read_packets(size, self.frame_number)
+            self.frame_number += len(packets)
+            return packets or None
+        packets = []
+        while len(packets) < size:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            packets.append({"frame_number": self.frame_number, "frame": frame})
+            self.frame_number += 1
+        return packets or None
+    
+    def infer(self, packets: list) -> list:
+        """Pose + tracking."""
+        if self.replay is not None:
+            return packets
+        if self.stride:
+            packets = self._infer_strided(packets)
+        elif len(packets) > 1:
+            outputs = self.pose_tracker.process_batch([p["frame"] for p in packets],
+                                                      [p["frame_number"] for p in packets])
+        else:
+            outputs = [self.pose_tracker.process(packets[0]["frame"], packets[0]["frame_number"])]
+        if not self.stride:
+            for packet, (frame, tracks) in zip(packets, outputs):
+                packet["frame"] = frame
+                packet["tracks"] = tracks
+        
+        if self.pose_cache is not None:
+            for packet in packets:
+                self.pose_cache.add(packet["tracks"], packet.get("interpolated", False))
+        return packets
+    
+    def _infer_strided(self, packets: list) -> list:
+        """Infiere sólo el keyframe del grupo y rellena los demás frames."""
+        key = packets[self.stride.key_index]
+        frame, tracks = self.pose_tracker.process(key["frame"], key["frame_number"])
+        key.update(frame=frame, tracks=tracks, interpolated=False)
+        
+        others = [p for p in packets if p is not key]
+        filled = self.stride.step(key["frame_number"], tracks, [p["frame_number"] for p in others])
+        for packet, tracks in zip(others, filled):
+            packet.update(tracks=tracks, interpolated=True)
+        return packets
+    
+    def analyze(self, packets: list) -> list:
+        """Ángulos + HAR + export de datos."""
+        angles_stats, har_stats, export_stats = self.stats["angles"], self.stats["har"], self.stats["export"]
+        for packet in packets:
+            tracks = packet["tracks"]
+            t0 = time.perf_counter()
+            angles = self.angle_calculator.calculate_tracks(tracks)
+            t1 = time.perf_counter()
+            frame, actions = self.har_detector.process(packet["frame"], tracks)
+            t2 = time.perf_counter()
+            self.data_exporter.add_frame_data(packet["frame_number"], tracks, angles, actions,
+                                              interpolated=packet.get("interpolated", False))
+            t3 = time.perf_counter()
+            angles_stats.record(t1 - t0, 1)
+            har_stats.record(t2 - t1, 1)
+            export_stats.record(t3 - t2, 1)
+            
+            packet.update(frame=frame, angles=angles, actions=actions)
+        return packets
+    
+    def encode(self, packets: list) -> list:
+        """Overlay + escritura del video de salida."""
+        render_stats, write_stats = self.stats.get("render"), self.stats["write"]
+        for packet in packets:
+            t0 = time.perf_counter()
+            if self.renderer is not None:
+                self.renderer.draw(packet["frame"], packet["tracks"], packet["actions"], packet["angles"])
+                render_stats.record(time.perf_counter() - t0, 1)
+            t1 = time.perf_counter()
+            if self._retain is not None:
+                self._retain(packet["frame"])
+            self.video_exporter.write_frame(packet["frame"], on_done=self._release)
+            write_stats.record(time.perf_counter() - t1, 1)
+        return packets
+    
+    def _release_frames(self, packets: list):
+        """Devuelve al decoder los frames de paquetes ya consumidos."""
+        if self._release is None:
+            return
+        for packet in packets:
+            if packet.get("frame") is not None:
+                self._release(packet["frame"])
+    
+    # --- Ejecución ---
+    
+    def _timed(self, name: str, fn, packets):
+        t0 = time.perf_counter()
+        result = fn(packets)
+        self.stats[name].record(time.perf_counter() - t0, len(result) if result else 0)
+        return result
+    
+    def run(self, on_frame=None, threaded: bool = False, queue_size: int = 4) -> int:
+        """
+        Procesa la fuente completa.
+        
+        Args:
+            on_frame: Callback(packet) -> bool en el hilo principal (display). False detiene.
+            threaded: True = una etapa por hilo con colas acotadas
+            queue_size: Batches máximos en cada cola
+        
+        Returns:
+            Cantidad de frames procesados
+        """
+        start = time.perf_counter()
+        try:
+            if threaded:
+                return self._run_threaded(on_frame, queue_size)
+            return self._run_sequential(on_frame)
+        finally:
+            self.wall_time = time.perf_counter() - start
+    
+    def _run_sequential(self, on_frame) -> int:
+        processed = 0
+        while True:
+            packets = self._timed("decode", lambda _: self.decode(), None)
+            if packets is None:
+                break
+            for name, fn in (("inference", self.infer), ("analytics", self.analyze), ("encode", self.encode)):
+                packets = self._timed(name, fn, packets)
+            
+            try:
+                for packet in packets:
+                    processed += 1
+                    if on_frame and on_frame(packet) is False:
+                        return processed
+            finally:
+                self._release_frames(packets)
+        return processed
+    
+    def _run_threaded(self, on_frame, queue_size: int) -> int:
+        stop_event = threading.Event()
+        queues = [queue.Queue(maxsize=queue_size) for _ in range(len(self.STAGES))]
+        
+        errors = []
+        
+        def source():
+            stats = self.stats["decode"]
+            try:
+                while not stop_event.is_set():
+                    t0 = time.perf_counter()
+                    packets = self.decode()
+                    t1 = time.perf_counter()
+                    stats.record(t1 - t0, len(packets) if packets else 0)
+                    if packets is None:
+                        break
+                    queues[0].put(packets)
+                    stats.blocked += time.perf_counter() - t1
+            except Exception as e:
+                errors.append(e)
+            finally:
+                queues[0].put(_STOP)
+        
+        decoder = threading.Thread(target=source, name="stage-decode", daemon=True)
+        workers = [
+            _StageThread(self.stats[name], fn, queues[i], queues[i + 1], stop_event, self._release_frames)
+            for i, (name, fn) in enumerate((("inference", self.infer),
+                                            ("analytics", self.analyze),
+                                            ("encode", self.encode)))
+        ]
+        decoder.start()
+        for worker in workers:
+            worker.start()
+        
+        # Hilo principal: consume la salida (display) hasta el fin de la fuente.
+        # Tras un stop se descarta lo encolado: frames y resumen igual que en modo secuencial
+        processed = 0
+        while True:
+            packets = queues[-1].get()
+            if packets is _STOP:
+                break
+            if not stop_event.is_set():
+                for packet in packets:
+                    processed += 1
+                    if on_frame and on_frame(packet) is False:
+                        stop_event.set()
+                        break
+            self._release_frames(packets)
+        
+        decoder.join()
+        for worker in workers:
+            worker.join()
+            if worker.error is not None:
+                errors.append(worker.error)
+        if errors:
+            raise errors[0]
+        return processed
+    
+    def stats_dict(self) -> dict:
+        """Ocupación por etapa (fracción del tiempo total)."""
+        return {name: stats.to_dict(self.wall_time) for name, stats in self.stats.items()}
+    
+    def print_stats(self):
+        print("\nEtapa        frames   busy_s  ocupación  esperando  bloqueada   p50 ms   p95 ms   p99 ms")
+        for name, s in self.stats_dict().items():
+            if name not in self.STAGES:
+                name = f"  {name}"
+            percentiles = "".join(f"{s[p]:>9.2f}" if s[p] is not None else f"{'-':>9}"
+                                  for p in ("p50_ms", "p95_ms", "p99_ms"))
+            print(f"{name:<10} {s['items']:>8} {s['busy_s']:>8.2f} {s['occupancy']:>10.0%}"
+                  f" {s['starved']:>10.0%} {s['blocked']:>10.0%}{percentiles}")
+        print(f"Tiempo total: {self.wall_time:.2f}s")
@@ -0,0 +1,237 @@
+"""
+Cache en disco de la salida cruda de pose + tracking por frame.
+
+La clave es un hash del contenido del video, de los pesos del modelo y de los
+parámetros de inferencia, así re-procesar el mismo video (por ejemplo para
+ajustar umbrales de HAR o ángulos) reutiliza las poses sin decodificar ni
+inferir. Cada entrada es un archivo {clave}.poses con el layout de
+chunk_format (header JSON + arrays planos sin comprimir, leídos con mmap):
+    
+    person_offsets (frames + 1) | track_ids | bboxes (N, 4) | keypoints (N, 17, 3)
+    has_keypoints (N) | interpolated (frames)
+
+El tamaño total se acota con desalojo LRU (por mtime, que se actualiza en
+cada hit).
+"""
+import os
+import json
+import mmap
+import shutil
+import hashlib
+import numpy as np
+from pathlib import Path
+from . import chunk_format
+from .track_batch import TrackBatch, NUM_KEYPOINTS
+
+
+MAGIC = b"UIFP"
+VERSION = 1
+EXTENSION = ".poses"
+
+
+def file_digest(path) -> str:
+    """sha256 del contenido de un archivo."""
+    with open(path, "rb") as f:
+        digest = hashlib.sha256()
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PoseCache:
+    """Directorio de entradas .poses con límite de tamaño."""
+    
+    def __init__(self, cache_dir: str, max_bytes: int = 10 * 1024 ** 3):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._hashes_path = self.dir / "hashes.json"
+        self.evicted = 0
+    
+    def _content_hash(self, path) -> str:
+        """
+        Hash del archivo, memorizado por (ruta, tamaño, mtime) para no releer
+        videos de varios GB en cada corrida.
+        """
+        path = Path(path).resolve()
+        st = path.stat()
+        memo_key = f"{path}:{st.st_size}:{st.st_mtime_ns}"
+        try:
+            hashes = json.loads(self._hashes_path.read_text())
+        except (OSError, ValueError):
+            hashes = {}
+        if memo_key not in hashes:
+            hashes[memo_key] = file_digest(path)
+            tmp = self._hashes_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(hashes))
+            os.replace(tmp, self._hashes_path)
+        return hashes[memo_key]
+    
+    def key(self, video_path, model: str, params: dict) -> str:
+        """
+        Args:
+            video_path: Video de entrada
+            model: Nombre o ruta de los pesos (si es un archivo local se hashea su contenido)
+            params: Parámetros que cambian la salida de inferencia (batch, stride, versión, ...)
+        """
+        weights = self._content_hash(model) if Path(model).is_file() else model
+        blob = json.dumps({"version": VERSION, "video": self._content_hash(video_path),
+                           "weights": weights, "params": params}, sort_keys=True)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+    
+    def path(self, key: str) -> Path:
+        return self.dir / f"{key}{EXTENSION}"
+    
+    def get(self, key: str):
+        """Returns: CachedPoses o None si no está."""
+        path = self.path(key)
+        if not path.exists():
+            return None
+        os.utime(path)  # LRU
+        return CachedPoses(path)
+    
+    def writer(self, key: str, meta: dict):
+        return PoseCacheWriter(self, key, meta)
+    
+    def entries(self) -> list:
+        """[(path, bytes, mtime)] de más viejo a más nuevo."""
+        entries = []
+        for path in self.dir.glob(f"*{EXTENSION}"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue  # desalojado por otro proceso
+            entries.append((path, st.st_size, st.st_mtime))
+        return sorted(entries, key=lambda e: e[2])
+    
+    def evict(self, keep: Path = None):
+        """Borra las entradas menos usadas hasta quedar bajo max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evicted += 1
+    
+    def stats(self) -> dict:
+        entries = self.entries()
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries), "evicted": self.evicted}
+
+
+class PoseCacheWriter:
+    """
+    Escribe los tracks frame a frame (en orden) a un temporal por columna y
+    arma la entrada al terminar: en memoria sólo queda un contador por frame.
+    """
+    
+    # Columnas por persona: (nombre, dtype, forma de una fila)
+    COLUMNS = (("track_ids", np.int32, ()), ("bboxes", np.float32, (4,)),
+               ("keypoints", np.float32, (NUM_KEYPOINTS, 3)), ("has_keypoints", np.bool_, ()))
+    
+    def __init__(self, cache: PoseCache, key: str, meta: dict):
+        self.cache = cache
+        self.key = key
+        self.meta = meta
+        self.counts = []
+        self.interpolated = []
+        base = cache.path(key).with_suffix(f".{os.getpid()}")
+        self._columns = {name: open(f"{base}.{name}.tmp", "w+b") for name, _, _ in self.COLUMNS}
+    
+    def add(self, tracks: TrackBatch, interpolated: bool = False):
+        has_keypoints = tracks.has_keypoints
+        # En disco los tracks sin pose van en cero + has_keypoints (NaN sólo en memoria)
+        keypoints = np.where(has_keypoints[:, None, None], tracks.keypoints, np.float32(0))
+        for name, array in (("track_ids", tracks.ids), ("bboxes", tracks.bboxes),
+                            ("keypoints", keypoints), ("has_keypoints", has_keypoints)):
+            self._columns[name].write(np.ascontiguousarray(array).tobytes())
+        self.counts.append(len(tracks))
+        self.interpolated.append(interpolated)
+    
+    def commit(self) -> Path:
+        """Escribe la entrada (rename atómico) y aplica el límite de tamaño."""
+        rows = sum(self.counts)
+        head = np.cumsum([0] + self.counts, dtype=np.int64)
+        tail = np.array(self.interpolated, dtype=bool)
+        entries, offset = [], 0
+        for name, dtype, shape in [("person_offsets", head.dtype, head.shape),
+                                   *((name, np.dtype(dtype), (rows, *row)) for name, dtype, row in self.COLUMNS),
+                                   ("interpolated", tail.dtype, tail.shape)]:
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            entries.append({"name": name, "dtype": dtype.str, "shape": list(shape), "offset": offset, "nbytes": nbytes})
+            offset += nbytes
+        header = chunk_format.pack_header({"version": VERSION, **self.meta, "frames": len(self.counts)},
+                                          entries, magic=MAGIC)
+        
+        path = self.cache.path(self.key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(head.tobytes())
+            for column in self._columns.values():
+                column.seek(0)
+                shutil.copyfileobj(column, f, 1 << 20)
+            f.write(tail.tobytes())
+        self.discard()
+        os.replace(tmp, path)
+        self.cache.evict(keep=path)
+        return path
+    
+    def discard(self):
+        """Borra los temporales sin guardar la entrada."""
+        for column in self._columns.values():
+            column.close()
+            Path(column.name).unlink(missing_ok=True)
+        self._columns = {}
+
+
+class CachedPoses:
+    """
+    Entrada leída con mmap. Reemplaza a la fuente de video en FramePipeline
+    (replay): entrega paquetes con los tracks ya calculados y sin frame.
+    """
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        arrays = chunk_format.unpack_arrays(self._mmap, magic=MAGIC)
+        self.meta = arrays.pop("header")
+        self.offsets = arrays["person_offsets"]
+        self.track_ids = arrays["track_ids"]
+        self.bboxes = arrays["bboxes"]
+        self.keypoints = arrays["keypoints"]
+        self.has_keypoints = arrays["has_keypoints"]
+        self.interpolated = arrays["interpolated"]
+        self.position = 0
+    
+    def __len__(self):
+        return len(self.interpolated)
+    
+    def tracks(self, frame: int) -> TrackBatch:
+        """Tracks de un frame (copias: los arrays del mmap se sueltan en close())."""
+        start, end = self.offsets[frame], self.offsets[frame + 1]
+        has_keypoints = self.has_keypoints[start:end, None, None]
+        return TrackBatch(self.track_ids[start:end].copy(), self.bboxes[start:end].copy(),
+                          np.where(has_keypoints, self.keypoints[start:end], np.float32(np.nan)))
+    
+    def read_packets(self, count: int, frame_number: int) -> list:
+        """Siguientes count paquetes {frame_number, frame: None, tracks, interpolated}."""
+        end = min(self.position + count, len(self))
+        packets = [{"frame_number": frame_number + i, "frame": None, "tracks": self.tracks(f),
+                    "interpolated": bool(self.interpolated[f])}
+                   for i, f in enumerate(range(self.position, end))]
+        self.position = end
+        return packets
+    
+    def close(self):
+        # Los arrays son vistas del mmap: se sueltan antes de cerrarlo
+        self.offsets = self.track_ids = self.bboxes = self.keypoints = None
+        self.has_keypoints = self.interpolated = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # queda alguna vista viva: se cierra al recolectarla
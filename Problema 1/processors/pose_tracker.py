@@ -1,48 +1,111 @@
 """
-Pose Estimation + Tracking usando YOLOv8-pose con BoT-SORT integrado.
+Pose Estimation + Tracking usando YOLOv8-pose con BoT-SORT integrado
+o con KeypointTracker (IoU + OKS, fuera del modelo).
 """
-from ultralytics import YOLO
-import cv2
+import time
+from common.inference_backend import load_model
+from common.latency_tuner import handoff_tracker
+from .track_batch import TrackBatch
+from common.keypoint_tracker import KeypointTracker
 
 
 class PoseTracker:
-    def __init__(self, model_name: str = "yolov8n-pose.pt"):
-        self.model = YOLO(model_name)
+    TRACKERS = ("ultralytics", "keypoint")
     
-    def process(self, frame):
+    def __init__(self, model_name: str = "yolov8n-pose.pt", backend: str = "torch", imgsz: int = 640,
+                 tracker: str = "ultralytics", **backend_options):
+        """
+        Args:
+            backend: "torch", "onnx" u "openvino" (ver inference_backend.py)
+            imgsz: Resolución de inferencia (la cambia LatencyTuner si está activo)
+            tracker: "ultralytics" (model.track: BoT-SORT, o TrackTrack en versiones
+                recientes) o "keypoint" (predict + KeypointTracker)
+            backend_options: int8, calibration, export_dir de load_model
+        """
+        if tracker not in self.TRACKERS:
+            raise ValueError(f"Tracker no soportado: {tracker}")
+        self.tracker = KeypointTracker() if tracker == "keypoint" else None
+        self.backend = backend
+        self.backend_options = backend_options
+        self.model = load_model(model_name, backend, imgsz=imgsz, **backend_options)
+        self.imgsz = imgsz
+        # Variantes cargadas (las reutiliza el tuner entre videos en batch.py)
+        self.models = {model_name: self.model}
+        self.tuner = None
+    
+    def load_variant(self, model_name: str):
+        """Modelo de otra variante con el mismo backend, cargado una sola vez."""
+        if model_name not in self.models:
+            self.models[model_name] = load_model(model_name, self.backend, imgsz=self.imgsz, **self.backend_options)
+        return self.models[model_name]
+    
+    def set_model(self, model, imgsz: int):
+        """Cambia modelo y/o resolución sin reiniciar IDs (el estado de BoT-SORT pasa al modelo nuevo)."""
+        if model is not self.model:
+            handoff_tracker(self.model, model)
+            self.model = model
+        self.imgsz = imgsz
+    
+    def _track(self, source, count: int) -> list:
+        start = time.perf_counter()
+        if self.tracker is None:
+            results = self.model.track(source, persist=True, verbose=False, imgsz=self.imgsz)
+        else:
+            # Mismo umbral que usa track(): las detecciones débiles van a la segunda etapa
+            results = self.model.predict(source, verbose=False, imgsz=self.imgsz, conf=self.tracker.low_conf)
+        if self.tuner is not None:
+            self.tuner.observe((time.perf_counter() - start) * 1000 / count, count)
+        return results
+    
+    def reset(self):
+        """Reinicia el tracker (IDs desde cero) sin recargar el modelo, para pasar a otro video."""
+        if self.tracker is not None:
+            self.tracker.reset()
+        predictor = self.model.predictor
+        for tracker in getattr(predictor, "trackers", None) or []:
+            tracker.reset()
+    
+    def _build_output(self, result, frame, frame_number: int = None):
+        """
+        Extrae tracks de un resultado YOLO. El frame se devuelve sin anotar:
+        el dibujo se hace una sola vez en OverlayRenderer (o nunca, sin video ni display).
+        """
+        if self.tracker is None:
+            return frame, TrackBatch.from_result(result)
+        data, keypoints = TrackBatch.result_arrays(result)
+        ids = self.tracker.update(data[:, :4], data[:, 4], keypoints, frame=frame_number)
+        tracked = ids >= 0
+        return frame, TrackBatch(ids[tracked], data[tracked, :4], keypoints[tracked] if keypoints is not None else None)
+    
+    def process(self, frame, frame_number: int = None):
         """
         Procesa un frame para detectar poses y trackear personas.
         
+        Args:
+            frame_number: Número de frame en la fuente (KeypointTracker: salto entre frames inferidos)
+        
         Returns:
-            frame: Frame con anotaciones
-            tracks: Lista de dicts con {id, bbox, keypoints}
+            frame: El mismo frame (sin anotar, ver OverlayRenderer)
+            tracks: TrackBatch con ids, bboxes y keypoints
         """
-        # track=True activa BoT-SORT internamente
-        results = self.model.track(frame, persist=True, verbose=False)
-        
-        tracks = []
-        
-        if results[0].boxes.id is not None:
-            boxes = results[0].boxes
-            keypoints = results[0].keypoints
-            
-            for i, box in enumerate(boxes):
-                track_id = int(box.id[0])
-                bbox = box.xyxy[0].cpu().numpy()
-                kpts = keypoints[i].data[0].cpu().numpy() if keypoints else None
-                
-                tracks.append({
-                    "id": track_id,
-                    "bbox": bbox,
-                    "keypoints": kpts
-                })
-                
-                # Dibujar ID
-                x1, y1 = int(bbox[0]), int(bbox[1])
-                cv2.putText(frame, f"ID:{track_id}", (x1, y1 - 10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        # Tracker de ultralytics dentro de model.track, o predict + KeypointTracker
+        results = self._track(frame, 1)
+        return self._build_output(results[0], frame, frame_number)
+    
+    def process_batch(self, frames: list, frame_numbers: list = None) -> list:
+        """
+        Procesa varios frames consecutivos en una sola inferencia (archivos de video).
         
-        # Dibujar poses (YOLO ya lo hace, pero lo hacemos explícito)
-        annotated = results[0].plot()
+        Con una lista de frames YOLO infiere el batch completo y luego actualiza
+        un único tracker en orden de frame, por lo que los IDs coinciden con los
+        de llamar a process() frame a frame.
         
-        return annotated, tracks
+        Returns:
+            Lista de (frame, tracks) en el mismo orden que frames
+        """
+        if not frames:
+            return []
+        results = self._track(frames, len(frames))
+        frame_numbers = frame_numbers or [None] * len(frames)
+        return [self._build_output(result, frame, number)
+                for result, frame, number in zip(results, frames, frame_numbers)]
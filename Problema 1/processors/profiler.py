@@ -0,0 +1,145 @@
+"""
+Instrumentación de FramePipeline: archivo de stats, impresión en vivo y
+profiler por muestreo.
+
+Los tiempos por etapa y sub-etapa los mide el pipeline (StageStats); acá se
+exportan como {session_id}_stats.json junto a los chunks, se imprimen cada N
+segundos con percentiles de la ventana reciente, y opcionalmente se muestrea
+el stack de todos los hilos para ver qué funciones dominan dentro de cada etapa.
+"""
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+from collections import Counter
+
+
+STATS_SUFFIX = "_stats.json"
+FOLDED_SUFFIX = "_profile.folded"
+# Hojas de stack de un hilo bloqueado (colas, eventos, join): no es tiempo de CPU
+IDLE_LEAVES = {"threading:wait", "threading:_wait_for_tstate_lock"}
+
+
+class StackSampler:
+    """
+    Profiler por muestreo sin dependencias: cada `interval` segundos toma el
+    stack de todos los hilos (sys._current_frames) y cuenta stacks colapsados.
+    El costo es proporcional a la frecuencia, no a la cantidad de llamadas.
+    """
+    
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+    
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+    
+    def top(self, n: int = 20) -> list:
+        """Funciones con más muestras en el tope del stack (tiempo propio), sin hilos en espera."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            thread, _, rest = stack.partition(";")
+            leaf = rest.rsplit(";", 1)[-1]
+            if leaf not in IDLE_LEAVES:
+                leaves[(thread, leaf)] += count
+        total = self.samples or 1
+        return [{"thread": thread, "function": function, "samples": count, "fraction": round(count / total, 3)}
+                for (thread, function), count in leaves.most_common(n)]
+    
+    def write_folded(self, path) -> str:
+        """Stacks colapsados (formato de flamegraph.pl / speedscope)."""
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return str(path)
+
+
+class LiveStats:
+    """Imprime cada `interval` segundos fps y percentiles de los últimos `window` frames por etapa."""
+    
+    def __init__(self, pipeline, interval: float = 5.0, window: int = 300, stream=None):
+        self.pipeline = pipeline
+        self.interval = interval
+        self.window = window
+        self.stream = stream or sys.stderr
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="live-stats", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+    
+    def _run(self):
+        last_frames, last_time = 0, time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frames = self.pipeline.stats["encode"].items
+            fps = (frames - last_frames) / (now - last_time)
+            last_frames, last_time = frames, now
+            parts = []
+            for name, stats in list(self.pipeline.stats.items()):
+                p = stats.percentiles(self.window)
+                if p["p50_ms"] is not None:
+                    parts.append(f"{name} {p['p50_ms']:.1f}/{p['p95_ms']:.1f}/{p['p99_ms']:.1f}")
+            print(f"[stats] {frames} frames {fps:.1f} fps | p50/p95/p99 ms: " + " | ".join(parts),
+                  file=self.stream, flush=True)
+
+
+def write_stats(output_dir: str, session_id: str, pipeline, sampler: StackSampler = None, **extra) -> str:
+    """
+    Escribe {session_id}_stats.json (y {session_id}_profile.folded con sampler).
+    
+    Returns:
+        Ruta del archivo de stats
+    """
+    path = Path(output_dir) / f"{session_id}{STATS_SUFFIX}"
+    stats = {
+        "session_id": session_id,
+        "wall_s": round(pipeline.wall_time, 3),
+        "stages": pipeline.stats_dict(),
+        **extra,
+    }
+    if sampler is not None:
+        stats["sampler"] = {
+            "interval_s": sampler.interval,
+            "samples": sampler.samples,
+            "top": sampler.top(),
+            "folded": Path(sampler.write_folded(Path(output_dir) / f"{session_id}{FOLDED_SUFFIX}")).name,
+        }
+    path.write_text(json.dumps(stats, indent=2))
+    return str(path)
@@ -0,0 +1,98 @@
+"""
+Replay de sesiones exportadas: recalcula ángulos, HAR y export desde los
+keypoints guardados, sin video ni modelo.
+
+Los chunks (JSON o binario, sueltos o en bundles) se leen por el manifest de
+la sesión y se pasan a un TrackBatch por chunk (CSR, como chunk_format). Los
+ángulos se calculan de una vez por chunk y HAR actualiza su estado temporal frame a frame
+pero clasifica el chunk completo (HARDetector.process_batch).
+"""
+import time
+import numpy as np
+from .angle_calculator import AngleCalculator
+from .har_detector import HARDetector
+from .data_exporter import DataExporter
+from .session_manifest import SessionIndex
+from .track_batch import TrackBatch, NUM_KEYPOINTS
+
+
+def _json_arrays(chunk: dict) -> dict:
+    """Chunk JSON -> mismos arrays que decode_chunk."""
+    frames = chunk["frames"]
+    persons = [p for f in frames for p in f["persons"]]
+    keypoints = np.full((len(persons), NUM_KEYPOINTS, 3), np.nan, dtype=np.float32)
+    for i, person in enumerate(persons):
+        if person["keypoints"] is not None:
+            keypoints[i] = person["keypoints"]
+    return {
+        "frames": np.array([f["frame"] for f in frames], dtype=np.int32),
+        "person_offsets": np.cumsum([0] + [len(f["persons"]) for f in frames], dtype=np.int32),
+        "track_ids": np.array([p["id"] for p in persons], dtype=np.int32),
+        "bboxes": np.array([p["bbox"] for p in persons], dtype=np.float32).reshape(len(persons), 4),
+        "keypoints": keypoints,
+        "interpolated": np.array([f.get("interpolated", False) for f in frames], dtype=bool),
+    }
+
+
+def iter_chunks(index: SessionIndex):
+    """Arrays de cada chunk de la sesión, en orden de segundo."""
+    for chunk in index.chunks:
+        data = index.load(chunk)
+        yield data if index.session.get("format") == "binary" else _json_arrays(data)
+
+
+def replay_session(manifest_path, output_dir: str, session_id: str = None, format: str = None,
+                   compression: str = None, angle_calculator: AngleCalculator = None,
+                   har_detector: HARDetector = None) -> dict:
+    """
+    Re-procesa una sesión y la escribe como una sesión nueva.
+    
+    Args:
+        manifest_path: {session_id}_manifest.jsonl de la sesión original
+        output_dir: Directorio de la sesión nueva
+        session_id: Prefijo de la sesión nueva (default: {original}_replay)
+        format, compression: Formato de los chunks nuevos (default: los de la original)
+        angle_calculator, har_detector: Instancias a usar (ej. con otros umbrales)
+    
+    Returns:
+        Resumen {source, session_id, frames, persons, wall_s, fps, manifest}
+    """
+    start = time.perf_counter()
+    index = SessionIndex(manifest_path)
+    session = index.session
+    fps = session.get("fps") or 30.0
+    session_id = session_id or f"{session['session_id']}_replay"
+    if format is None:
+        format, compression = session.get("format", "json"), session.get("compression")
+    
+    angle_calculator = angle_calculator or AngleCalculator()
+    har_detector = har_detector or HARDetector(fps=fps)
+    exporter = DataExporter(output_dir=output_dir, fps=fps, format=format, compression=compression,
+                            session_id=session_id)
+    
+    frames = persons = 0
+    for arrays in iter_chunks(index):
+        offsets = arrays["person_offsets"]
+        tracks = TrackBatch(arrays["track_ids"], arrays["bboxes"], arrays["keypoints"])
+        
+        angles = angle_calculator.calculate_tracks(tracks)
+        actions = har_detector.process_batch(tracks.ids, tracks.keypoints, offsets)
+        
+        for f, frame_number in enumerate(arrays["frames"]):
+            lo, hi = offsets[f], offsets[f + 1]
+            exporter.add_frame_data(int(frame_number), tracks[lo:hi], angles[lo:hi], actions[lo:hi],
+                                    interpolated=bool(arrays["interpolated"][f]))
+        frames += len(arrays["frames"])
+        persons += len(tracks)
+    exporter.finalize()
+    
+    wall = time.perf_counter() - start
+    return {
+        "source": str(manifest_path),
+        "session_id": session_id,
+        "frames": frames,
+        "persons": persons,
+        "wall_s": round(wall, 3),
+        "fps": round(frames / wall, 1) if wall else 0.0,
+        "manifest": str(exporter.manifest.path),
+    }
@@ -1,22 +1,70 @@
 """
 Uploader de archivos a AWS S3.
 Credenciales via variables de entorno: AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION
-Bucket via config.json
+Bucket via config.json (opcional: "endpoint_url" para MinIO / S3 local)
+
+Un manifest local (config "manifest") registra hash, tamaño y ETag por key:
+los archivos sin cambios no se vuelven a subir y los multipart uploads de
+archivos grandes (part_size_mb / max_concurrency) se reanudan tras un corte.
 """
 import os
 import json
+import math
+import time
+import threading
 import boto3
 from pathlib import Path
-from botocore.exceptions import ClientError, NoCredentialsError
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import (BotoCoreError, ClientError, ConnectionError as BotoConnectionError,
+                                 HTTPClientError, NoCredentialsError)
+from .upload_manifest import UploadManifest
+from . import bundle_packer
+
+
+# Códigos de S3 que vale la pena reintentar (throttling y fallas del servicio)
+TRANSIENT_CODES = {"SlowDown", "Throttling", "ThrottlingException", "RequestLimitExceeded",
+                   "TooManyRequestsException", "RequestTimeout", "RequestTimeoutException",
+                   "InternalError", "ServiceUnavailable"}
+
+
+def is_transient(error: Exception) -> bool:
+    """True si el error es throttling, 5xx o de conexión; AccessDenied, NoSuchBucket, etc. fallan sin reintento."""
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code")
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return code in TRANSIENT_CODES or status >= 500 or status == 429
+    return isinstance(error, (BotoConnectionError, HTTPClientError))
 
 
 class S3Uploader:
     """Sube archivos a AWS S3."""
     
-    def __init__(self, config_path: str = "config.json"):
+    def __init__(self, config_path: str = "config.json", client=None):
+        """
+        Args:
+            config_path: JSON con {"s3": {"bucket", "prefix", "endpoint_url"?, "manifest"?,
+                         "multipart_threshold_mb"?, "part_size_mb"?, "max_concurrency"?}}
+            client: Cliente boto3 ya creado (ej. moto en tests); si es None se crea uno
+        """
         self.config = self._load_config(config_path)
-        self.client = None
-        self._init_client()
+        self.client = client
+        if self.client is None:
+            self._init_client()
+        # Modo streaming (start_streaming / enqueue / drain)
+        self._executor = None
+        self._futures = []
+        self._lock = threading.Lock()
+        self.max_retries = 3
+        self.backoff = 0.5
+        # Multipart y dedup
+        s3_cfg = self.config.get("s3", {})
+        self.multipart_threshold = int(s3_cfg.get("multipart_threshold_mb", 64) * 2**20)
+        self.part_size = max(5 * 2**20, int(s3_cfg.get("part_size_mb", 16) * 2**20))  # mínimo S3: 5 MB
+        self.max_concurrency = s3_cfg.get("max_concurrency", 4)
+        manifest_path = s3_cfg.get("manifest", "s3_manifest.json")
+        self.manifest = UploadManifest(manifest_path) if manifest_path else None
+        self.stats = {"uploaded_bytes": 0, "skipped_files": 0, "skipped_bytes": 0, "resumed_bytes": 0}
+        self._sent_parts = {}  # UploadId -> partes subidas por este proceso (no cuentan como reanudadas)
     
     def _load_config(self, config_path: str) -> dict:
         """Carga configuración desde JSON."""
@@ -33,20 +81,22 @@ class S3Uploader:
                 's3',
                 aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
                 aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-                region_name=os.getenv('AWS_REGION', 'us-east-1')
+                region_name=os.getenv('AWS_REGION', 'us-east-1'),
+                endpoint_url=self.config.get("s3", {}).get("endpoint_url") or None
             )
         except Exception as e:
             print(f"Warning: No se pudo inicializar S3: {e}")
             self.client = None
     
-    def upload_file(self, file_path: str, key: str = None) -> bool:
+    def upload_file(self, file_path: str, key: str = None, retries: int = 0) -> bool:
         """
         Sube un archivo a S3.
         
         Args:
             file_path: Ruta local del archivo
             key: Key en S3 (opcional, usa nombre del archivo)
-            
+            retries: Reintentos ante errores transitorios (is_transient; backoff exponencial)
+        
         Returns:
             True si exitoso, False si falló
         """
@@ -68,16 +118,39 @@ class S3Uploader:
             prefix = self.config.get("s3", {}).get("prefix", "")
             key = f"{prefix}{path.name}"
         
-        try:
-            self.client.upload_file(str(path), bucket, key)
-            print(f"Uploaded to S3: s3://{bucket}/{key}")
-            return True
-        except NoCredentialsError:
-            print("Error: Credenciales AWS no encontradas")
-            return False
-        except ClientError as e:
-            print(f"Error S3: {e}")
-            return False
+        name = f"{bucket}/{key}"
+        size = path.stat().st_size
+        sha256 = None
+        if self.manifest:
+            sha256, unchanged = self.manifest.fingerprint(name, path)
+            if unchanged:
+                print(f"Sin cambios, se omite: s3://{bucket}/{key}")
+                self._add_stats(skipped_files=1, skipped_bytes=size)
+                return True
+        
+        for attempt in range(retries + 1):
+            try:
+                if size >= self.multipart_threshold:
+                    etag = self._upload_multipart(path, bucket, key, name, sha256)
+                else:
+                    with open(path, "rb") as f:
+                        etag = self.client.put_object(Bucket=bucket, Key=key, Body=f)["ETag"]
+                    self._add_stats(uploaded_bytes=size)
+                if self.manifest:
+                    self.manifest.record(name, path, sha256, etag)
+                print(f"Uploaded to S3: s3://{bucket}/{key}")
+                return True
+            except NoCredentialsError:
+                print("Error: Credenciales AWS no encontradas")
+                return False
+            except (ClientError, BotoCoreError) as e:
+                if attempt == retries or not is_transient(e):
+                    print(f"Error S3: {e}")
+                    return False
+                delay = self.backoff * 2 ** attempt
+                print(f"Error S3 ({path.name}), reintento {attempt + 1}/{retries} en {delay:.1f}s: {e}")
+                time.sleep(delay)
+        return False
     
     def upload_directory(self, dir_path: str, pattern: str = "*.json") -> int:
         """Sube todos los archivos que coincidan con el patrón."""
@@ -86,4 +159,123 @@ class S3Uploader:
         for file in path.glob(pattern):
             if self.upload_file(str(file)):
                 count += 1
+        if self.manifest:
+            self.manifest.save()
         return count
+    
+    def upload_bundles(self, dir_path: str, pattern: str = "*") -> int:
+        """Sube los bundles de BundlePacker (con su índice) en lugar de los chunks sueltos."""
+        count = 0
+        for bundle in sorted(Path(dir_path).glob(f"{pattern}{bundle_packer.EXTENSION}")):
+            if all([self.upload_file(str(f)) for f in bundle_packer.bundle_files(bundle)]):
+                count += 1
+        if self.manifest:
+            self.manifest.save()
+        return count
+    
+    def _add_stats(self, **values):
+        with self._lock:
+            for name, value in values.items():
+                self.stats[name] += value
+    
+    def _upload_multipart(self, path: Path, bucket: str, key: str, name: str, sha256: str) -> str:
+        """
+        Multipart upload reanudable: el UploadId queda en el manifest y, si el
+        proceso se corta, el siguiente intento sólo sube las partes faltantes.
+        """
+        size = path.stat().st_size
+        pending = self.manifest.pending(name) if self.manifest else None
+        upload_id, done = None, {}
+        
+        if pending and pending["sha256"] == sha256 and pending["size"] == size:
+            try:
+                done = self._uploaded_parts(bucket, key, pending["upload_id"])
+                upload_id, part_size = pending["upload_id"], pending["part_size"]
+            except ClientError:
+                pass  # Upload expirado o abortado: empezar de nuevo
+        
+        if upload_id is None:
+            if pending:
+                # El archivo cambió o el upload no se puede listar: abortarlo para no dejar partes cobradas
+                self._abort_multipart(bucket, key, pending["upload_id"])
+            part_size = self.part_size
+            upload_id = self.client.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+            if self.manifest:
+                self.manifest.set_pending(name, {"upload_id": upload_id, "part_size": part_size,
+                                                 "sha256": sha256, "size": size})
+        
+        num_parts = math.ceil(size / part_size)
+        missing = [n for n in range(1, num_parts + 1) if n not in done]
+        # Cada parte cuenta una vez: en uploaded_bytes si la subió este proceso (ej. un reintento), si no en resumed_bytes
+        sent = self._sent_parts.setdefault(upload_id, set())
+        resumed = sum(min(part_size, size - (n - 1) * part_size) for n in done if n not in sent)
+        if done:
+            print(f"Reanudando {path.name}: {len(done)}/{num_parts} partes ya subidas")
+        
+        def upload_part(number):
+            with open(path, "rb") as f:
+                f.seek((number - 1) * part_size)
+                body = f.read(part_size)
+            response = self.client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id,
+                                               PartNumber=number, Body=body)
+            self._add_stats(uploaded_bytes=len(body))
+            sent.add(number)
+            return number, response["ETag"]
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            done.update(executor.map(upload_part, missing))
+        
+        response = self.client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": n, "ETag": done[n]} for n in sorted(done)]}
+        )
+        self._add_stats(resumed_bytes=resumed)
+        self._sent_parts.pop(upload_id, None)
+        return response["ETag"]
+    
+    def _abort_multipart(self, bucket: str, key: str, upload_id: str):
+        """Aborta un multipart upload viejo (si ya no existe, no hay nada que hacer)."""
+        try:
+            self.client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                print(f"No se pudo abortar el upload {upload_id} de {key}: {e}")
+    
+    def _uploaded_parts(self, bucket: str, key: str, upload_id: str) -> dict:
+        """Partes ya subidas de un multipart upload: {PartNumber: ETag}."""
+        parts = {}
+        paginator = self.client.get_paginator("list_parts")
+        for page in paginator.paginate(Bucket=bucket, Key=key, UploadId=upload_id):
+            for part in page.get("Parts", []):
+                parts[part["PartNumber"]] = part["ETag"]
+        return parts
+    
+    def start_streaming(self, max_workers: int = 4, max_retries: int = 3, backoff: float = 0.5):
+        """
+        Activa la subida concurrente: enqueue() sube cada archivo en un pool de hilos
+        apenas está listo, en lugar de esperar al final del procesamiento.
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-upload")
+    
+    def enqueue(self, file_path, key: str = None):
+        """Encola un archivo para subir (requiere start_streaming)."""
+        if self._executor is None:
+            raise RuntimeError("Llamar a start_streaming() antes de enqueue()")
+        future = self._executor.submit(self.upload_file, str(file_path), key, self.max_retries)
+        with self._lock:
+            self._futures.append(future)
+    
+    def drain(self) -> dict:
+        """Espera todas las subidas pendientes y cierra el pool."""
+        if self._executor is None:
+            return {"uploaded": 0, "failed": 0}
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        with self._lock:
+            results = [f.result() for f in self._futures]
+            self._futures = []
+        if self.manifest:
+            self.manifest.save()
+        return {"uploaded": sum(results), "failed": len(results) - sum(results), **self.stats}
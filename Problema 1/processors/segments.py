@@ -0,0 +1,250 @@
+"""
+Procesamiento de un video largo en segmentos paralelos.
+
+Cada segmento arranca `overlap` frames antes de su inicio: esos frames de
+warm-up llenan las ventanas de HAR y el estado del tracker y, como coinciden
+con el final del segmento anterior, sirven para unir los IDs de tracks entre
+segmentos (votación por IoU de bboxes). Después la exportación se hace en un
+solo pase con frame_number global, así los chunks por segundo quedan
+numerados como una sesión continua.
+
+Los workers escriben sus frames a disco en bloques (formato binario de
+chunks) en lugar de devolverlos al proceso principal: la unión sólo lee las
+ventanas de solape, y export y render leen bloque a bloque, así la memoria no
+crece con el largo del video.
+"""
+import shutil
+import subprocess
+import cv2
+import numpy as np
+from pathlib import Path
+from .track_batch import TrackBatch
+from .angle_calculator import AngleCalculator
+from . import chunk_format
+
+
+def plan_segments(total_frames: int, segments: int, overlap: int) -> list:
+    """
+    Returns:
+        Lista de {index, warm_start, start, end}: se exportan [start, end),
+        se procesan [warm_start, end)
+    """
+    segments = max(1, min(segments, total_frames))
+    bounds = np.linspace(0, total_frames, segments + 1).round().astype(int)
+    return [{"index": i, "warm_start": max(0, int(start) - overlap), "start": int(start), "end": int(end)}
+            for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:]))]
+
+
+class SegmentCapture:
+    """VideoCapture posicionado en un frame y acotado a N frames."""
+    
+    def __init__(self, path: str, start: int, count: int):
+        self.cap = cv2.VideoCapture(path)
+        if start:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        self.left = count
+    
+    def read(self):
+        if self.left <= 0:
+            return False, None
+        self.left -= 1
+        return self.cap.read()
+    
+    def release(self):
+        self.cap.release()
+
+
+class SegmentRecorder:
+    """
+    Reemplaza a DataExporter en los workers: escribe los frames a disco en
+    bloques de block_frames (chunks binarios) y guarda sólo su índice.
+    """
+    
+    def __init__(self, directory: str, segment: dict, fps: float, block_frames: int = 256):
+        self.directory = Path(directory)
+        self.segment = segment
+        self.fps = fps
+        self.block_frames = block_frames
+        self.blocks = []  # [(primer frame, último frame, ruta)]
+        self.ids = {}  # IDs locales de [start, end), en orden de aparición
+        self._buffer = []
+    
+    def add_frame_data(self, frame_number: int, tracks: TrackBatch, angles: np.ndarray, actions: list,
+                       interpolated: bool = False):
+        if frame_number >= self.segment["start"]:
+            self.ids.update(dict.fromkeys(tracks.ids.tolist()))
+        self._buffer.append({"frame": frame_number, "timestamp_ms": int((frame_number / self.fps) * 1000),
+                             "tracks": tracks, "angles": angles, "actions": actions, "interpolated": interpolated})
+        if len(self._buffer) >= self.block_frames:
+            self._flush()
+    
+    def _flush(self):
+        if not self._buffer:
+            return
+        path = self.directory / f"segment{self.segment['index']:03d}_{len(self.blocks):05d}{chunk_format.EXTENSION}"
+        meta = {"segment": self.segment["index"], "fps": self.fps}
+        path.write_bytes(chunk_format.encode_chunk(meta, self._buffer, angle_names=AngleCalculator.ANGLE_NAMES))
+        self.blocks.append((self._buffer[0]["frame"], self._buffer[-1]["frame"], str(path)))
+        self._buffer = []
+    
+    def finalize(self):
+        self._flush()
+
+
+def read_records(blocks: list, start: int = 0, end: int = None):
+    """Frames de [start, end) de los bloques de un SegmentRecorder, leyendo sólo los bloques que tocan."""
+    for first, last, path in blocks:
+        if last < start or (end is not None and first >= end):
+            continue
+        data = chunk_format.read_chunk(path)
+        header, offsets = data["header"], data["person_offsets"]
+        tracks = TrackBatch(data["track_ids"], data["bboxes"], data["keypoints"])
+        # Sin ninguna pose en el bloque los ángulos no se guardan: son todos NaN
+        angles = data["angles"] if header["angle_names"] else \
+            np.full((len(tracks), len(AngleCalculator.ANGLE_NAMES)), np.nan, dtype=np.float32)
+        actions = [header["actions"][i] for i in data["actions"].tolist()]
+        for f, frame in enumerate(data["frames"].tolist()):
+            if frame < start or (end is not None and frame >= end):
+                continue
+            lo, hi = offsets[f], offsets[f + 1]
+            yield {"frame": frame, "tracks": tracks[lo:hi], "angles": angles[lo:hi], "actions": actions[lo:hi],
+                   "interpolated": bool(data["interpolated"][f])}
+
+
+class NullVideoWriter:
+    """Reemplaza a VideoExporter cuando no hay video (segmentos: se renderiza después con IDs globales)."""
+    
+    def write_frame(self, frame, on_done=None):
+        if on_done is not None:
+            on_done(frame)
+    
+    def finalize(self):
+        return None
+
+
+def bbox_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU entre dos conjuntos de bboxes xyxy. Returns: matriz (len(a), len(b))."""
+    a, b = np.asarray(a, dtype=np.float32).reshape(-1, 4), np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_ids(prev_records: list, cur_records: list, min_iou: float = 0.3, min_votes: int = 3) -> dict:
+    """
+    Une IDs de dos segmentos sobre los mismos frames (el solape).
+    
+    Por frame se emparejan bboxes de forma greedy por IoU y cada par suma un
+    voto; luego cada ID local se asigna al ID previo con más votos (uno a uno).
+    
+    Returns:
+        Dict {id_local: id_previo}
+    """
+    prev_by_frame = {r["frame"]: r["tracks"] for r in prev_records}
+    votes = {}
+    for record in cur_records:
+        prev = prev_by_frame.get(record["frame"])
+        if prev is None or not len(prev) or not len(record["tracks"]):
+            continue
+        iou = bbox_iou(prev.bboxes, record["tracks"].bboxes)
+        while iou.size and iou.max() >= min_iou:
+            i, j = np.unravel_index(iou.argmax(), iou.shape)
+            pair = (int(record["tracks"].ids[j]), int(prev.ids[i]))
+            votes[pair] = votes.get(pair, 0) + 1
+            iou[i, :] = -1
+            iou[:, j] = -1
+    
+    min_votes = min(min_votes, max(1, len(cur_records)))
+    mapping, used = {}, set()
+    for (local, previous), count in sorted(votes.items(), key=lambda kv: -kv[1]):
+        if count >= min_votes and local not in mapping and previous not in used:
+            mapping[local] = previous
+            used.add(previous)
+    return mapping
+
+
+def _relabel(record: dict, mapping: dict) -> dict:
+    """Ángulos y acciones van alineados por fila: sólo cambian los IDs."""
+    tracks = record["tracks"]
+    return {**record, "tracks": tracks.with_ids([mapping[i] for i in tracks.ids.tolist()])}
+
+
+def stitch_segments(results: list, min_iou: float = 0.3) -> tuple:
+    """
+    Une los IDs de los segmentos (ordenados) leyendo de disco sólo las ventanas de solape.
+    
+    Args:
+        results: [{segment: {warm_start, start, end}, blocks: [...], ids: [...]}] de SegmentRecorder
+    
+    Returns:
+        (mappings {segment_index: {id_local: id_global}},
+         stats {segment_index: {"matched": n, "new": n}})
+    """
+    mappings, stats = {}, {}
+    next_id, previous = 1, None
+    for result in results:
+        segment = result["segment"]
+        warmup = list(read_records(result["blocks"], segment["warm_start"], segment["start"]))
+        prev_records = []
+        if previous is not None:
+            # El final exportado del segmento anterior, ya con IDs globales
+            overlap_start = max(segment["warm_start"], previous["segment"]["start"])
+            prev_records = [_relabel(r, mappings[previous["segment"]["index"]])
+                            for r in read_records(previous["blocks"], overlap_start, segment["start"])]
+        
+        mapping = match_ids(prev_records, warmup, min_iou)
+        matched = len(mapping)
+        for track_id in result["ids"]:
+            if track_id not in mapping:
+                mapping[track_id] = next_id
+            next_id = max(next_id, mapping[track_id] + 1)
+        stats[segment["index"]] = {"matched": matched, "new": len(mapping) - matched}
+        mappings[segment["index"]] = mapping
+        previous = result
+    return mappings, stats
+
+
+def exported_records(result: dict, mapping: dict):
+    """Frames de [start, end) de un segmento con IDs globales, bloque a bloque."""
+    segment = result["segment"]
+    for record in read_records(result["blocks"], segment["start"], segment["end"]):
+        yield _relabel(record, mapping)
+
+
+def concat_videos(parts: list, output_path: str) -> str:
+    """Concatena los videos de los segmentos (ffmpeg sin re-encode; si no hay, OpenCV)."""
+    output_path = Path(output_path)
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        listing = output_path.with_suffix(".txt")
+        # Comillas simples del concat demuxer: una ' dentro de la ruta se escribe '\''
+        quoted = (str(Path(p).resolve()).replace("'", "'\\''") for p in parts)
+        listing.write_text("".join(f"file '{path}'\n" for path in quoted))
+        try:
+            subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                            "-i", str(listing), "-c", "copy", str(output_path)], check=True)
+        finally:
+            listing.unlink(missing_ok=True)
+        return str(output_path)
+    
+    writer = None
+    for part in parts:
+        cap = cv2.VideoCapture(str(part))
+        if writer is None:
+            size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            writer = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'mp4v'),
+                                     cap.get(cv2.CAP_PROP_FPS) or 30.0, size)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            writer.write(frame)
+        cap.release()
+    if writer:
+        writer.release()
+    return str(output_path)
@@ -0,0 +1,199 @@
+"""
+Manifest de sesión: índice temporal de los chunks por segundo de DataExporter.
+
+Se escribe como JSON Lines append-only ({session_id}_manifest.jsonl), una línea
+por evento, así un consumidor externo lo puede leer mientras la sesión sigue
+grabando y un corte no deja el archivo inválido:
+    
+    {"type": "session", "session_id", "fps", "format", "compression"}
+    {"type": "chunk", "second", "file", "offset", "length", "frame_start", "frame_end",
+     "t_start_ms", "t_end_ms", "video_start_s", "video_end_s", "track_ids"}
+    {"type": "bundle", "file", "codec", "members": {second: [offset, length]}}
+    {"type": "video", "file", "fps"}
+
+SessionIndex arma el índice en memoria y resuelve timestamp, frame o track con
+búsqueda binaria, sin abrir los chunks.
+"""
+import json
+import bisect
+import threading
+from pathlib import Path
+from . import chunk_format
+from . import bundle_packer
+
+
+SUFFIX = "_manifest.jsonl"
+
+
+class SessionManifest:
+    """Escritor append-only del manifest (thread-safe: lo usa el hilo escritor)."""
+    
+    def __init__(self, output_dir: str, session_id: str, fps: float, format: str, compression: str = None):
+        self.path = Path(output_dir) / f"{session_id}{SUFFIX}"
+        self.fps = fps
+        self._lock = threading.Lock()
+        self._append({"type": "session", "session_id": session_id, "fps": fps,
+                      "format": format, "compression": compression})
+    
+    @staticmethod
+    def summarize(frames: list) -> dict:
+        """Rango de frames/tiempo y tracks de un segundo (antes de serializarlo)."""
+        track_ids = set()
+        for frame in frames:
+            track_ids.update(frame["tracks"].ids.tolist())
+        return {
+            "frame_start": frames[0]["frame"],
+            "frame_end": frames[-1]["frame"],
+            "t_start_ms": frames[0]["timestamp_ms"],
+            "t_end_ms": frames[-1]["timestamp_ms"],
+            "track_ids": sorted(track_ids),
+        }
+    
+    def add_chunk(self, second: int, path: Path, nbytes: int, summary: dict):
+        """Registra un chunk escrito (archivo completo: offset 0)."""
+        self._append({
+            "type": "chunk", "second": second, "file": Path(path).name,
+            "offset": 0, "length": nbytes, **summary,
+            # El video procesado tiene un frame por frame de entrada
+            "video_start_s": round(summary["frame_start"] / self.fps, 3),
+            "video_end_s": round(summary["frame_end"] / self.fps, 3),
+        })
+    
+    def add_bundle(self, bundle_path):
+        """Registra dónde quedó cada segundo dentro de un bundle de BundlePacker."""
+        index = bundle_packer.read_index(bundle_path)
+        self._append({
+            "type": "bundle", "file": Path(bundle_path).name, "codec": index["codec"],
+            "members": {str(m["second"]): [m["offset"], m["length"]] for m in index["members"]},
+        })
+    
+    def add_video(self, video_path, fps: float = None):
+        self._append({"type": "video", "file": Path(video_path).name, "fps": fps or self.fps})
+    
+    def _append(self, record: dict):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+
+
+class SessionIndex:
+    """
+    Lector del manifest. Búsquedas O(log n) sobre los chunks:
+        locate(timestamp_ms), locate_frame(frame), range(t0, t1),
+        track_chunks(track_id, t0, t1), locate_track(track_id, timestamp_ms)
+    """
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.dir = self.path.parent
+        self.session = {}
+        self.video = None
+        self.chunks = []
+        bundles = []
+        with open(self.path) as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # línea a medio escribir (sesión en curso)
+                record = json.loads(line)
+                kind = record.pop("type")
+                if kind == "session":
+                    self.session = record
+                elif kind == "chunk":
+                    self.chunks.append(record)
+                elif kind == "bundle":
+                    bundles.append(record)
+                elif kind == "video":
+                    self.video = record
+        
+        # Con drop/spill el orden de escritura puede no ser el de los segundos
+        self.chunks.sort(key=lambda c: c["second"])
+        by_second = {c["second"]: c for c in self.chunks}
+        for bundle in bundles:
+            for second, (offset, length) in bundle["members"].items():
+                chunk = by_second.get(int(second))
+                if chunk is not None:
+                    chunk["bundle"] = {"file": bundle["file"], "codec": bundle["codec"],
+                                       "offset": offset, "length": length}
+        
+        self._t_starts = [c["t_start_ms"] for c in self.chunks]
+        self._f_starts = [c["frame_start"] for c in self.chunks]
+        self._tracks = {}  # track_id -> posiciones de chunk (ordenadas)
+        for i, chunk in enumerate(self.chunks):
+            for track_id in chunk["track_ids"]:
+                self._tracks.setdefault(track_id, []).append(i)
+    
+    @classmethod
+    def for_session(cls, output_dir: str, session_id: str):
+        return cls(Path(output_dir) / f"{session_id}{SUFFIX}")
+    
+    def __len__(self):
+        return len(self.chunks)
+    
+    def _at(self, starts: list, value) -> dict:
+        i = bisect.bisect_right(starts, value) - 1
+        return self.chunks[i] if i >= 0 else None
+    
+    def locate(self, timestamp_ms: int) -> dict:
+        """Chunk que contiene el timestamp (o el último anterior si cae en un hueco)."""
+        return self._at(self._t_starts, timestamp_ms)
+    
+    def locate_frame(self, frame: int) -> dict:
+        return self._at(self._f_starts, frame)
+    
+    def range(self, t0_ms: int, t1_ms: int) -> list:
+        """Chunks que se solapan con [t0_ms, t1_ms]."""
+        lo = max(0, bisect.bisect_right(self._t_starts, t0_ms) - 1)
+        hi = bisect.bisect_right(self._t_starts, t1_ms)
+        return [c for c in self.chunks[lo:hi] if c["t_end_ms"] >= t0_ms]
+    
+    def tracks(self) -> list:
+        return sorted(self._tracks)
+    
+    def track_chunks(self, track_id: int, t0_ms: int = None, t1_ms: int = None) -> list:
+        """Chunks donde aparece el track, opcionalmente acotados a [t0_ms, t1_ms]."""
+        positions = self._tracks.get(track_id, [])
+        lo, hi = 0, len(positions)
+        if t0_ms is not None:
+            first = max(0, bisect.bisect_right(self._t_starts, t0_ms) - 1)
+            lo = bisect.bisect_left(positions, first)
+        if t1_ms is not None:
+            hi = bisect.bisect_right(positions, bisect.bisect_right(self._t_starts, t1_ms) - 1)
+        return [self.chunks[i] for i in positions[lo:hi]]
+    
+    def locate_track(self, track_id: int, timestamp_ms: int = 0) -> dict:
+        """Primer chunk con el track a partir del timestamp (None si no vuelve a aparecer)."""
+        positions = self._tracks.get(track_id, [])
+        first = max(0, bisect.bisect_right(self._t_starts, timestamp_ms) - 1)
+        j = bisect.bisect_left(positions, first)
+        while j < len(positions):
+            chunk = self.chunks[positions[j]]
+            if chunk["t_end_ms"] >= timestamp_ms:
+                return chunk
+            j += 1
+        return None
+    
+    def video_time(self, timestamp_ms: int) -> float:
+        """Segundo del video procesado correspondiente al timestamp de datos."""
+        fps = self.session.get("fps") or 30.0
+        video_fps = (self.video or {}).get("fps") or fps
+        return timestamp_ms / 1000.0 * fps / video_fps
+    
+    def read_bytes(self, chunk: dict) -> bytes:
+        """Contenido del chunk: desde el archivo suelto o, si ya no está, desde su bundle."""
+        path = self.dir / chunk["file"]
+        if path.exists() or "bundle" not in chunk:
+            with open(path, "rb") as f:
+                f.seek(chunk["offset"])
+                return f.read(chunk["length"])
+        member = chunk["bundle"]
+        with open(self.dir / member["file"], "rb") as f:
+            f.seek(member["offset"])
+            return bundle_packer.decode_member(member, f.read(member["length"]))
+    
+    def load(self, chunk: dict) -> dict:
+        """Chunk decodificado: dict JSON o arrays de chunk_format."""
+        data = self.read_bytes(chunk)
+        if self.session.get("format") == "binary":
+            return chunk_format.decode_chunk(data)
+        return json.loads(data)
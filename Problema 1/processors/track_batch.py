@@ -0,0 +1,105 @@
+"""
+Tracks de un frame como arrays contiguos (struct-of-arrays).
+
+En lugar de una lista de dicts {id, bbox, keypoints} por persona, un frame
+lleva ids (n,), bboxes (n, 4) y keypoints (n, 17, 3), sacados del resultado de
+YOLO con una sola copia tensor -> NumPy. Ángulos, HAR, export, overlay, stride
+y pose cache operan sobre los arrays completos; sus resultados viajan
+alineados por fila: ángulos (n, n_angles) con NaN donde no hay confianza y
+acciones como lista de n strings.
+
+Un track sin pose tiene su fila de keypoints en NaN (misma convención que
+chunk_format y HARDetector.classify_batch).
+"""
+import numpy as np
+
+
+NUM_KEYPOINTS = 17
+
+
+class TrackBatch:
+    """ids (n,) int32, bboxes (n, 4) float32 xyxy y keypoints (n, 17, 3) float32 [x, y, conf]."""
+    
+    __slots__ = ("ids", "bboxes", "keypoints")
+    
+    def __init__(self, ids, bboxes, keypoints=None):
+        """
+        Args:
+            keypoints: None = ningún track con pose (todo NaN)
+        
+        Los arrays que ya tienen el dtype y son contiguos no se copian.
+        """
+        self.ids = np.ascontiguousarray(ids, dtype=np.int32).reshape(-1)
+        n = len(self.ids)
+        self.bboxes = np.ascontiguousarray(bboxes, dtype=np.float32).reshape(n, 4)
+        if keypoints is None:
+            keypoints = np.full((n, NUM_KEYPOINTS, 3), np.nan, dtype=np.float32)
+        self.keypoints = np.ascontiguousarray(keypoints, dtype=np.float32).reshape(n, NUM_KEYPOINTS, 3)
+    
+    @classmethod
+    def empty(cls) -> "TrackBatch":
+        return cls(np.empty(0, dtype=np.int32), np.empty((0, 4), dtype=np.float32))
+    
+    @staticmethod
+    def result_arrays(result) -> tuple:
+        """
+        boxes.data (xyxy, [id,] conf, cls) y keypoints (n, 17, 3) o None de un Results.
+        
+        Se juntan del lado del tensor, así hay una sola transferencia a CPU /
+        NumPy por frame.
+        """
+        data = result.boxes.data
+        n, columns = data.shape
+        if result.keypoints is None:
+            return data.cpu().numpy(), None
+        packed = data.new_empty((n, columns + NUM_KEYPOINTS * 3))
+        packed[:, :columns] = data
+        packed[:, columns:] = result.keypoints.data.reshape(n, NUM_KEYPOINTS * 3)
+        array = packed.cpu().numpy()
+        return array[:, :columns], array[:, columns:].reshape(n, NUM_KEYPOINTS, 3)
+    
+    @classmethod
+    def from_result(cls, result) -> "TrackBatch":
+        """Tracks de un Results de model.track (sin IDs de tracking: vacío)."""
+        boxes = result.boxes
+        if boxes is None or boxes.id is None:
+            return cls.empty()
+        data, keypoints = cls.result_arrays(result)
+        return cls(data[:, -3], data[:, :4], keypoints)
+    
+    @classmethod
+    def concat(cls, batches: list) -> "TrackBatch":
+        """Todas las filas de varios frames en orden (las personas de cada uno con len())."""
+        if not batches:
+            return cls.empty()
+        return cls(np.concatenate([b.ids for b in batches]),
+                   np.concatenate([b.bboxes for b in batches]),
+                   np.concatenate([b.keypoints for b in batches]))
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __getitem__(self, index) -> "TrackBatch":
+        """Subconjunto de filas (slice = vistas; máscara o índices = copias)."""
+        return TrackBatch(self.ids[index], self.bboxes[index], self.keypoints[index])
+    
+    def __repr__(self) -> str:
+        return f"TrackBatch(ids={self.ids.tolist()})"
+    
+    @property
+    def has_keypoints(self) -> np.ndarray:
+        """(n,) bool: el track tiene pose."""
+        return ~np.isnan(self.keypoints).all(axis=(1, 2))
+    
+    def with_ids(self, ids) -> "TrackBatch":
+        """Mismas filas con otros IDs (comparte bboxes y keypoints)."""
+        return TrackBatch(ids, self.bboxes, self.keypoints)
+    
+    def index(self, ids) -> np.ndarray:
+        """Posición de cada ID en este batch, -1 si no está."""
+        ids = np.asarray(ids, dtype=np.int32)
+        if not len(self.ids):
+            return np.full(len(ids), -1, dtype=np.intp)
+        order = np.argsort(self.ids, kind="stable")
+        found = order[np.minimum(np.searchsorted(self.ids, ids, sorter=order), len(order) - 1)]
+        return np.where(self.ids[found] == ids, found, -1)
@@ -0,0 +1,86 @@
+"""
+Estado por track con desalojo por inactividad y tope de tracks vivos.
+"""
+from collections import OrderedDict
+
+
+class TrackStateStore:
+    """
+    Dict acotado {track_id: estado} para sesiones largas.
+    
+    Los estados se ordenan por último frame visto (LRU): se desalojan los que
+    superan max_idle_frames sin aparecer y, si se alcanza max_tracks, el menos
+    reciente (nunca uno visto en el frame actual). Los estados desalojados se reciclan (reset()) para no reasignar
+    memoria con cada track nuevo.
+    """
+    
+    def __init__(self, factory, max_idle_frames: int, max_tracks: int = 64, pool_size: int = 8):
+        """
+        Args:
+            factory: Callable() -> estado con reset() y nbytes (ej. TemporalWindow)
+            max_idle_frames: Frames sin ver un track antes de desalojarlo
+            max_tracks: Máximo de tracks vivos
+            pool_size: Estados desalojados que se guardan para reutilizar
+        """
+        self.factory = factory
+        self.max_idle_frames = max_idle_frames
+        self.max_tracks = max_tracks
+        self.pool_size = pool_size
+        self.frame = 0
+        self.evicted_idle = 0
+        self.evicted_cap = 0
+        self._states = OrderedDict()  # track_id -> (estado, último frame visto)
+        self._pool = []
+    
+    def __contains__(self, track_id) -> bool:
+        return track_id in self._states
+    
+    def __getitem__(self, track_id):
+        return self._states[track_id][0]
+    
+    def __len__(self) -> int:
+        return len(self._states)
+    
+    def tick(self):
+        """Avanza un frame y desaloja los tracks inactivos."""
+        self.frame += 1
+        while self._states:
+            track_id, (_, last_seen) = next(iter(self._states.items()))
+            if self.frame - last_seen <= self.max_idle_frames:
+                break
+            self._evict(track_id)
+            self.evicted_idle += 1
+    
+    def get(self, track_id):
+        """Retorna el estado del track (lo crea si no existe) y lo marca como visto."""
+        if track_id in self._states:
+            state = self._states.pop(track_id)[0]
+        else:
+            # Nunca se desaloja un track visto en este frame: con más personas que
+            # max_tracks el tope se excede en ese frame y se recupera en los siguientes
+            while len(self._states) >= self.max_tracks:
+                oldest, (_, last_seen) = next(iter(self._states.items()))
+                if last_seen == self.frame:
+                    break
+                self._evict(oldest)
+                self.evicted_cap += 1
+            state = self._pool.pop() if self._pool else self.factory()
+        self._states[track_id] = (state, self.frame)
+        return state
+    
+    def _evict(self, track_id):
+        state = self._states.pop(track_id)[0]
+        if len(self._pool) < self.pool_size:
+            state.reset()
+            self._pool.append(state)
+    
+    def stats(self) -> dict:
+        """Contadores para dimensionar memoria."""
+        states = [s for s, _ in self._states.values()] + self._pool
+        return {
+            "live_tracks": len(self._states),
+            "pooled": len(self._pool),
+            "evicted_idle": self.evicted_idle,
+            "evicted_cap": self.evicted_cap,
+            "bytes_held": sum(s.nbytes for s in states),
+        }
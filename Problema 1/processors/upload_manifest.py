@@ -0,0 +1,108 @@
+"""
+Manifest local de subidas a S3: evita re-subir archivos sin cambios y guarda
+el estado de los multipart uploads en curso para poder reanudarlos.
+
+Varios procesos pueden compartir el manifest (batch.py): cada guardado toma un
+lock de archivo, relee el disco y aplica sólo las entradas que cambió este proceso.
+"""
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: se mezcla igual, sin lock entre procesos
+    fcntl = None
+
+
+def file_sha256(path, block_size: int = 1 << 20) -> str:
+    """Hash del contenido en bloques (no carga el archivo completo en memoria)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class UploadManifest:
+    """
+    JSON {"objects": {bucket/key: {sha256, size, mtime_ns, etag}},
+          "pending": {bucket/key: {upload_id, part_size, sha256, size}}}
+    """
+    
+    def __init__(self, path: str, save_every: int = 50):
+        self.path = Path(path)
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._changed = {"objects": set(), "pending": set()}
+        self.data = {"objects": {}, "pending": {}}
+        if self.path.exists():
+            with open(self.path) as f:
+                self.data.update(json.load(f))
+    
+    def fingerprint(self, name: str, path: Path) -> tuple:
+        """
+        Retorna (sha256, sin_cambios). Si tamaño y mtime coinciden con el manifest
+        se reutiliza el hash guardado sin releer el archivo.
+        """
+        stat = path.stat()
+        entry = self.data["objects"].get(name)
+        if entry and entry["size"] == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry["sha256"], True
+        sha = file_sha256(path)
+        return sha, bool(entry and entry["sha256"] == sha and entry["size"] == stat.st_size)
+    
+    def record(self, name: str, path: Path, sha256: str, etag: str):
+        stat = path.stat()
+        with self._lock:
+            self.data["objects"][name] = {
+                "sha256": sha256, "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns, "etag": etag
+            }
+            self._dirty += 1
+            # Subida terminada: el pendiente (si otro proceso lo dejó) también se borra
+            self._changed["objects"].add(name)
+            self._changed["pending"].add(name)
+            # Cerrar un multipart pendiente se guarda enseguida; el resto en lotes
+            if self.data["pending"].pop(name, None) is not None or self._dirty >= self.save_every:
+                self._save()
+    
+    def pending(self, name: str) -> dict:
+        return self.data["pending"].get(name)
+    
+    def set_pending(self, name: str, info: dict):
+        """Guarda inmediatamente: es lo que permite reanudar tras un corte."""
+        with self._lock:
+            self.data["pending"][name] = info
+            self._changed["pending"].add(name)
+            self._save()
+    
+    def save(self):
+        with self._lock:
+            self._save()
+    
+    def _save(self):
+        with open(self.path.with_suffix(".lock"), "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            if self.path.exists():
+                with open(self.path) as f:
+                    disk = json.load(f)
+                for section, names in self._changed.items():
+                    merged = disk.setdefault(section, {})
+                    for name in names:
+                        if name in self.data[section]:
+                            merged[name] = self.data[section][name]
+                        else:
+                            merged.pop(name, None)
+                self.data = {"objects": disk["objects"], "pending": disk["pending"]}
+            
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(self.data, f, indent=2)
+            tmp.replace(self.path)
+        self._changed = {"objects": set(), "pending": set()}
+        self._dirty = 0
@@ -1,7 +1,17 @@
 """
 Exportador de video procesado a MP4.
+
+Backends:
+- opencv: cv2.VideoWriter con mp4v (el MP4 sólo es reproducible tras finalize()).
+- ffmpeg: H.264 en MP4 fragmentado vía subproceso ffmpeg alimentado desde un hilo
+  propio; el archivo se puede leer progresivamente mientras se escribe.
+  Si ffmpeg no está instalado se usa opencv.
 """
 import cv2
+import queue
+import shutil
+import threading
+import subprocess
 from pathlib import Path
 from datetime import datetime
 
@@ -9,14 +19,41 @@ from datetime import datetime
 class VideoExporter:
     """Graba el video procesado a archivo MP4."""
     
-    def __init__(self, output_dir: str = "output", fps: float = 30.0, frame_size: tuple = None):
+    BACKENDS = ("opencv", "ffmpeg")
+    # Frames que el backend ffmpeg puede retener en cola (el pool del decoder se dimensiona con esto)
+    QUEUE_SIZE = 32
+    
+    def __init__(self, output_dir: str = "output", fps: float = 30.0, frame_size: tuple = None,
+                 backend: str = "opencv", preset: str = "veryfast", crf: int = 23, queue_size: int = QUEUE_SIZE,
+                 session_id: str = None):
+        """
+        Args:
+            backend: "opencv" o "ffmpeg"
+            preset: Preset de libx264 (ultrafast ... veryslow), sólo ffmpeg
+            crf: Calidad de libx264 (menor = mejor calidad y archivo más grande), sólo ffmpeg
+            queue_size: Frames en cola hacia el hilo de ffmpeg
+            session_id: Prefijo del archivo (default: fecha y hora)
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Backend no soportado: {backend}")
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.fps = fps
         self.frame_size = frame_size
         self.writer = None
-        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.session_id = session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
         self.output_path = None
+        self.preset = preset
+        self.crf = crf
+        self.ffmpeg = shutil.which("ffmpeg") if backend == "ffmpeg" else None
+        if backend == "ffmpeg" and not self.ffmpeg:
+            print("FFmpeg no encontrado. Usando OpenCV (mp4v).")
+        self.backend = "ffmpeg" if self.ffmpeg else "opencv"
+        # Backend ffmpeg
+        self.proc = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._error = None
     
     def _init_writer(self, frame):
         """Inicializa el writer con el tamaño del primer frame."""
@@ -25,6 +62,10 @@ class VideoExporter:
             self.frame_size = (w, h)
         
         self.output_path = self.output_dir / f"{self.session_id}_processed.mp4"
+        if self.backend == "ffmpeg":
+            self._init_ffmpeg()
+            return
+        
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         self.writer = cv2.VideoWriter(
             str(self.output_path),
@@ -33,21 +74,81 @@ class VideoExporter:
             self.frame_size
         )
     
-    def write_frame(self, frame):
-        """Escribe un frame al video."""
-        if self.writer is None:
+    def _init_ffmpeg(self):
+        """Lanza ffmpeg (H.264, MP4 fragmentado) y el hilo que le escribe los frames."""
+        w, h = self.frame_size
+        self.proc = subprocess.Popen([
+            self.ffmpeg, '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{w}x{h}', '-r', str(self.fps), '-i', '-',
+            '-c:v', 'libx264', '-preset', self.preset, '-crf', str(self.crf), '-pix_fmt', 'yuv420p',
+            # moov al inicio + un fragmento por keyframe: reproducible mientras se escribe
+            '-movflags', 'frag_keyframe+empty_moov+default_base_moof',
+            '-g', str(max(1, int(round(self.fps)))),
+            str(self.output_path)
+        ], stdin=subprocess.PIPE)
+        self._thread = threading.Thread(target=self._feed_ffmpeg, name="ffmpeg-writer", daemon=True)
+        self._thread.start()
+    
+    def _feed_ffmpeg(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, on_done = item
+            try:
+                if self._error is None:
+                    self.proc.stdin.write(memoryview(frame).cast("B"))
+            except (BrokenPipeError, OSError) as e:
+                self._error = e
+                print("FFmpeg process crashed.")
+            finally:
+                if on_done is not None:
+                    on_done(frame)
+    
+    def write_frame(self, frame, on_done=None):
+        """
+        Escribe un frame al video.
+        
+        Args:
+            frame: Frame BGR
+            on_done: Callback(frame) cuando el frame ya no se usa (ej. devolverlo al pool del decoder)
+        """
+        if self.output_path is None:
             self._init_writer(frame)
         
+        original = frame
         # Asegurar tamaño correcto
         if frame.shape[1] != self.frame_size[0] or frame.shape[0] != self.frame_size[1]:
             frame = cv2.resize(frame, self.frame_size)
         
-        self.writer.write(frame)
+        if self.backend == "ffmpeg":
+            # El frame pasa al hilo de ffmpeg: no debe modificarse hasta on_done
+            if frame is original and frame.flags.c_contiguous:
+                self._queue.put((frame, on_done))
+                return
+            self._queue.put((frame if frame.flags.c_contiguous else frame.copy(), None))
+        else:
+            self.writer.write(frame)
+        if on_done is not None:
+            on_done(original)
     
     def finalize(self) -> str:
-        """Cierra el writer y retorna la ruta del archivo."""
-        if self.writer:
+        """Cierra el writer y retorna la ruta del archivo (None si ffmpeg falló: el MP4 no es válido)."""
+        if self.output_path is None:
+            return None
+        
+        if self.backend == "ffmpeg":
+            self._queue.put(None)
+            self._thread.join()
+            try:
+                self.proc.stdin.close()
+            except (BrokenPipeError, OSError) as e:
+                self._error = self._error or e
+            returncode = self.proc.wait()
+            if self._error is not None or returncode != 0:
+                print(f"Error: FFmpeg terminó con código {returncode}, video descartado: {self.output_path}")
+                return None
+        else:
             self.writer.release()
-            print(f"Video saved: {self.output_path}")
-            return str(self.output_path)
-        return None
+        print(f"Video saved: {self.output_path}")
+        return str(self.output_path)
@@ -0,0 +1,100 @@
+"""
+Replay: recalcula ángulos, HAR y export de sesiones ya procesadas, sin video ni modelo.
+Uso: python replay.py output/ [archivo/*_manifest.jsonl ...] [--workers N] [--output-dir DIR]
+
+Cada sesión (su {session_id}_manifest.jsonl) se re-procesa desde los keypoints
+guardados y se escribe como una sesión nueva {session_id}{--suffix} (por
+defecto junto a la original). Sirve para agregar ángulos o clases de acción a
+sesiones archivadas: sólo corren AngleCalculator, HARDetector y DataExporter.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import contextlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from processors.replay import replay_session
+from processors.data_exporter import DataExporter
+from processors.session_manifest import SUFFIX as MANIFEST_SUFFIX
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="Manifests, directorios o globs")
+    parser.add_argument("--output-dir", default=None,
+                        help="Directorio de las sesiones nuevas (default: el de cada original)")
+    parser.add_argument("--suffix", default="_replay", help="Sufijo del session_id nuevo")
+    parser.add_argument("--data-format", choices=list(DataExporter.EXTENSIONS), default=None,
+                        help="Formato de los chunks nuevos (default: el de la sesión original)")
+    parser.add_argument("--compression", choices=["zlib", "lzma"], default=None,
+                        help="Codec del formato binario")
+    parser.add_argument("--workers", type=int, default=1, help="Sesiones en paralelo")
+    parser.add_argument("--summary", default=None, help="Guardar el resumen JSON en este archivo")
+    return parser.parse_args()
+
+
+def collect_manifests(inputs: list, suffix: str) -> list:
+    """Manifests de los inputs, sin los de sesiones que ya son replays."""
+    manifests = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            manifests.extend(sorted(path.glob(f"*{MANIFEST_SUFFIX}")))
+        elif path.exists():
+            manifests.append(path)
+        else:
+            manifests.extend(Path(p) for p in sorted(glob.glob(item)))
+    return [m for m in dict.fromkeys(manifests) if not m.name.endswith(f"{suffix}{MANIFEST_SUFFIX}")]
+
+
+def _replay_one(args, manifest: Path) -> dict:
+    session_id = manifest.name[:-len(MANIFEST_SUFFIX)] + args.suffix
+    # DataExporter imprime cada chunk: en meses de sesiones es sólo ruido
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            return {**replay_session(manifest, args.output_dir or manifest.parent, session_id,
+                                     args.data_format, args.compression), "status": "ok"}
+        except Exception as e:
+            return {"source": str(manifest), "status": "failed", "error": f"{type(e).__name__}: {e}"}
+
+
+def main():
+    args = parse_args()
+    manifests = collect_manifests(args.inputs, args.suffix)
+    if not manifests:
+        print("No se encontraron sesiones")
+        sys.exit(1)
+    
+    start = time.perf_counter()
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(_replay_one, [args] * len(manifests), manifests))
+    else:
+        results = [_replay_one(args, m) for m in manifests]
+    wall = time.perf_counter() - start
+    
+    for result in results:
+        detail = (f"{result['frames']} frames, {result['fps']} fps" if result["status"] == "ok"
+                  else result["error"])
+        print(f"{result['status']:<6} {Path(result['source']).name}: {detail}")
+    
+    frames = sum(r.get("frames", 0) for r in results)
+    summary = {
+        "sessions": len(results),
+        "failed": sum(r["status"] != "ok" for r in results),
+        "frames": frames,
+        "wall_s": round(wall, 3),
+        "fps": round(frames / wall, 1) if wall else 0.0,
+    }
+    print(json.dumps(summary))
+    if args.summary:
+        Path(args.summary).write_text(json.dumps({**summary, "results": results}, indent=2))
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
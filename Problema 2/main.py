@@ -2,15 +2,78 @@
 Problema 2: RTSP Stream Processing - Pose Estimation + Object Detection
 Estructura modular con procesadores separados.
 """
+import os
 import cv2
+import time
 import argparse
-from processors import ObjectDetector, PoseEstimator, VideoWriter, DataExporter
+from pathlib import Path
+from processors import ObjectDetector, PoseEstimator, VideoWriter, DataExporter, BACKENDS, EXPORT_DIR
+from common.latency_tuner import LatencyTuner, PrefetchedCapture, DEFAULT_SIZES, model_variant, measure_config
+from common.ffmpeg_capture import FFmpegCapture
 
 
 OUTPUT_DIR = "output"
 VIDEO_OUTPUT_DIR = "video_outputs"
 
 
+def build_latency_tuner(args, cap, detector, pose_estimator):
+    """
+    Calibra LatencyTuner con los primeros frames de la fuente. Cada configuración
+    es (escala, imgsz) y se aplica a los dos modelos; el costo es detección + pose.
+    Los archivos se rebobinan; en vivo esos frames se re-entregan antes que los
+    siguientes de la captura.
+    
+    Returns:
+        (LatencyTuner o None sin --latency-target / --fps-target, fuente de la que leer)
+    """
+    target_ms = args.latency_target or (1000 / args.fps_target if args.fps_target else 0)
+    if not target_ms:
+        return None, cap
+    frames = []
+    while len(frames) < args.tune_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame.copy())
+        if hasattr(cap, "release_frame"):
+            cap.release_frame(frame)  # el buffer vuelve al pool de FFmpegCapture
+    if args.source and os.path.isfile(args.source):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        reader = cap
+    else:
+        reader = PrefetchedCapture(cap, frames)
+    if not frames:
+        return None, reader
+    
+    # Variante (nombre del modelo de pose) -> (pesos de detección, pesos de pose)
+    det_path, pose_path = next(iter(detector.models)), next(iter(pose_estimator.models))
+    variants = {Path(pose_path).stem: (det_path, pose_path)}
+    for scale in args.tune_variants:
+        pair = (model_variant(det_path, scale), model_variant(pose_path, scale))
+        if None in pair:
+            print(f"--tune-variants: {det_path} / {pose_path} no tienen variantes por escala, sólo se ajusta imgsz")
+            break
+        variants[Path(pair[1]).stem] = pair
+    
+    def apply(config):
+        det, pose = variants[config[0]]
+        detector.set_model(detector.load_variant(det), config[1])
+        pose_estimator.set_model(pose_estimator.load_variant(pose), config[1])
+    
+    def measure(config):
+        det, pose = variants[config[0]]
+        return (measure_config(detector.load_variant(det), config[1], frames, classes=detector.classes,
+                               low_conf=detector.tracker.low_conf if detector.tracker else None)
+                + measure_config(pose_estimator.load_variant(pose), config[1], frames,
+                                 low_conf=pose_estimator.tracker.low_conf if pose_estimator.tracker else None))
+    
+    tuner = LatencyTuner(target_ms, apply, hysteresis=args.tune_hysteresis)
+    tuner.calibrate([(name, size) for name in variants for size in args.tune_sizes], measure)
+    costs = ", ".join(f"{name}@{size}: {tuner.costs[(name, size)]:.0f} ms" for name, size in tuner.ladder)
+    print(f"Latency tuner ({target_ms:.0f} ms/frame): {costs} -> {tuner.config[0]}@{tuner.config[1]}")
+    return tuner, reader
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--source", help="RTSP URL or video file (default: webcam)", default=None)
@@ -18,15 +81,45 @@ def main():
     parser.add_argument("--video-output-dir", default=VIDEO_OUTPUT_DIR)
     parser.add_argument("--no-display", action="store_true")
     parser.add_argument("--no-cleanup", action="store_true", help="Skip cleanup prompt")
+    parser.add_argument("--inference-backend", choices=list(BACKENDS), default="torch",
+                        help="CPU runtime for both models (onnx/openvino are exported once to --model-export-dir)")
+    parser.add_argument("--int8", action="store_true", help="INT8 quantization with onnx/openvino")
+    parser.add_argument("--calibration", default=None,
+                        help="Video for INT8 calibration (default: --source when it is a file)")
+    parser.add_argument("--model-export-dir", default=EXPORT_DIR)
+    parser.add_argument("--tracker", choices=list(ObjectDetector.TRACKERS), default="ultralytics",
+                        help="ultralytics (model.track default tracker) or keypoint (predict + IoU/OKS tracker)")
+    parser.add_argument("--latency-target", type=float, default=0,
+                        help="Per-frame budget in ms for detection + pose: autotunes model scale and imgsz (0 = off)")
+    parser.add_argument("--fps-target", type=float, default=0, help="Same as --latency-target, in fps (0 = off)")
+    parser.add_argument("--tune-variants", nargs="+", default=[],
+                        help="Extra model scales the tuner may pick (e.g. s m; default: only n)")
+    parser.add_argument("--tune-sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--tune-hysteresis", type=float, default=0.15)
+    parser.add_argument("--tune-frames", type=int, default=16)
+    parser.add_argument("--decoder", choices=["opencv", "ffmpeg"], default="opencv",
+                        help="Decoder for RTSP/files (ffmpeg: subprocess + fixed frame buffer pool)")
+    parser.add_argument("--decode-threads", type=int, default=0, help="ffmpeg decoder threads (0 = auto)")
+    parser.add_argument("--decode-width", type=int, default=None,
+                        help="Scale to this width inside the ffmpeg decoder (output video too)")
+    parser.add_argument("--frame-pool", type=int, default=8, help="ffmpeg decoder frame buffers")
     args = parser.parse_args()
-
+    
     # Pre-ejecución: cleanup con confirmación
     if not args.no_cleanup:
         DataExporter.cleanup(args.output_dir)
     
     # Video source
     source = args.source if args.source else 0
-    cap = cv2.VideoCapture(source)
+    cap = None
+    if args.decoder == "ffmpeg" and args.source:
+        try:
+            cap = FFmpegCapture(source, pool_size=args.frame_pool, threads=args.decode_threads,
+                                width=args.decode_width)
+        except (RuntimeError, IOError) as e:
+            print(f"{e}: se usa OpenCV")
+    if cap is None:
+        cap = cv2.VideoCapture(source)
     if not cap.isOpened():
         print(f"Error: No se pudo abrir: {source}")
         return
@@ -38,8 +131,12 @@ def main():
     print(f"Resolución: {w}x{h}, FPS: {fps}")
     
     # Inicializar procesadores
-    detector = ObjectDetector()
-    pose_estimator = PoseEstimator()
+    calibration = args.calibration or (args.source if args.source and os.path.isfile(args.source) else None)
+    backend = {"backend": args.inference_backend, "int8": args.int8, "calibration": calibration,
+               "export_dir": args.model_export_dir}
+    detector = ObjectDetector(tracker=args.tracker, **backend)
+    pose_estimator = PoseEstimator(tracker=args.tracker, **backend)
+    tuner, reader = build_latency_tuner(args, cap, detector, pose_estimator)
     video_writer = VideoWriter(args.video_output_dir, w, h, fps)
     data_exporter = DataExporter(args.output_dir)
     
@@ -50,20 +147,26 @@ def main():
         cv2.resizeWindow(window_name, 1280, 720)
     
     frame_id = 0
-
+    release_frame = getattr(reader, "release_frame", None)  # FFmpegCapture: devolver el buffer al pool
+    
     try:
         while cap.isOpened():
-            ret, frame = cap.read()
+            ret, frame = reader.read()
             if not ret:
                 break
             
             # Procesamiento
+            start = time.perf_counter()
             results_det, detections = detector.process(frame)
             results_pose, poses = pose_estimator.process(frame)
+            if tuner is not None:
+                tuner.observe((time.perf_counter() - start) * 1000)
             
             # Anotación: detección + pose
             annotated = results_det.plot()
             annotated = results_pose.plot(img=annotated)
+            if release_frame is not None:
+                release_frame(frame)
             
             # Exportar datos y video
             data_exporter.write(frame_id, detections, poses)
@@ -77,7 +180,7 @@ def main():
             frame_id += 1
             if frame_id % 30 == 0:
                 print(f"Procesados: {frame_id} frames", end='\r')
-
+    
     except KeyboardInterrupt:
         print("\nInterrumpido por usuario.")
     finally:
@@ -86,6 +189,13 @@ def main():
         video_writer.release()
         cv2.destroyAllWindows()
         print(f"\nProcesados {frame_id} frames")
+        if tuner is not None:
+            print(f"Latency tuner: {tuner.config[0]}@{tuner.config[1]}, {len(tuner.switches)} cambios")
+        if isinstance(cap, FFmpegCapture):
+            stats = cap.stats()
+            print(f"Decoder ffmpeg: {stats['pool_buffers']} buffers ({stats['pool_mb']} MB), "
+                  f"{stats['pool_waits']} esperas, {stats['pool_grown']} agregados, "
+                  f"{stats['pool_reclaimed']} sin devolver")
     
     # Post-ejecución: cleanup opcional
     if not args.no_cleanup:
@@ -1,7 +1,16 @@
 """Processors package for RTSP stream processing."""
+import sys
+from pathlib import Path
+
+# Raíz del repo en el path para los módulos compartidos (common/)
+_ROOT = str(Path(__file__).resolve().parents[2])
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
 from .detector import ObjectDetector
 from .pose_estimator import PoseEstimator
 from .video_writer import VideoWriter
 from .data_exporter import DataExporter
+from common.inference_backend import BACKENDS, EXPORT_DIR, load_model
 
-__all__ = ["ObjectDetector", "PoseEstimator", "VideoWriter", "DataExporter"]
+__all__ = ["ObjectDetector", "PoseEstimator", "VideoWriter", "DataExporter", "BACKENDS", "EXPORT_DIR", "load_model"]
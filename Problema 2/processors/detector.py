@@ -1,23 +1,59 @@
 """Object Detection + Tracking processor using YOLOv8."""
-from ultralytics import YOLO
+import torch
+from common.inference_backend import load_model
+from common.latency_tuner import handoff_tracker
+from common.keypoint_tracker import KeypointTracker
 
 
 class ObjectDetector:
     # Excluir clase 0 (person) ya que el PoseEstimator ya detecta personas
     EXCLUDE_CLASSES = [0]  # 0 = person
+    TRACKERS = ("ultralytics", "keypoint")
     
-    def __init__(self, model_path: str = "yolov8n.pt"):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path: str = "yolov8n.pt", backend: str = "torch", imgsz: int = 640,
+                 tracker: str = "ultralytics", **backend_options):
+        """
+        backend: "torch", "onnx" u "openvino"; backend_options: int8, calibration, export_dir.
+        tracker: "ultralytics" (model.track) o "keypoint" (predict + KeypointTracker por IoU y clase).
+        """
+        if tracker not in self.TRACKERS:
+            raise ValueError(f"Tracker no soportado: {tracker}")
+        self.tracker = KeypointTracker() if tracker == "keypoint" else None
+        self.backend = backend
+        self.backend_options = backend_options
+        self.model = load_model(model_path, backend, imgsz=imgsz, **backend_options)
+        self.imgsz = imgsz
+        self.models = {model_path: self.model}
         self.names = self.model.names
         # Clases a detectar (todas excepto las excluidas)
         self.classes = [i for i in self.names.keys() if i not in self.EXCLUDE_CLASSES]
     
+    def load_variant(self, model_path: str):
+        """Otra variante del modelo (LatencyTuner), cargada una sola vez con el mismo backend."""
+        if model_path not in self.models:
+            self.models[model_path] = load_model(model_path, self.backend, imgsz=self.imgsz, **self.backend_options)
+        return self.models[model_path]
+    
+    def set_model(self, model, imgsz: int):
+        """Cambia modelo y/o resolución conservando el estado del tracker (mismos IDs)."""
+        if model is not self.model:
+            handoff_tracker(self.model, model)
+            self.model = model
+        self.imgsz = imgsz
+    
     def process(self, frame):
         """
         Detecta y trackea objetos en el frame (excluyendo personas).
         Returns: (results, detections_list)
         """
-        results = self.model.track(frame, persist=True, verbose=False, classes=self.classes)[0]
+        if self.tracker is None:
+            results = self.model.track(frame, persist=True, verbose=False, classes=self.classes, imgsz=self.imgsz)[0]
+        else:
+            results = self.model.predict(frame, verbose=False, classes=self.classes, imgsz=self.imgsz,
+                                         conf=self.tracker.low_conf)[0]
+            data = results.boxes.data.cpu().numpy()
+            ids = self.tracker.update(data[:, :4], data[:, 4], classes=data[:, 5])
+            results = with_track_ids(results, ids)
         
         detections = []
         for box in results.boxes:
@@ -32,3 +68,15 @@ class ObjectDetector:
         
         return results, detections
 
+
+def with_track_ids(results, ids):
+    """
+    Results sólo con las detecciones trackeadas y el ID en boxes (xyxy, id, conf, cls),
+    igual que los de model.track: plot() y boxes.id no cambian.
+    """
+    keep = ids >= 0
+    results = results[torch.from_numpy(keep)]
+    data = results.boxes.data
+    track_ids = data.new_tensor(ids[keep])[:, None]
+    results.update(boxes=torch.cat([data[:, :4], track_ids, data[:, 4:]], dim=1))
+    return results
@@ -1,17 +1,54 @@
 """Pose Estimation + Tracking processor using YOLOv8-Pose."""
-from ultralytics import YOLO
+from common.inference_backend import load_model
+from common.latency_tuner import handoff_tracker
+from common.keypoint_tracker import KeypointTracker
+from .detector import with_track_ids
 
 
 class PoseEstimator:
-    def __init__(self, model_path: str = "yolov8n-pose.pt"):
-        self.model = YOLO(model_path)
+    TRACKERS = ("ultralytics", "keypoint")
+    
+    def __init__(self, model_path: str = "yolov8n-pose.pt", backend: str = "torch", imgsz: int = 640,
+                 tracker: str = "ultralytics", **backend_options):
+        """
+        backend: "torch", "onnx" u "openvino"; backend_options: int8, calibration, export_dir.
+        tracker: "ultralytics" (model.track) o "keypoint" (predict + KeypointTracker por IoU y OKS).
+        """
+        if tracker not in self.TRACKERS:
+            raise ValueError(f"Tracker no soportado: {tracker}")
+        self.tracker = KeypointTracker() if tracker == "keypoint" else None
+        self.backend = backend
+        self.backend_options = backend_options
+        self.model = load_model(model_path, backend, imgsz=imgsz, **backend_options)
+        self.imgsz = imgsz
+        self.models = {model_path: self.model}
+    
+    def load_variant(self, model_path: str):
+        """Otra variante del modelo (LatencyTuner), cargada una sola vez con el mismo backend."""
+        if model_path not in self.models:
+            self.models[model_path] = load_model(model_path, self.backend, imgsz=self.imgsz, **self.backend_options)
+        return self.models[model_path]
+    
+    def set_model(self, model, imgsz: int):
+        """Cambia modelo y/o resolución conservando el estado del tracker (mismos IDs)."""
+        if model is not self.model:
+            handoff_tracker(self.model, model)
+            self.model = model
+        self.imgsz = imgsz
     
     def process(self, frame):
         """
         Estima poses con tracking en el frame.
         Returns: (results, poses_list)
         """
-        results = self.model.track(frame, persist=True, verbose=False)[0]
+        if self.tracker is None:
+            results = self.model.track(frame, persist=True, verbose=False, imgsz=self.imgsz)[0]
+        else:
+            results = self.model.predict(frame, verbose=False, imgsz=self.imgsz, conf=self.tracker.low_conf)[0]
+            data = results.boxes.data.cpu().numpy()
+            keypoints = results.keypoints.data.cpu().numpy() if results.keypoints is not None else None
+            ids = self.tracker.update(data[:, :4], data[:, 4], keypoints)
+            results = with_track_ids(results, ids)
         
         poses = []
         if results.keypoints is not None and results.boxes is not None:
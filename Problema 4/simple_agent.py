@@ -6,14 +6,21 @@ Arquitectura distribuida usando Ray Actors:
 - PoseAgent: Detecta pose corporal (MediaPipe)
 - ObjectAgent: Detecta objetos (YOLO)
 
-Uso: python simple_agent.py
+Uso: python simple_agent.py [--inference-backend torch|onnx|openvino] [--int8 --calibration video.mp4]
 """
 
 import cv2
 import ray
+import argparse
 import numpy as np
 import mediapipe as mp
-from ultralytics import YOLO
+import sys
+from pathlib import Path
+
+# Raíz del repo en el path para los módulos compartidos (common/). Se agrega
+# antes de ray.init, así los actores la heredan del driver
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.inference_backend import BACKENDS, load_model
 
 
 @ray.remote
@@ -67,8 +74,9 @@ class PoseAgent:
 class ObjectAgent:
     """Agente para detección de objetos."""
     
-    def __init__(self):
-        self.model = YOLO('yolov8n.pt')
+    def __init__(self, backend='torch', **backend_options):
+        """backend: 'torch', 'onnx' u 'openvino' (ver inference_backend.py)."""
+        self.model = load_model('yolov8n.pt', backend, **backend_options)
     
     def detect(self, frame):
         """Detecta objetos y retorna datos con bboxes."""
@@ -112,6 +120,13 @@ def check_safety_rules(hands_data, pose_landmarks, objects):
 
 def main():
     """Función principal del agente."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--inference-backend', choices=list(BACKENDS), default='torch',
+                        help='Runtime de YOLO en CPU (onnx/openvino: se exporta una vez)')
+    parser.add_argument('--int8', action='store_true', help='Cuantización INT8 con onnx/openvino')
+    parser.add_argument('--calibration', default=None, help='Video para calibrar INT8')
+    args = parser.parse_args()
+    
     print("=" * 50)
     print("AGENTE RAY - PUESTO DE TRABAJO")
     print("=" * 50)
@@ -130,7 +145,7 @@ def main():
         print("[Ray] Inicializando agentes...")
         hand_agent = HandAgent.remote()
         pose_agent = PoseAgent.remote()
-        object_agent = ObjectAgent.remote()
+        object_agent = ObjectAgent.remote(args.inference_backend, int8=args.int8, calibration=args.calibration)
         print("[Ray] Agentes listos\n")
         
         # Abrir cámara
@@ -151,13 +166,15 @@ def main():
             
             frame_count += 1
             
-            # Procesar en paralelo con agentes
-            hand_future = hand_agent.detect.remote(frame.copy())
-            pose_future = pose_agent.detect.remote(frame.copy())
+            # Procesar en paralelo con agentes: el frame se serializa una sola vez
+            # al object store y los tres agentes lo leen de ahí (sin copia, sólo lectura)
+            frame_ref = ray.put(frame)
+            hand_future = hand_agent.detect.remote(frame_ref)
+            pose_future = pose_agent.detect.remote(frame_ref)
             
             # YOLO cada 3 frames para mejor rendimiento
             if frame_count % 3 == 0:
-                obj_future = object_agent.detect.remote(frame.copy())
+                obj_future = object_agent.detect.remote(frame_ref)
                 objects = ray.get(obj_future)
             else:
                 objects = []
@@ -0,0 +1,4 @@
+"""
+Módulos compartidos por los problemas (Problema 1, 2 y 4 los importan como
+common.*): cada uno existe una sola vez en el repo.
+"""
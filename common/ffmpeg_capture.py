@@ -0,0 +1,236 @@
+"""
+Fuente de video por subproceso ffmpeg con un pool fijo de buffers.
+
+cv2.VideoCapture.read() aloca un ndarray nuevo por frame (6 MB en 1080p). Acá
+ffmpeg decodifica (multi-hilo, con escalado opcional del lado del decoder) a
+BGR crudo por un pipe, y cada frame se lee con readinto() directo sobre un
+buffer preasignado del pool. El frame que se entrega es una vista
+(np.frombuffer) de ese buffer.
+
+Cada frame es un préstamo explícito del pool: read() lo entrega con un
+dueño, retain_frame() suma otro (ej. la cola del encoder ffmpeg) y
+release_frame() devuelve uno; el buffer vuelve al pool cuando no le quedan
+dueños, así un frame retenido nunca se pisa. Si nadie lo devuelve, un
+weakref.finalize sobre el array lo recupera cuando muere la última vista (red
+de seguridad, contada en "pool_reclaimed"). Si el pool se agota, read() espera
+a que se libere uno: eso limita la memoria de frames en vuelo. Si la espera
+supera `grow_after` segundos (pool chico para la profundidad del pipeline) se
+agrega un buffer en lugar de bloquear para siempre.
+
+Misma interfaz que cv2.VideoCapture en lo que usa el repo: read, isOpened,
+get, set(CAP_PROP_POS_FRAMES) y release.
+"""
+import time
+import weakref
+import threading
+import shutil
+import subprocess
+from collections import deque
+import cv2
+import numpy as np
+
+
+class FramePool:
+    """Buffers bytearray de un frame, prestados por acquire() y devueltos por release()."""
+    
+    def __init__(self, frame_bytes: int, size: int, grow_after: float = 5.0):
+        self.frame_bytes = frame_bytes
+        self.grow_after = grow_after
+        self._slots = [bytearray(frame_bytes) for _ in range(size)]
+        self._free = deque(range(size))
+        self._owners = {}  # índice prestado -> dueños
+        self._generation = [0] * size  # préstamo en curso de cada buffer
+        self._cond = threading.Condition()
+        self.waits = 0
+        self.grown = 0
+        self.reclaimed = 0
+    
+    def acquire(self) -> tuple:
+        """
+        Presta un buffer libre con un dueño (espera a que se libere uno si están todos prestados).
+        
+        Returns:
+            (índice, generación): identifican el préstamo en retain / release
+        """
+        with self._cond:
+            if not self._free:
+                self.waits += 1
+                deadline = time.perf_counter() + self.grow_after
+                while not self._free and (remaining := deadline - time.perf_counter()) > 0:
+                    self._cond.wait(remaining)
+            if not self._free:
+                self.grown += 1
+                print(f"Pool de frames agotado por {self.grow_after:.0f} s: {self.size + 1} buffers (conviene un pool más grande)")
+                self._slots.append(bytearray(self.frame_bytes))
+                self._generation.append(0)
+                self._free.append(len(self._slots) - 1)
+            index = self._free.popleft()
+            self._generation[index] += 1
+            self._owners[index] = 1
+            return index, self._generation[index]
+    
+    def slot(self, index: int) -> bytearray:
+        return self._slots[index]
+    
+    def retain(self, index: int, generation: int):
+        """Suma un dueño al préstamo (sin efecto si ya se devolvió)."""
+        with self._cond:
+            if self._generation[index] == generation and index in self._owners:
+                self._owners[index] += 1
+    
+    def release(self, index: int, generation: int, reclaim: bool = False):
+        """Devuelve un dueño del préstamo (todos con reclaim); libre sin dueños."""
+        with self._cond:
+            if self._generation[index] != generation or index not in self._owners:
+                return
+            self._owners[index] = 0 if reclaim else self._owners[index] - 1
+            if self._owners[index] == 0:
+                del self._owners[index]
+                self._free.append(index)
+                self.reclaimed += reclaim
+                self._cond.notify()
+    
+    @property
+    def size(self) -> int:
+        return len(self._slots)
+
+
+class FFmpegCapture:
+    """Drop-in de cv2.VideoCapture para archivos y URLs (RTSP/HTTP) decodificados por ffmpeg."""
+    
+    def __init__(self, source: str, pool_size: int = 16, threads: int = 0, width: int = None,
+                 grow_after: float = 5.0):
+        """
+        Args:
+            source: Ruta o URL que entienda ffmpeg (no webcam)
+            pool_size: Buffers preasignados (>= frames retenidos a la vez por el pipeline)
+            threads: Hilos del decoder (0 = automático)
+            width: Escalar en el decoder a este ancho (alto proporcional, par); None = original
+        """
+        self.source = str(source)
+        self.threads = threads
+        self.ffmpeg = shutil.which("ffmpeg")
+        if self.ffmpeg is None:
+            raise RuntimeError("ffmpeg no encontrado")
+        
+        probe = cv2.VideoCapture(self.source)
+        if not probe.isOpened():
+            raise IOError(f"No se pudo abrir la fuente de video: {source}")
+        self.fps = probe.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(probe.get(cv2.CAP_PROP_FRAME_COUNT))
+        src_w, src_h = int(probe.get(cv2.CAP_PROP_FRAME_WIDTH)), int(probe.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        probe.release()
+        if width and width != src_w:
+            self.width, self.height = width, int(round(src_h * width / src_w / 2)) * 2
+        else:
+            self.width, self.height = src_w, src_h
+        self.scaled = (self.width, self.height) != (src_w, src_h)
+        
+        self.shape = (self.height, self.width, 3)
+        self.pool = FramePool(self.width * self.height * 3, pool_size, grow_after)
+        self.position = 0
+        self.frames = 0
+        self.proc = None
+        self._leases = {}  # id del array base de cada frame entregado -> (índice, generación)
+        self._start(0)
+    
+    def _start(self, frame: int):
+        self.release()
+        cmd = [self.ffmpeg, "-nostdin", "-loglevel", "error", "-threads", str(self.threads)]
+        if self.source.startswith("rtsp://"):
+            cmd += ["-rtsp_transport", "tcp"]
+        if frame:
+            # -ss antes de -i: salta al keyframe previo y descarta hasta el frame exacto
+            cmd += ["-ss", f"{frame / self.fps:.6f}"]
+        cmd += ["-i", self.source, "-an", "-sn"]
+        if self.scaled:
+            cmd += ["-vf", f"scale={self.width}:{self.height}:flags=area"]
+        cmd += ["-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, bufsize=0)
+        self.position = frame
+    
+    def isOpened(self) -> bool:
+        return self.proc is not None
+    
+    def read(self):
+        """Returns: (True, frame) con el frame en un buffer del pool, o (False, None) al terminar."""
+        if self.proc is None:
+            return False, None
+        index, generation = self.pool.acquire()
+        slot = self.pool.slot(index)
+        view = memoryview(slot)
+        filled = 0
+        while filled < len(slot):
+            n = self.proc.stdout.readinto(view[filled:])
+            if not n:
+                view.release()
+                self.pool.release(index, generation)
+                return False, None
+            filled += n
+        view.release()
+        self.position += 1
+        self.frames += 1
+        # Toda vista del frame tiene a este array como base: la red de seguridad muere con la última
+        base = np.frombuffer(slot, dtype=np.uint8)
+        key = id(base)
+        self._leases[key] = (index, generation)
+        weakref.finalize(base, self._reclaim, key, index, generation)
+        return True, base.reshape(self.shape)
+    
+    def _lease(self, frame):
+        for array in (frame, getattr(frame, "base", None)):
+            lease = self._leases.get(id(array)) if array is not None else None
+            if lease is not None:
+                return lease
+        return None
+    
+    def _reclaim(self, key: int, index: int, generation: int):
+        self._leases.pop(key, None)
+        self.pool.release(index, generation, reclaim=True)
+    
+    def retain_frame(self, frame):
+        """Suma un dueño al buffer del frame (frames que no son del pool se ignoran)."""
+        lease = self._lease(frame)
+        if lease is not None:
+            self.pool.retain(*lease)
+    
+    def release_frame(self, frame):
+        """Devuelve un dueño del buffer del frame; con el último vuelve al pool."""
+        lease = self._lease(frame)
+        if lease is not None:
+            self.pool.release(*lease)
+    
+    def get(self, prop: int) -> float:
+        values = {
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_FRAME_WIDTH: self.width,
+            cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+            cv2.CAP_PROP_FRAME_COUNT: self.frame_count,
+            cv2.CAP_PROP_POS_FRAMES: self.position,
+        }
+        return float(values.get(prop, 0))
+    
+    def set(self, prop: int, value: float) -> bool:
+        """Sólo CAP_PROP_POS_FRAMES: reinicia ffmpeg en ese frame."""
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        self._start(int(value))
+        return True
+    
+    def release(self):
+        if self.proc is not None:
+            self.proc.kill()
+            self.proc.wait()
+            self.proc.stdout.close()
+            self.proc = None
+    
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "size": [self.width, self.height],
+            "pool_buffers": self.pool.size,
+            "pool_mb": round(self.pool.size * self.pool.frame_bytes / 1024 ** 2, 1),
+            "pool_waits": self.pool.waits,
+            "pool_grown": self.pool.grown,
+            "pool_reclaimed": self.pool.reclaimed,
+        }
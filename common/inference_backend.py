@@ -0,0 +1,194 @@
+"""
+Backends de inferencia en CPU para los modelos YOLO: PyTorch, ONNX Runtime y OpenVINO.
+
+Los modelos exportados se cargan con ultralytics.YOLO (AutoBackend), así que
+track(), persist, BoT-SORT y los Results no cambian: sólo cambia el runtime que
+ejecuta la red. La exportación (y la cuantización INT8, calibrada con frames de
+un video del dominio) se hace una sola vez y queda en export_dir, con clave por
+contenido de los pesos, imgsz y precisión. onnxruntime / openvino / nncf son
+opcionales: sólo se importan al exportar o cargar con ese backend.
+"""
+import os
+import re
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+
+BACKENDS = ("torch", "onnx", "openvino")
+EXPORT_DIR = "exports"
+CALIBRATION_FRAMES = 64
+
+
+def _weights_digest(weights: str) -> str:
+    """Hash del contenido de los pesos (o del nombre, si ultralytics todavía no los descargó)."""
+    path = Path(weights)
+    digest = hashlib.sha1()
+    if not path.is_file():
+        digest.update(str(weights).encode())
+        return digest.hexdigest()[:12]
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def export_path(weights: str, backend: str, imgsz: int = 640, int8: bool = False,
+                export_dir: str = EXPORT_DIR) -> Path:
+    """Ruta de la exportación en cache (.onnx o directorio *_openvino_model)."""
+    precision = "int8" if int8 else "fp32"
+    suffix = ".onnx" if backend == "onnx" else "_openvino_model"
+    return Path(export_dir) / f"{Path(weights).stem}-{_weights_digest(weights)}-{imgsz}-{precision}{suffix}"
+
+
+def calibration_frames(source: str, count: int = CALIBRATION_FRAMES, imgsz: int = 640) -> list:
+    """
+    Frames equiespaciados de un video, preprocesados como en predict
+    (letterbox rectangular, RGB, CHW, 0-1).
+    
+    Returns:
+        Lista de arrays float32 de forma (1, 3, H, W)
+    """
+    from ultralytics.data.augment import LetterBox
+    
+    cap = cv2.VideoCapture(str(source))
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if not cap.isOpened() or total <= 0:
+        raise ValueError(f"No se pudo leer el video de calibración: {source}")
+    letterbox = LetterBox((imgsz, imgsz), auto=True, stride=32)
+    frames = []
+    for index in np.linspace(0, total - 1, min(count, total)).astype(int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+        ret, frame = cap.read()
+        if not ret:
+            continue
+        image = letterbox(image=frame)[..., ::-1].transpose(2, 0, 1)
+        frames.append(np.ascontiguousarray(image[None], dtype=np.float32) / 255)
+    cap.release()
+    return frames
+
+
+def _quantize_onnx(fp32_path: Path, int8_path: Path, frames: list):
+    """
+    INT8 estático (QDQ, pesos por canal) con onnxruntime. El decode del head
+    (DFL, sigmoides, escalado por stride y keypoints) queda en FP32: cuantizarlo
+    mueve cajas y keypoints varios píxeles.
+    """
+    import onnx
+    from onnxruntime.quantization import quantize_static, CalibrationDataReader, QuantFormat, QuantType
+    
+    model = onnx.load(str(fp32_path))
+    input_name = model.graph.input[0].name
+    indices = [int(m.group(1)) for node in model.graph.node if (m := re.search(r"/model\.(\d+)/", node.name))]
+    head = f"/model.{max(indices)}/" if indices else "/"
+    exclude = [node.name for node in model.graph.node
+               if head in node.name and (node.op_type != "Conv" or "/dfl/" in node.name)]
+    
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._frames = iter(frames)
+        
+        def get_next(self):
+            frame = next(self._frames, None)
+            return None if frame is None else {input_name: frame}
+    
+    quantize_static(str(fp32_path), str(int8_path), FrameReader(), quant_format=QuantFormat.QDQ,
+                    per_channel=True, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    nodes_to_exclude=exclude)
+    # quantize_static descarta metadata_props (task, stride, names, kpt_shape) que lee AutoBackend
+    quantized = onnx.load(str(int8_path))
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(model.metadata_props)
+    onnx.save(quantized, str(int8_path))
+
+
+def _quantize_openvino(fp32_dir: Path, int8_dir: Path, frames: list):
+    """INT8 con NNCF, con el mismo scope ignorado que el export INT8 de ultralytics (head y sigmoides)."""
+    import nncf
+    import openvino as ov
+    
+    xml = next(fp32_dir.glob("*.xml"))
+    model = ov.Core().read_model(xml)
+    operations = model.get_ordered_ops()
+    sigmoids = [op.get_friendly_name() for op in operations if op.get_type_name() == "Sigmoid"]
+    head = sigmoids[-1].split("/", 1)[0] if sigmoids else None
+    ignored = [op.get_friendly_name() for op in operations
+               if op.get_type_name() == "Sigmoid"
+               or (head and op.get_friendly_name().startswith((f"{head}/", f"{head}.dfl")))]
+    quantized = nncf.quantize(model, nncf.Dataset(frames), preset=nncf.QuantizationPreset.MIXED,
+                              subset_size=len(frames), ignored_scope=nncf.IgnoredScope(names=ignored))
+    int8_dir.mkdir()
+    ov.save_model(quantized, int8_dir / xml.name, compress_to_fp16=False)
+    shutil.copy(fp32_dir / "metadata.yaml", int8_dir)
+
+
+def export_model(weights: str, backend: str, imgsz: int = 640, int8: bool = False, calibration: str = None,
+                 export_dir: str = EXPORT_DIR, calibration_count: int = CALIBRATION_FRAMES) -> str:
+    """
+    Exporta el modelo para el backend (y lo cuantiza con int8), o devuelve la exportación en cache.
+    
+    La exportación es con ejes dinámicos: acepta cualquier batch y el letterbox
+    rectangular de predict, igual que el modelo PyTorch. La calibración INT8 se
+    hace sólo la primera vez; para recalibrar con otro video hay que borrar el export.
+    
+    Args:
+        weights: Pesos .pt de ultralytics
+        backend: "onnx" u "openvino"
+        calibration: Video del dominio para calibrar INT8
+    
+    Returns:
+        Ruta del .onnx o del directorio *_openvino_model
+    """
+    if backend not in ("onnx", "openvino"):
+        raise ValueError(f"Backend sin exportación: {backend}")
+    target = export_path(weights, backend, imgsz, int8, export_dir)
+    if target.exists():
+        return str(target)
+    if int8 and calibration is None:
+        raise ValueError("La cuantización INT8 necesita un video de calibración")
+    
+    Path(export_dir).mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=export_dir) as tmp:
+        tmp = Path(tmp)
+        model = YOLO(weights)
+        # El exporter escribe junto a pt_path: se redirige al directorio temporal
+        model.model.pt_path = str(tmp / f"{Path(weights).stem}.pt")
+        exported = Path(model.export(format=backend, imgsz=imgsz, dynamic=True, verbose=False))
+        if int8:
+            frames = calibration_frames(calibration, calibration_count, imgsz)
+            if backend == "onnx":
+                result = tmp / "int8.onnx"
+                _quantize_onnx(exported, result, frames)
+            else:
+                result = tmp / "int8_openvino_model"
+                _quantize_openvino(exported, result, frames)
+        else:
+            result = exported
+        try:
+            os.rename(result, target)
+        except OSError:
+            # Otro proceso exportó el mismo modelo en paralelo
+            if not target.exists():
+                raise
+    return str(target)
+
+
+def load_model(weights: str, backend: str = "torch", int8: bool = False, imgsz: int = 640,
+               calibration: str = None, export_dir: str = EXPORT_DIR) -> YOLO:
+    """
+    YOLO listo para predict/track con el backend pedido (exporta la primera vez).
+    
+    Returns:
+        ultralytics.YOLO con la misma interfaz en todos los backends
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+    if backend == "torch":
+        if int8:
+            raise ValueError("INT8 requiere backend onnx u openvino")
+        return YOLO(weights)
+    return YOLO(export_model(weights, backend, imgsz, int8, calibration, export_dir))
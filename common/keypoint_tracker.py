@@ -0,0 +1,243 @@
+"""
+Tracker liviano por IoU de cajas + similitud de keypoints (OKS), independiente de la inferencia.
+
+Alternativa a BoT-SORT (model.track con persist): en lugar de un filtro de
+Kalman por objeto, el estado de todos los tracks vive en arrays y cada update
+arma de una vez la matriz de similitud tracks x detecciones:
+- IoU entre la caja predicha (velocidad constante) y la detectada
+- mezclada con OKS entre keypoints predichos y detectados cuando los dos
+  tienen pose visible: desempata personas que se cruzan con cajas solapadas
+La asignación es Hungarian (scipy) o greedy sobre esa matriz, en dos etapas
+como ByteTrack: primero las detecciones de confianza alta contra todos los
+tracks, después las de confianza baja contra los que quedaron sin pareja
+(sólo continúan tracks, no crean).
+
+No llama al modelo: recibe cajas, scores y keypoints de cualquier inferencia
+(predict por batch, sólo keyframes con stride) más el número de frame, así la
+predicción de movimiento y la edad de los tracks escalan con el salto entre
+frames inferidos.
+"""
+import time
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # sin scipy: sólo greedy
+    linear_sum_assignment = None
+
+
+NUM_KEYPOINTS = 17
+# Sigmas de COCO por keypoint (OKS)
+COCO_SIGMAS = np.array([.26, .25, .25, .35, .35, .79, .79, .72, .72, .62, .62,
+                        1.07, 1.07, .87, .87, .89, .89], dtype=np.float32) / 10
+# exp(-d² / (2 s² k²)) con k = 2 sigma: d² * OKS_SCALE / área
+OKS_SCALE = 1 / (2 * (2 * COCO_SIGMAS) ** 2)
+
+
+def bbox_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU entre dos conjuntos de bboxes xyxy. Returns: matriz (len(a), len(b))."""
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def keypoint_oks(a: np.ndarray, b: np.ndarray, areas: np.ndarray, min_conf: float = 0.5,
+                 min_visible: int = 3) -> tuple:
+    """
+    OKS (COCO) entre pares de poses alineadas por fila (n, 17, 3).
+    
+    Args:
+        areas: (n,) área de escala de cada par (la caja detectada)
+        min_visible: Keypoints visibles en los dos lados para que el OKS cuente
+    
+    Returns:
+        (oks (n,), valid (n,) bool)
+    """
+    visible = (a[..., 2] >= min_conf) & (b[..., 2] >= min_conf)
+    d2 = ((a[..., :2] - b[..., :2]) ** 2).sum(axis=2)
+    e = d2 * OKS_SCALE / (areas[:, None] + 1e-9)
+    count = visible.sum(axis=1)
+    oks = np.where(visible, np.exp(-e), 0).sum(axis=1) / np.maximum(count, 1)
+    return oks, count >= min_visible
+
+
+class KeypointTracker:
+    """Estado de tracks en arrays: ids (-1 = tentativo), bboxes, velocidad, keypoints, clase, último frame, hits."""
+    
+    MATCHERS = ("hungarian", "greedy")
+    OKS_MIN_IOU = 0.1
+    
+    def __init__(self, high_conf: float = 0.5, low_conf: float = 0.1, new_track_conf: float = 0.25,
+                 min_similarity: float = 0.2, low_min_iou: float = 0.5, oks_weight: float = 0.5,
+                 max_age: int = 30, min_hits: int = 2, matcher: str = "hungarian"):
+        """
+        Args:
+            high_conf / low_conf: Umbrales de score de la primera / segunda etapa
+            new_track_conf: Score mínimo para abrir un track
+            min_similarity: Similitud mínima de un par en la primera etapa
+            low_min_iou: IoU mínima de un par en la segunda etapa (detecciones débiles)
+            oks_weight: Peso del OKS frente a la IoU cuando hay pose en los dos lados (0 = sólo IoU)
+            max_age: Frames que un track perdido se conserva (en frames de video, no de inferencia)
+            min_hits: Detecciones para confirmar un track (y darle ID); en el primer frame se confirma directo
+            matcher: "hungarian" (óptimo, scipy) o "greedy" (pares de mayor similitud primero)
+        """
+        if matcher not in self.MATCHERS:
+            raise ValueError(f"Matcher no soportado: {matcher}")
+        if matcher == "hungarian" and linear_sum_assignment is None:
+            print("scipy no disponible: KeypointTracker usa matching greedy")
+            matcher = "greedy"
+        self.high_conf = high_conf
+        self.low_conf = low_conf
+        self.new_track_conf = new_track_conf
+        self.min_similarity = min_similarity
+        self.low_min_iou = low_min_iou
+        self.oks_weight = oks_weight
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.matcher = matcher
+        self.reset()
+    
+    def reset(self):
+        """Sin tracks, IDs desde 1 (otro video)."""
+        self.ids = np.empty(0, dtype=np.int32)
+        self.bboxes = np.empty((0, 4), dtype=np.float32)
+        self.velocity = np.empty((0, 4), dtype=np.float32)
+        self.keypoints = np.empty((0, NUM_KEYPOINTS, 3), dtype=np.float32)
+        self.classes = np.empty(0, dtype=np.int32)
+        self.last_seen = np.empty(0, dtype=np.int64)
+        self.hits = np.empty(0, dtype=np.int32)
+        self.frame = -1
+        self.next_id = 1
+        self.frames = 0
+        self.busy = 0.0
+    
+    def update(self, bboxes, scores, keypoints=None, classes=None, frame: int = None) -> np.ndarray:
+        """
+        Asocia las detecciones de un frame.
+        
+        Args:
+            bboxes: (n, 4) xyxy
+            scores: (n,) confianza de detección
+            keypoints: (n, 17, 3) [x, y, conf] o None (sólo IoU, ej. detector de objetos)
+            classes: (n,) clase por detección o None; sólo se asocian detecciones de la misma clase
+            frame: Número de frame (default: el anterior + 1); con stride, el del keyframe
+        
+        Returns:
+            (n,) int32: ID de cada detección, -1 si no pertenece a un track confirmado
+        """
+        start = time.perf_counter()
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        n = len(bboxes)
+        scores = np.asarray(scores, dtype=np.float32).reshape(n)
+        if keypoints is None:
+            keypoints = np.full((n, NUM_KEYPOINTS, 3), np.nan, dtype=np.float32)
+        keypoints = np.asarray(keypoints, dtype=np.float32).reshape(n, NUM_KEYPOINTS, 3)
+        classes = np.zeros(n, dtype=np.int32) if classes is None else np.asarray(classes, dtype=np.int32).reshape(n)
+        self.frame = self.frame + 1 if frame is None else int(frame)
+        
+        # Predicción a velocidad constante hasta este frame (el salto puede ser > 1 con stride)
+        gap = np.maximum(self.frame - self.last_seen, 1).astype(np.float32)[:, None]
+        pred_bboxes = self.bboxes + self.velocity * gap
+        shift = (self.velocity[:, :2] + self.velocity[:, 2:]) / 2 * gap
+        pred_keypoints = self.keypoints.copy()
+        pred_keypoints[..., :2] += shift[:, None, :]
+        
+        det_track = np.full(n, -1, dtype=np.intp)
+        free = np.ones(len(self.ids), dtype=bool)
+        high = np.flatnonzero(scores >= self.high_conf)
+        low = np.flatnonzero((scores >= self.low_conf) & (scores < self.high_conf))
+        for dets, use_oks, threshold in ((high, True, self.min_similarity), (low, False, self.low_min_iou)):
+            tracks = np.flatnonzero(free)
+            if not len(dets) or not len(tracks):
+                continue
+            similarity = bbox_iou(pred_bboxes[tracks], bboxes[dets])
+            if use_oks and self.oks_weight > 0:
+                # OKS sólo de pares con cajas solapadas: con IoU < OKS_MIN_IOU los
+                # keypoints quedan lejos en la escala de la persona y el OKS es ~0
+                rows, cols = np.nonzero(similarity >= self.OKS_MIN_IOU)
+                track_rows, det_rows = tracks[rows], dets[cols]
+                areas = np.prod(bboxes[det_rows, 2:] - bboxes[det_rows, :2], axis=1)
+                oks, valid = keypoint_oks(pred_keypoints[track_rows], keypoints[det_rows], areas)
+                iou = similarity[rows, cols]
+                similarity[rows, cols] = np.where(valid, (1 - self.oks_weight) * iou + self.oks_weight * oks, iou)
+            similarity[self.classes[tracks][:, None] != classes[dets][None, :]] = 0
+            rows, cols = self._assign(similarity, threshold)
+            det_track[dets[cols]] = tracks[rows]
+            free[tracks[rows]] = False
+        
+        matched = np.flatnonzero(det_track >= 0)
+        self._update_tracks(det_track[matched], bboxes[matched], keypoints[matched], gap)
+        
+        # Detecciones fuertes sin pareja abren tracks (tentativos salvo en el primer frame)
+        new = np.flatnonzero((det_track < 0) & (scores >= self.new_track_conf))
+        det_track[new] = len(self.ids) + np.arange(len(new))
+        self._add_tracks(bboxes[new], keypoints[new], classes[new])
+        
+        # Confirmar, dar ID y descartar: tentativos sin pareja y perdidos hace más de max_age
+        confirm = (self.ids < 0) & ((self.hits >= self.min_hits) | (self.frames == 0))
+        self.ids[confirm] = self.next_id + np.arange(confirm.sum(), dtype=np.int32)
+        self.next_id += int(confirm.sum())
+        keep = np.where(self.ids < 0, self.last_seen == self.frame, self.frame - self.last_seen <= self.max_age)
+        ids = np.full(n, -1, dtype=np.int32)
+        tracked = det_track >= 0
+        ids[tracked] = self.ids[det_track[tracked]]
+        self._keep(keep)
+        
+        self.frames += 1
+        self.busy += time.perf_counter() - start
+        return ids
+    
+    def _assign(self, similarity: np.ndarray, threshold: float) -> tuple:
+        """Returns: (filas, columnas) emparejadas con similitud >= threshold."""
+        if self.matcher == "hungarian":
+            rows, cols = linear_sum_assignment(similarity, maximize=True)
+        else:
+            similarity = similarity.copy()
+            rows, cols = [], []
+            for _ in range(min(similarity.shape)):
+                i, j = np.unravel_index(similarity.argmax(), similarity.shape)
+                if similarity[i, j] < threshold:
+                    break
+                rows.append(i)
+                cols.append(j)
+                similarity[i, :] = -1
+                similarity[:, j] = -1
+            rows, cols = np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)
+            return rows, cols
+        ok = similarity[rows, cols] >= threshold
+        return rows[ok], cols[ok]
+    
+    def _update_tracks(self, rows: np.ndarray, bboxes: np.ndarray, keypoints: np.ndarray, gap: np.ndarray):
+        # Velocidad por frame: la primera medición directa, después promedio con la anterior
+        step = (bboxes - self.bboxes[rows]) / gap[rows]
+        self.velocity[rows] = np.where((self.hits[rows] > 1)[:, None], (self.velocity[rows] + step) / 2, step)
+        self.bboxes[rows] = bboxes
+        self.keypoints[rows] = keypoints
+        self.last_seen[rows] = self.frame
+        self.hits[rows] += 1
+    
+    def _add_tracks(self, bboxes: np.ndarray, keypoints: np.ndarray, classes: np.ndarray):
+        n = len(bboxes)
+        self.ids = np.concatenate([self.ids, np.full(n, -1, dtype=np.int32)])
+        self.bboxes = np.concatenate([self.bboxes, bboxes])
+        self.velocity = np.concatenate([self.velocity, np.zeros((n, 4), dtype=np.float32)])
+        self.keypoints = np.concatenate([self.keypoints, keypoints])
+        self.classes = np.concatenate([self.classes, classes])
+        self.last_seen = np.concatenate([self.last_seen, np.full(n, self.frame, dtype=np.int64)])
+        self.hits = np.concatenate([self.hits, np.ones(n, dtype=np.int32)])
+    
+    def _keep(self, keep: np.ndarray):
+        self.ids, self.bboxes, self.velocity = self.ids[keep], self.bboxes[keep], self.velocity[keep]
+        self.keypoints, self.classes = self.keypoints[keep], self.classes[keep]
+        self.last_seen, self.hits = self.last_seen[keep], self.hits[keep]
+    
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "ids": self.next_id - 1,
+            "active": int((self.ids >= 0).sum()),
+            "ms_per_frame": round(self.busy * 1000 / self.frames, 3) if self.frames else 0.0,
+        }
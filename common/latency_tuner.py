@@ -0,0 +1,161 @@
+"""
+Autotuner de latencia: elige variante de modelo (n/s/m...) e imgsz para cumplir
+un presupuesto de ms por frame de inferencia.
+
+Al arrancar mide cada combinación (variante, imgsz) sobre unos frames de la
+fuente y elige la más cara que entra en el presupuesto (el cómputo es el proxy
+de calidad: más parámetros o más resolución). En ejecución mira la mediana de
+la latencia medida en una ventana y baja o sube un escalón con histéresis: baja
+si se pasa del presupuesto por más de `hysteresis`, y sube sólo si el escalón
+siguiente, escalado por la relación medido/calibrado actual, queda por debajo
+del presupuesto menos `hysteresis`. Cambiar de modelo pasa el estado del
+tracker al modelo nuevo, así los IDs no se reinician. Cajas y keypoints siempre
+salen en coordenadas del frame original: ultralytics los re-escala desde el
+letterbox del imgsz elegido.
+"""
+import re
+import time
+from collections import deque
+import numpy as np
+
+
+DEFAULT_SIZES = (640, 480, 320)
+
+
+def model_variant(weights: str, scale: str) -> str:
+    """Pesos de otra escala de la misma familia: yolov8n-pose.pt -> yolov8s-pose.pt (None si no aplica)."""
+    name, count = re.subn(r"^(yolo(?:v\d+)?\d*)[nsmlx]((?:-\w+)?\.\w+)$", rf"\g<1>{scale}\g<2>", str(weights))
+    return name if count else None
+
+
+def handoff_tracker(old, new):
+    """Pasa los trackers de BoT-SORT del predictor de `old` al de `new` (mismo estado, mismos IDs)."""
+    trackers = getattr(old.predictor, "trackers", None)
+    if trackers and new.predictor is not None:
+        new.predictor.trackers = trackers
+        new.predictor.vid_path = old.predictor.vid_path
+
+
+def measure_config(model, imgsz: int, frames: list, batch_size: int = 1, low_conf: float = None,
+                   **options) -> float:
+    """
+    Latencia de inferencia en ms por frame para un imgsz, con un warm-up previo.
+    
+    Se mide la misma llamada que corre en el procesamiento. Con el tracker de
+    ultralytics es track() (y así el predictor queda armado en modo track para
+    recibir el tracker en handoff_tracker); al terminar se descarta el estado
+    del tracker de la medición. Con low_conf (tracker propio, --tracker keypoint)
+    es predict() con ese umbral.
+    
+    Args:
+        options: Argumentos extra de la llamada (p.ej. classes)
+    
+    Returns:
+        ms por frame (batches de batch_size)
+    """
+    if low_conf is None:
+        run = lambda batch: model.track(batch, persist=True, verbose=False, imgsz=imgsz, **options)
+    else:
+        run = lambda batch: model.predict(batch, verbose=False, imgsz=imgsz, conf=low_conf, **options)
+    run(frames[:batch_size])
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        run(frames[i:i + batch_size])
+    elapsed = time.perf_counter() - start
+    for tracker in getattr(model.predictor, "trackers", None) or []:
+        tracker.reset()
+    return elapsed * 1000 / len(frames)
+
+
+class PrefetchedCapture:
+    """
+    Fuente en vivo que entrega primero los frames ya leídos para calibrar y
+    después sigue con la captura (en vivo no se puede rebobinar).
+    """
+    
+    def __init__(self, cap, frames: list):
+        self.cap = cap
+        self._frames = deque(frames)
+    
+    def read(self):
+        if self._frames:
+            return True, self._frames.popleft()
+        return self.cap.read()
+    
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+
+class LatencyTuner:
+    """Escalera de configuraciones (variante, imgsz) ordenada por costo calibrado."""
+    
+    def __init__(self, target_ms: float, apply, hysteresis: float = 0.15, window: int = 30):
+        """
+        Args:
+            target_ms: Presupuesto de inferencia por frame
+            apply: Callback apply((variante, imgsz)) que cambia el modelo en uso
+            hysteresis: Margen relativo alrededor del presupuesto antes de cambiar
+            window: Frames medidos (desde el último cambio) antes de decidir
+        """
+        self.target_ms = target_ms
+        self.apply = apply
+        self.hysteresis = hysteresis
+        self.costs = {}
+        self.ladder = []
+        self.index = 0
+        self.frames = 0
+        self.switches = []
+        self._recent = deque(maxlen=window)
+    
+    @property
+    def config(self) -> tuple:
+        return self.ladder[self.index]
+    
+    def calibrate(self, configs: list, measure) -> tuple:
+        """
+        Mide cada configuración y aplica la más cara que entra en el presupuesto
+        (o la más barata si ninguna entra).
+        
+        Args:
+            measure: measure((variante, imgsz)) -> ms por frame
+        
+        Returns:
+            La configuración elegida
+        """
+        self.costs = {config: measure(config) for config in configs}
+        self.ladder = sorted(self.costs, key=self.costs.get, reverse=True)
+        self.index = next((i for i, config in enumerate(self.ladder) if self.costs[config] <= self.target_ms),
+                          len(self.ladder) - 1)
+        self.apply(self.config)
+        return self.config
+    
+    def observe(self, ms: float, count: int = 1):
+        """Registra la latencia por frame de una inferencia de `count` frames y ajusta si hace falta."""
+        self.frames += count
+        self._recent.extend([ms] * count)
+        if len(self._recent) < self._recent.maxlen:
+            return
+        current = float(np.median(self._recent))
+        # Relación entre lo medido y lo calibrado (más personas, otra escena, CPU compartida)
+        scale = current / self.costs[self.config]
+        if current > self.target_ms * (1 + self.hysteresis) and self.index < len(self.ladder) - 1:
+            # Bajar directo al escalón más caro que entra con la escala actual
+            target = next((i for i in range(self.index + 1, len(self.ladder))
+                           if self.costs[self.ladder[i]] * scale <= self.target_ms), len(self.ladder) - 1)
+        elif self.index > 0 and self.costs[self.ladder[self.index - 1]] * scale <= self.target_ms * (1 - self.hysteresis):
+            # Subir de a un escalón
+            target = self.index - 1
+        else:
+            return
+        self.index = target
+        self._recent.clear()
+        self.switches.append({"frame": self.frames, "from_ms": round(current, 1), "config": list(self.config)})
+        self.apply(self.config)
+    
+    def to_dict(self) -> dict:
+        return {
+            "target_ms": self.target_ms,
+            "config": list(self.config),
+            "costs_ms": [[*config, round(self.costs[config], 1)] for config in self.ladder],
+            "switches": self.switches,
+        }